@@ -23,6 +23,7 @@ from .point_style_dto import PointStyleDTO
 from .polygon_style_dto import PolygonStyleDTO
 from .project_dto import ProjectDTO
 from .style_dto import StyleDTO
+from .style_dto_cache import StyleDTOCache, style_dto_cache
 from .style_map_scale_dto import StyleMapScaleDTO
 from .style_rule_dto import StyleRuleDTO
 
@@ -39,6 +40,8 @@ __all__ = [
     "PolygonStyleDTO",
     "ProjectDTO",
     "StyleDTO",
+    "StyleDTOCache",
+    "style_dto_cache",
     "StyleMapScaleDTO",
     "StyleRuleDTO",
     "LabelingConfigDTO",
@@ -23,6 +23,7 @@ from .polygon_style_dto import PolygonStyleDTO
 from .style_dto import StyleDTO
 from ..plugin_util import (
     convert_measurement_to_pixel,
+    convert_measurements_to_pixel,
     convert_pen_style_to_dash_array,
     image_to_base64,
     opacity_to_transparency,
@@ -75,7 +76,7 @@ class LineStyleDTO(StyleDTO):
             dto.lineJoin = lineJoin
 
             if symbol_layer.useCustomDashPattern():
-                dash_pattern = convert_measurement_to_pixel(
+                dash_pattern = convert_measurements_to_pixel(
                     symbol_layer.customDashVector(), symbol_layer.customDashPatternUnit()
                 )
                 dto.dashPattern = [
@@ -24,6 +24,7 @@ from qgis.PyQt.QtCore import Qt, QSize
 from .style_dto import StyleDTO
 from ..plugin_util import (
     convert_measurement_to_pixel,
+    convert_measurements_to_pixel,
     convert_pen_style_to_dash_array,
     image_to_base64,
     opacity_to_transparency,
@@ -111,7 +112,7 @@ class PolygonStyleDTO(StyleDTO):
             dto.fillColor = symbol_layer.color().name()
             dto.transparency = 100  # only border, no fill
             if symbol_layer.useCustomDashPattern():
-                dash_pattern = convert_measurement_to_pixel(
+                dash_pattern = convert_measurements_to_pixel(
                     symbol_layer.customDashVector(), symbol_layer.customDashPatternUnit()
                 )
                 dto.borderDashPattern = [
@@ -14,6 +14,7 @@ from enum import Enum, auto
 from qgis.core import QgsSymbol
 
 from .dto import DTO
+from .style_dto_cache import style_dto_cache
 from ..plugin_util import opacity_to_transparency, transparency_to_opacity
 
 
@@ -45,7 +46,11 @@ class StyleDTO(DTO):
     def from_symbol(cls, symbol: QgsSymbol) -> list["StyleDTO"]:
         dtos = []
         for symbol_layer in symbol.symbolLayers():
-            dto = cls.from_symbol_layer(symbol_layer)
+            dto = style_dto_cache.get_or_convert(
+                cls.__name__,
+                symbol_layer,
+                lambda symbol_layer=symbol_layer: cls.from_symbol_layer(symbol_layer),
+            )
             if dto is not None:
                 dto.transparency = opacity_to_transparency(transparency_to_opacity(dto.transparency) * symbol.opacity())
                 dtos.append(dto)
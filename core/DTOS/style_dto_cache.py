@@ -0,0 +1,112 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Union
+
+from qgis.core import QgsSymbolLayer
+
+from ..plugin_util import get_render_dpi
+
+MAX_CACHED_STYLES = 512
+# accessors of the SVG or raster file drawn by the symbol layers that reference one
+FILE_PATH_ACCESSORS = ("path", "svgFilePath", "imageFilePath")
+
+
+class StyleDTOCache:
+    """
+    Process-wide LRU cache of the style DTOs converted from symbol layers.
+
+    Symbol layers are keyed on their type, output unit and properties(), so layers sharing the
+    same marker, line or fill are converted (and their SVG rendered) only once.
+    The key also holds the output DPI and the modification time and size of the SVG or raster
+    file a layer references, so an edited file or a new DPI is converted again.
+    Cached DTOs are copied on the way out because callers adjust their transparency.
+    Style tasks run in parallel, so the cache is guarded by a lock.
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_STYLES):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def make_key(cls, dto_type: str, symbol_layer: QgsSymbolLayer) -> str:
+        properties = json.dumps(symbol_layer.properties(), sort_keys=True, default=str)
+        key = "{}|{}|{}|{}|{}|{}".format(
+            dto_type,
+            symbol_layer.layerType(),
+            symbol_layer.outputUnit(),
+            get_render_dpi(),
+            cls._file_signature(symbol_layer),
+            properties,
+        )
+        # properties() does not describe the sub-symbol of marker lines, arrows, etc.
+        sub_symbol = symbol_layer.subSymbol()
+        if sub_symbol is not None:
+            for sub_symbol_layer in sub_symbol.symbolLayers():
+                key += "|" + cls.make_key(dto_type, sub_symbol_layer)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _file_signature(symbol_layer: QgsSymbolLayer) -> str:
+        """Modification time and size of the file drawn by the symbol layer, if it is local"""
+        for accessor in FILE_PATH_ACCESSORS:
+            if hasattr(symbol_layer, accessor):
+                path = getattr(symbol_layer, accessor)()
+                try:
+                    stat = os.stat(path)
+                except (OSError, TypeError, ValueError):
+                    # embedded (base64:), remote or missing files are described by properties()
+                    return ""
+                return "{}:{}".format(stat.st_mtime_ns, stat.st_size)
+        return ""
+
+    def get_or_convert(
+        self, dto_type: str, symbol_layer: QgsSymbolLayer, convert: Callable[[], object]
+    ) -> Union[object, None]:
+        """Return the cached DTO of a symbol layer, or convert and cache it"""
+        key = self.make_key(dto_type, symbol_layer)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return copy.deepcopy(self._entries[key])
+            self.misses += 1
+
+        dto = convert()
+        with self._lock:
+            self._entries[key] = dto
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(dto)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+style_dto_cache = StyleDTOCache()
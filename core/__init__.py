@@ -15,6 +15,7 @@ from .plugin_util import (
     convert_crs_to_epsg,
     convert_jmap_datetime,
     convert_measurement_to_pixel,
+    convert_measurements_to_pixel,
     convert_scale_to_zoom,
     convert_zoom_to_scale,
     find_value_in_dict_or_first,
@@ -37,6 +38,7 @@ __all__ = [
     "convert_zoom_to_scale",
     "convert_scale_to_zoom",
     "convert_measurement_to_pixel",
+    "convert_measurements_to_pixel",
     "image_to_base64",
     "convert_jmap_datetime",
     "time_now",
@@ -45,6 +45,9 @@ ORG_NAME_SUFFIX = "Organization"
 LANGUAGE_SUFFIX = "Language"
 EMAIL_SUFFIX = "login_email"
 
+# local data folder, created in the QGIS profile folder
+PLUGIN_DATA_DIR_NAME = "jmap_cloud"
+
 
 # layer permission
 VECTOR_LAYER_EDIT_PERMISSIONS = [
@@ -14,16 +14,19 @@
 # -----------------------------------------------------------
 
 import base64
+import functools
+import hashlib
 import math
 import pathlib
 import re
 import sys
-import tempfile
 from datetime import datetime, timezone
 from typing import Union
 
+import numpy
 from qgis.core import (
     Qgis,
+    QgsApplication,
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
     QgsFontMarkerSymbolLayer,
@@ -37,9 +40,21 @@ from qgis.core import (
     QgsSvgMarkerSymbolLayer,
     QgsSymbol,
 )
-from qgis.PyQt.QtCore import QBuffer, QLocale, QMetaType, QRect, QSettings, QSize, Qt
+from qgis.PyQt.QtCore import (
+    QBuffer,
+    QByteArray,
+    QLocale,
+    QMetaType,
+    QRect,
+    QRectF,
+    QSettings,
+    QSize,
+    Qt,
+)
 from qgis.PyQt.QtGui import QColor, QFont, QImage, QPainter, QPainterPath
-from qgis.PyQt.QtSvg import QSvgGenerator
+from qgis.PyQt.QtSvg import QSvgGenerator, QSvgRenderer
+
+from .constant import PLUGIN_DATA_DIR_NAME
 
 MAX_SCALE_LIMIT = 295828763
 TILE_SIZE_IN_PIXELS = 512
@@ -140,15 +155,55 @@ def _mean_latitude_from_layers() -> float:
     return _mean_latitude_from_rect(union_rect, dst_crs, proj) if union_rect else 0.0
 
 
+_mean_latitude_cache: Union[float, None] = None
+_mean_latitude_signals_connected = False
+
+
+def _invalidate_mean_latitude_cache(*args):
+    global _mean_latitude_cache
+    _mean_latitude_cache = None
+
+
+def _connect_mean_latitude_signals(proj: QgsProject):
+    global _mean_latitude_signals_connected
+    if _mean_latitude_signals_connected:
+        return
+    proj.layersAdded.connect(_invalidate_mean_latitude_cache)
+    proj.layersRemoved.connect(_invalidate_mean_latitude_cache)
+    proj.crsChanged.connect(_invalidate_mean_latitude_cache)
+    proj.cleared.connect(_invalidate_mean_latitude_cache)
+    proj.readProject.connect(_invalidate_mean_latitude_cache)
+    _mean_latitude_signals_connected = True
+
+
 def _get_mean_latitude_project() -> float:
-    """Get the mean latitude of the current project extent."""
+    """
+    Get the mean latitude of the current project extent.
+    The value is cached until a layer is added or removed or the project CRS changes.
+    """
+    global _mean_latitude_cache
+    if _mean_latitude_cache is not None:
+        return _mean_latitude_cache
+
     proj = QgsProject.instance()
+    _connect_mean_latitude_signals(proj)
     project_extent = proj.viewSettings().defaultViewExtent()
 
     if project_extent and not project_extent.isEmpty():
-        return _mean_latitude_from_rect(project_extent, proj.crs(), proj)
+        mean_latitude = _mean_latitude_from_rect(project_extent, proj.crs(), proj)
     else:
-        return _mean_latitude_from_layers()
+        mean_latitude = _mean_latitude_from_layers()
+    _mean_latitude_cache = mean_latitude
+    return mean_latitude
+
+
+def refresh_mean_latitude_project() -> float:
+    """
+    Compute the mean latitude of the project again, for changes the cache does not see
+    (default view extent, layer extents). Call it from the main thread before an export.
+    """
+    _invalidate_mean_latitude_cache()
+    return _get_mean_latitude_project()
 
 
 def qgis_layer_type_to_jmc(type_enum: Qgis.LayerType) -> str:
@@ -242,36 +297,69 @@ def convert_scale_to_zoom(scale: int) -> Union[int, None]:
     )
 
 
-def convert_measurement_to_pixel(value: any, unit: Qgis.RenderUnit) -> float:
-    if isinstance(value, list):
-        return [convert_measurement_to_pixel(v, unit) for v in value]
-    else:
-        map_settings = QgsMapSettings()
-        render_context = QgsRenderContext.fromMapSettings(map_settings)
-        if unit == Qgis.RenderUnit.Pixels:
-            return value  # Déjà en pixels
-        elif unit in [Qgis.RenderUnit.Millimeters, Qgis.RenderUnit.Inches, Qgis.RenderUnit.Points]:
-            return render_context.convertToPainterUnits(value, unit)
-        elif unit == Qgis.RenderUnit.MapUnits:
-            if render_context.mapToPixel():
-                return value / render_context.mapToPixel().mapUnitsPerPixel()  # TODO TEST
-            else:
-                raise ValueError(
-                    "The render context does not contain a map to pixel transformation."
-                )
-        # elif unit == Qgis.RenderUnit.MetersInMapUnits and False:  # TODO:
-        #     if render_context.mapToPixel():
-        #         pass
-        #     else:
-        #         raise ValueError(
-        #             "The render context does not contain a map to pixel transformation."
-        #         )
-        # elif unit == Qgis.RenderUnit.Percentage and False:  # TODO
-        #     return (value / 100.0) * context.scaleFactor()
-        elif unit == Qgis.RenderUnit.Unknown:
-            raise ValueError("Unknown unit")
+@functools.lru_cache(maxsize=8)
+def _get_render_context(dpi: float = None) -> QgsRenderContext:
+    """Render context used to convert measurements, built once per output DPI"""
+    map_settings = QgsMapSettings()
+    if dpi is not None:
+        map_settings.setOutputDpi(dpi)
+    return QgsRenderContext.fromMapSettings(map_settings)
+
+
+def get_render_dpi() -> float:
+    """Output DPI used to convert measurements to pixels"""
+    return _get_render_context().scaleFactor() * 25.4  # scaleFactor is in dots per millimeter
+
+
+def _pixel_factor(unit: Qgis.RenderUnit, render_context: QgsRenderContext) -> float:
+    """Number of pixels in one `unit`, every supported unit converts linearly"""
+    if unit == Qgis.RenderUnit.Pixels:
+        return 1.0  # Déjà en pixels
+    elif unit in [Qgis.RenderUnit.Millimeters, Qgis.RenderUnit.Inches, Qgis.RenderUnit.Points]:
+        return render_context.convertToPainterUnits(1.0, unit)
+    elif unit == Qgis.RenderUnit.MapUnits:
+        if render_context.mapToPixel():
+            return 1.0 / render_context.mapToPixel().mapUnitsPerPixel()  # TODO TEST
         else:
-            raise ValueError("Unknown unit: {}".format(unit))
+            raise ValueError("The render context does not contain a map to pixel transformation.")
+    # elif unit == Qgis.RenderUnit.MetersInMapUnits and False:  # TODO:
+    #     if render_context.mapToPixel():
+    #         pass
+    #     else:
+    #         raise ValueError(
+    #             "The render context does not contain a map to pixel transformation."
+    #         )
+    # elif unit == Qgis.RenderUnit.Percentage and False:  # TODO
+    #     return (value / 100.0) * context.scaleFactor()
+    elif unit == Qgis.RenderUnit.Unknown:
+        raise ValueError("Unknown unit")
+    else:
+        raise ValueError("Unknown unit: {}".format(unit))
+
+
+def convert_measurement_to_pixel(value: any, unit: Qgis.RenderUnit) -> float:
+    if isinstance(value, (list, tuple, numpy.ndarray)):
+        return convert_measurements_to_pixel(value, unit)
+    if unit == Qgis.RenderUnit.Pixels:
+        return value
+    return value * _pixel_factor(unit, _get_render_context())
+
+
+def convert_measurements_to_pixel(
+    values: Union[list[float], numpy.ndarray], unit: Qgis.RenderUnit, dpi: float = None
+) -> Union[list[float], numpy.ndarray]:
+    """
+    Convert many measurements of the same unit to pixels in one pass.
+
+    :param values: a list or a NumPy array of measurements
+    :param unit: the unit of every measurement
+    :param dpi: output DPI, default to the DPI of a default QgsMapSettings
+    :return: a NumPy array if `values` is one, else a list
+    """
+    factor = _pixel_factor(unit, _get_render_context(dpi))
+    if isinstance(values, numpy.ndarray):
+        return values * factor
+    return [value * factor for value in values]
 
 
 def image_to_base64(path: str, qSize: QSize = None) -> str:
@@ -461,24 +549,69 @@ def SVG_to_base64(svg_content: str) -> str:
 
 
 def symbol_to_SVG_base64(symbol: QgsSymbol, qSize: QSize = None) -> str:
-    temp_dir = tempfile.TemporaryDirectory()
-    temp_file = temp_dir.name + "/MarkerSymbol.svg"
     dimension = math.ceil(convert_measurement_to_pixel(symbol.size(), symbol.sizeUnit()))
     size = qSize if qSize else QSize(dimension, dimension)  # Default size if not provided
-    symbol.exportImage(temp_file, "SVG", size)
-    base64_symbol = image_to_base64(temp_file)
-    temp_dir.cleanup()
-    return base64_symbol
+
+    # same SVG as QgsSymbol.exportImage, written to memory instead of a temporary file
+    buffer = QBuffer()
+    buffer.open(QBuffer.OpenModeFlag.WriteOnly)
+    svg_gen = QSvgGenerator()
+    svg_gen.setOutputDevice(buffer)
+    svg_gen.setSize(size)
+    svg_gen.setViewBox(QRect(0, 0, size.height(), size.height()))
+    painter = QPainter()
+    if not painter.begin(svg_gen):
+        raise ValueError("Failed to begin painting on SVG generator.")
+    symbol.drawPreviewIcon(painter, size)
+    painter.end()
+    svg_content = buffer.data()
+    buffer.close()
+    return _render_svg_to_png_base64(svg_content)
 
 
 def svg_content_to_base64(svg_content: str, qSize: QSize) -> str:
-    temp_dir = tempfile.TemporaryDirectory()
-    temp_file = temp_dir.name + "/temp.svg"
-    with open(temp_file, "w", encoding="utf-8") as f:
-        f.write(svg_content)
-    base64_svg = image_to_base64(temp_file, qSize)
-    temp_dir.cleanup()
-    return base64_svg
+    return _render_svg_to_png_base64(QByteArray(svg_content.encode("utf-8")), qSize)
+
+
+def _render_svg_to_png_base64(svg_content: QByteArray, qSize: QSize = None) -> str:
+    """Render SVG content to a PNG, at its own size or stretched to qSize, in base64"""
+    renderer = QSvgRenderer(svg_content)
+    if not renderer.isValid():
+        raise ValueError("Failed to load SVG content.")
+    size = qSize if qSize is not None else renderer.defaultSize()
+    if size.isEmpty():
+        raise ValueError("SVG content has no size.")
+
+    img = QImage(size, QImage.Format.Format_ARGB32_Premultiplied)
+    img.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(img)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    renderer.render(painter, QRectF(0, 0, size.width(), size.height()))
+    painter.end()
+
+    buffer = QBuffer()
+    buffer.open(QBuffer.OpenModeFlag.ReadWrite)
+    img.save(buffer, "PNG")
+    base64_str = base64.b64encode(buffer.data()).decode("utf-8")
+    buffer.close()
+    return base64_str
+
+
+def file_content_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Return the sha256 hex digest of a file, read by blocks to keep memory bounded."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_plugin_data_dir() -> pathlib.Path:
+    """Return the plugin data folder in the active QGIS profile, creating it if needed."""
+    path = pathlib.Path(QgsApplication.qgisSettingsDirPath(), PLUGIN_DATA_DIR_NAME)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
 
 
 def convert_jmap_datetime(jmap_datetime: str) -> datetime:
@@ -508,15 +641,18 @@ def convert_QGIS_text_expression_to_JMap(expression):  # TODO upgrade
     return "".join(new_parts)
 
 
-def convert_jmap_text_mouse_over_expression(text: str) -> str:
-    text = text.replace("{", "{{").replace("}", "}}")
-    text = text.replace("'", "\\'")
+def _compile_jmap_rules(patterns: dict[str, str]) -> tuple[re.Pattern, list]:
+    """Compile the JMap function patterns once, and a regex matching any of them"""
+    any_pattern = re.compile("|".join(patterns.keys()), re.IGNORECASE)
+    rules = [
+        (re.compile(pattern, re.IGNORECASE), replacement)
+        for pattern, replacement in patterns.items()
+    ]
+    return any_pattern, rules
 
-    new_text = text
-    replacement_counter = 0
-    replacements = {}
 
-    patterns = {
+_MOUSE_OVER_PATTERN, _MOUSE_OVER_RULES = _compile_jmap_rules(
+    {
         _PAT_EV: _REPL_MO_EV,  # non formatter group
         _PAT_IFNOTNULL: _REPL_MO_IFNOTNULL,  # formatter groups
         _PAT_IFNULL: _REPL_MO_IFNULL,  # formatter groups
@@ -531,128 +667,99 @@ def convert_jmap_text_mouse_over_expression(text: str) -> str:
         _PAT_ELEMENTID: _REPL_MO_ELEMENTID,
         _PAT_USERNAME: _REPL_MO_USERNAME,
     }
-    # 🔹 **Build a regex that matches any function name in `patterns`**
-    pattern_regex = "|".join(patterns.keys())
+)
+_LABEL_PATTERN, _LABEL_RULES = _compile_jmap_rules(
+    {
+        _PAT_EV: r"\1",  # non formatter group
+        _PAT_IFNOTNULL: "if(attribute({0}), {1}, '')",  # formatter groups
+        _PAT_IFNULL: "if(attribute({0}), '', {1})",  # formatter groups
+    }
+)
+_PLACEHOLDER_PATTERN = re.compile(r"\{\d+\}")
+_PLACEHOLDER_SPLIT_PATTERN = re.compile(r"(\{\d+\})")
 
-    def quote(group) -> str:
-        if not re.search(r"\{\d+\}", group):
-            group = "'{}'".format(group)
-        return group
 
-    # 🔹 **Step 1: Process one match at a time until no more matches are found**
-    while True:
-        match = re.search(pattern_regex, new_text, re.IGNORECASE)
-        if not match:  # No more functions found → stop processing
-            break
-
-        formatted_group = match.group(0)
-        # Apply the corresponding pattern replacement
-        for pattern, replacement in patterns.items():
-            sub_matches = re.search(pattern, formatted_group, re.IGNORECASE)
-            if not sub_matches:
-                continue
-            # quote all non placeholder formatter groups
-            # quoted_group = [quote(group) for grou`p in sub_matches.groups()]
+def _replace_jmap_functions(text: str, any_pattern: re.Pattern, convert) -> tuple[str, list[str]]:
+    """
+    Replace every JMap function call of `text` by a {n} placeholder, n being the index of the
+    converted call in the returned list.
+    One scan replaces every call; another scan is only needed for calls taking a placeholder
+    as argument (e.g. substring(ev(x), 0, 2)), which can only match once their argument is
+    replaced.
+    """
+    replacements = []
 
-            # replacement is quoted if specified in the pattern replacement
-            formatted_group = re.sub(pattern, replacement, formatted_group, flags=re.IGNORECASE)
+    def replace(match: re.Match) -> str:
+        replacements.append(convert(match.group(0)))
+        return "{{{}}}".format(len(replacements) - 1)
 
-        replacements[replacement_counter] = formatted_group
-        key = f"{{{replacement_counter}}}"
-        new_text = new_text.replace(match.group(0), key, 1)  # Replace only the first occurrence
-        replacement_counter += 1
+    while True:
+        replacement_counter = len(replacements)
+        text = any_pattern.sub(replace, text)
+        if len(replacements) == replacement_counter:
+            return text, replacements
 
-    # 🔹 **Step 2: Split the text while keeping placeholders**
-    parts = re.split(r"(\{\d+\})", new_text)
 
-    formatted_parts = []
-    for part in parts:
-        if not bool(part):
-            continue
-        if re.match(r"\{\d+\}", part):
-            formatted_parts.append(part)
-        else:
-            formatted_parts.append("{}".format(part))
+def _format_placeholders(text: str, replacements: list[str]) -> str:
+    # replacements can hold placeholders of the calls they wrap
+    while _PLACEHOLDER_PATTERN.search(text):
+        text = text.format(*replacements)
+    return text
+
 
-    # # 🔹 **Step 3: Join with `+`**
-    # new_text = " + ".join(formatted_parts)
+def _convert_mouse_over_function(function: str) -> str:
+    # Apply the corresponding pattern replacement
+    for pattern, replacement in _MOUSE_OVER_RULES:
+        if pattern.search(function):
+            function = pattern.sub(replacement, function)
+    return function
 
-    # 🔹 **Step 4: Replace placeholders with actual function outputs**
 
-    while re.search(r"\{\d+\}", new_text):
-        new_text = new_text.format(*replacements.values())
+def _convert_label_function(function: str) -> str:
+    def quote(group) -> str:
+        if not _PLACEHOLDER_PATTERN.search(group):
+            group = "'{}'".format(group)
+        return group
 
-    return new_text
+    for pattern, replacement in _LABEL_RULES:
+        sub_matches = pattern.search(function)
+        if not sub_matches:
+            continue
+        # quote all non placeholder formatter groups
+        quoted_group = [quote(group) for group in sub_matches.groups()]
+        # replacement is quoted if specified in the pattern replacement
+        function = pattern.sub(replacement.format(*quoted_group), function)
+    return function
 
 
-def convert_jmap_text_label_expression(text: str) -> str:
+def convert_jmap_text_mouse_over_expression(text: str) -> str:
     text = text.replace("{", "{{").replace("}", "}}")
     text = text.replace("'", "\\'")
 
-    new_text = text
-    replacement_counter = 0
-    replacements = {}
-
-    patterns = {
-        _PAT_EV: r"\1",  # non formatter group
-        _PAT_IFNOTNULL: "if(attribute({0}), {1}, '')",  # formatter groups
-        _PAT_IFNULL: "if(attribute({0}), '', {1})",  # formatter groups
-    }
-
-    # 🔹 **Build a regex that matches any function name in `patterns`**
-    pattern_regex = "|".join(patterns.keys())
-
-    def quote(group) -> str:
-        if not re.search(r"\{\d+\}", group):
-            group = "'{}'".format(group)
-        return group
-
-    # 🔹 **Step 1: Process one match at a time until no more matches are found**
-    while True:
-        match = re.search(pattern_regex, new_text, re.IGNORECASE)
-        if not match:  # No more functions found → stop processing
-            break
-
-        formatted_group = match.group(0)
-        # Apply the corresponding pattern replacement
-        for pattern, replacement in patterns.items():
-            sub_matches = re.search(pattern, formatted_group, re.IGNORECASE)
-            if not sub_matches:
-                continue
-            # quote all non placeholder formatter groups
-            quoted_group = [quote(group) for group in sub_matches.groups()]
+    new_text, replacements = _replace_jmap_functions(
+        text, _MOUSE_OVER_PATTERN, _convert_mouse_over_function
+    )
+    return _format_placeholders(new_text, replacements)
 
-            # replacement is quoted if specified in the pattern replacement
-            formatted_group = re.sub(
-                pattern, replacement.format(*quoted_group), formatted_group, flags=re.IGNORECASE
-            )
 
-        replacements[replacement_counter] = formatted_group
-        key = f"{{{replacement_counter}}}"
-        new_text = new_text.replace(match.group(0), key, 1)  # Replace only the first occurrence
-        replacement_counter += 1
+def convert_jmap_text_label_expression(text: str) -> str:
+    text = text.replace("{", "{{").replace("}", "}}")
+    text = text.replace("'", "\\'")
 
-    # 🔹 **Step 2: Split the text while keeping placeholders**
-    parts = re.split(r"(\{\d+\})", new_text)
+    new_text, replacements = _replace_jmap_functions(text, _LABEL_PATTERN, _convert_label_function)
 
+    # quote the text around the placeholders and join with `+`
     formatted_parts = []
-    for part in parts:
+    for part in _PLACEHOLDER_SPLIT_PATTERN.split(new_text):
         if not bool(part):
             continue
-        if re.match(r"\{\d+\}", part):
+        if _PLACEHOLDER_PATTERN.match(part):
             formatted_parts.append(part)
         else:
             formatted_parts.append("'{}'".format(part))
-
-    # 🔹 **Step 3: Join with `+`**
     new_text = " + ".join(formatted_parts)
 
-    # 🔹 **Step 4: Replace placeholders with actual function outputs**
-
-    while re.search(r"\{\d+\}", new_text):
-        new_text = new_text.format(*replacements.values())
-
-    return new_text
+    return _format_placeholders(new_text, replacements)
 
 
 def convert_pen_style_to_dash_array(pen_style, width) -> list[int]:
@@ -15,6 +15,7 @@ from .export_project_manager import ExportProjectManager
 from .files_manager import DatasourceManager, FilesUploadManager, FileUploader
 from .import_project_manager import ImportProjectManager
 from .jmap_services_access import JMapDAS, JMapMCS, JMapMIS
+from .request_future import RequestFuture
 from .request_manager import RequestManager
 from .session_manager import SessionManager
 from .style_manager import StyleManager
@@ -28,6 +29,7 @@ __all__ = [
     "ImportProjectManager",
     "StyleManager",
     "RequestManager",
+    "RequestFuture",
     "SessionManager",
     "JMapMCS",
     "JMapMIS",
@@ -18,6 +18,7 @@ from ..constant import ACCESS_TOKEN_SETTING_ID, API_AUTH_URL, REFRESH_TOKEN_SETT
 from ..plugin_util import convert_jmap_datetime, time_now
 from ..qgs_message_bar_handler import Qgis, QgsMessageBarHandler
 from ..recurring_event import RecurringEvent
+from .request_future import RequestFuture
 from .request_manager import RequestManager
 from .session_manager import SessionManager
 
@@ -28,7 +29,7 @@ class JMapAuth(QObject):
     def __init__(self, session_manager: SessionManager, request_manager: RequestManager):
         super().__init__()
         self._refresh_auth_event = RecurringEvent(
-            interval=240, callback=self.refresh_auth_settings, call_on_first_run=True
+            interval=240, callback=self.refresh_auth_settings_async, call_on_first_run=True
         )
         self._session_manager = session_manager
         self._request_manager = request_manager
@@ -43,11 +44,12 @@ class JMapAuth(QObject):
         """
         return convert_jmap_datetime(token_expiration) < time_now()
 
-    def get_auth_state(self) -> AuthState:
+    def get_auth_state_async(self) -> RequestFuture:
         """
-        Get the current authentication state of the JMap user and refresh the token if needed.
+        Get the current authentication state of the JMap user and refresh the token if needed,
+        without blocking.
 
-        :return: One of the following enum values:
+        :return: The future of one of the following enum values:
             NOT_AUTHENTICATED: The user is not authenticated.
             NO_ORGANIZATION: The user is authenticated but has no organization.
             AUTHENTICATED: The user is authenticated and has an organization.
@@ -55,29 +57,39 @@ class JMapAuth(QObject):
         claims = self._session_manager.get_auth_settings()
         if not claims["accessToken"] or not claims["refreshToken"] or not claims["expiration"]:
             self.logout()
-            return AuthState.NOT_AUTHENTICATED
+            return RequestFuture.resolved(AuthState.NOT_AUTHENTICATED)
 
+        claims_future = RequestFuture.resolved(claims)
         if self._is_token_expired(claims["expiration"]):
             QgsApplication.authManager().storeAuthSetting(ACCESS_TOKEN_SETTING_ID, "", True)
             if not claims["organizationId"]:
                 self.logout()
-                return AuthState.NOT_AUTHENTICATED
+                return RequestFuture.resolved(AuthState.NOT_AUTHENTICATED)
+            claims_future = self.refresh_auth_settings_async(claims=claims)
+
+        def get_state(claims: dict) -> AuthState:
+            if not claims["organizationId"]:
+                return AuthState.NO_ORGANIZATION
+            return AuthState.AUTHENTICATED
 
-            claims = self.refresh_auth_settings(claims=claims)
+        def check_claims(claims: dict):
             if not claims:
                 self.logout()
                 return AuthState.NOT_AUTHENTICATED
+            if not claims["username"]:
 
-        if not claims["username"]:
-            # update claims reference
-            claims["username"] = self.get_user_self()["name"]
+                def set_username(user: dict) -> AuthState:
+                    # update claims reference
+                    if user is not None:
+                        claims["username"] = user["name"]
+                    return get_state(claims)
 
-        if not claims["organizationId"]:
-            return AuthState.NO_ORGANIZATION
+                return self.get_user_self_async().then(set_username)
+            return get_state(claims)
 
-        return AuthState.AUTHENTICATED
+        return claims_future.then(check_claims)
 
-    def refresh_auth_settings(self, org_id: str = None, claims: dict = None) -> dict:
+    def refresh_auth_settings_async(self, org_id: str = None, claims: dict = None) -> RequestFuture:
         """
         Refresh the JMap authentication settings using the provided organization ID and claims.
 
@@ -86,93 +98,105 @@ class JMapAuth(QObject):
         :param claims:
             An optional dictionary containing current authentication claims.
         :return:
-            A dictionary with updated authentication claims if the refresh is successful,
-            otherwise None.
+            The future of a dictionary with updated authentication claims if the refresh is
+            successful, otherwise of None.
         """
         if claims is None:
             claims = self._session_manager.get_auth_settings()
         if org_id:
             claims["organizationId"] = org_id
         elif "organizationId" not in claims:
-            return None
+            return RequestFuture.resolved(None)
 
         url = "{}/refresh-token".format(API_AUTH_URL)
         body = {
             "refreshToken": "{}".format(claims["refreshToken"]),
             "organizationId": claims["organizationId"],
         }
-        prefix = "Authentication Error"
-        response = self._request_manager.post_request(url, body, error_prefix=prefix, no_auth=True)
-        if response.status == QNetworkReply.NetworkError.NoError:
-            content = response.content
-            claims = {
-                "accessToken": content["accessToken"],
-                "refreshToken": content["refreshToken"],
-                "expiration": content["accessTokenExpireAt"],
-                "organizationId": claims["organizationId"],
-                "username": claims["username"],
-            }
-            # ----- setup Authentication_config ------
-            self._session_manager.store_auth_settings(
-                access_token=content["accessToken"],
-                refresh_token=content["refreshToken"],
-                expiration=content["accessTokenExpireAt"],
-                organization_id=claims["organizationId"],
-            )
-            self._session_manager.set_claims(claims)
-            return claims
-        elif response.status != QNetworkReply.NetworkError.UnknownNetworkError:
-            self.logout(response.content["message"])
-            return None
-        else:
+        request = RequestManager.RequestData(
+            url, body=body, type="POST", no_auth=True, priority=RequestManager.Priority.interactive
+        )
+
+        def on_response(response: RequestManager.ResponseData) -> dict:
+            if response.status == QNetworkReply.NetworkError.NoError:
+                content = response.content
+                new_claims = {
+                    "accessToken": content["accessToken"],
+                    "refreshToken": content["refreshToken"],
+                    "expiration": content["accessTokenExpireAt"],
+                    "organizationId": claims["organizationId"],
+                    "username": claims["username"],
+                }
+                # ----- setup Authentication_config ------
+                self._session_manager.store_auth_settings(
+                    access_token=content["accessToken"],
+                    refresh_token=content["refreshToken"],
+                    expiration=content["accessTokenExpireAt"],
+                    organization_id=claims["organizationId"],
+                )
+                self._session_manager.set_claims(new_claims)
+                return new_claims
+            elif response.status not in (
+                QNetworkReply.NetworkError.UnknownNetworkError,
+                QNetworkReply.NetworkError.OperationCanceledError,
+            ):
+                self.logout(response.content["message"])
             return None
 
-    def get_access_token(self, email: str, password: str) -> str:
+        return self._request_manager.request(request).then(on_response)
+
+    def get_access_token_async(self, email: str, password: str) -> RequestFuture:
         """
         Get an access token for the given email and password.
 
         :param email: The email of a JMap account
         :param password: The password of the JMap account
-        :return: An access token if the authentication is successful, otherwise None
+        :return: The future of an access token if the authentication is successful,
+            otherwise of None
         """
 
         url = "{}/authenticate".format(API_AUTH_URL)
         body = {"username": email, "password": password}
-        prefix = "Authentication Error"
-        response = self._request_manager.post_request(url, body, error_prefix=prefix, no_auth=True)
-
-        if response.status == QNetworkReply.NetworkError.NoError:
-            content = response.content
-            # ----- setup Authentication_config ------
-            self._session_manager.store_auth_settings(
-                access_token=content["accessToken"],
-                refresh_token=content["refreshToken"],
-                expiration=content["accessTokenExpireAt"],
-            )
+        request = RequestManager.RequestData(
+            url, body=body, type="POST", no_auth=True, priority=RequestManager.Priority.interactive
+        )
 
-            return content["accessToken"]
-        else:
-            return None
+        def on_response(response: RequestManager.ResponseData) -> str:
+            if response.status == QNetworkReply.NetworkError.NoError:
+                content = response.content
+                # ----- setup Authentication_config ------
+                self._session_manager.store_auth_settings(
+                    access_token=content["accessToken"],
+                    refresh_token=content["refreshToken"],
+                    expiration=content["accessTokenExpireAt"],
+                )
+
+                return content["accessToken"]
+            else:
+                return None
+
+        return self._request_manager.request(request).then(on_response)
 
-    def get_user_self(self) -> dict:
+    def get_user_self_async(self) -> RequestFuture:
         """
-        Get the user associated with the given access token.
+        Get the user associated with the stored access token.
 
-        :param access_token:
-            An access token obtained by calling self.get_access_token
         :return:
-            A dictionary with the user information and all his organization ids
-            if the request is successful, otherwise None
+            The future of a dictionary with the user information and all his organization ids
+            if the request is successful, otherwise of None
         """
         url = "{}/users/self".format(API_AUTH_URL)
-        prefix = "Authentication Error"
-        response = self._request_manager.get_request(url, error_prefix=prefix)
+        request = RequestManager.RequestData(url, priority=RequestManager.Priority.interactive)
 
-        if response.status == QNetworkReply.NetworkError.NoError:
-            self._session_manager.store_auth_settings(username=response.content["name"])
-            return response.content
-        else:
-            return None
+        def on_response(response: RequestManager.ResponseData) -> dict:
+            if response.status == QNetworkReply.NetworkError.NoError:
+                self._session_manager.store_auth_settings(username=response.content["name"])
+                return response.content
+            else:
+                return None
+
+        prefix = "Authentication Error"
+        return self._request_manager.request(request, error_prefix=prefix).then(on_response)
 
     def logout(self, error_message: str = None) -> None:
         """
@@ -194,11 +218,14 @@ class JMapAuth(QObject):
             or None
         )
         if refresh_token:
+            # the session is revoked locally without waiting for the server
             url = "{}/revoke-token".format(API_AUTH_URL)
             body = {"refreshToken": refresh_token}
-            prefix = self.tr("Logout Error")
-            self._request_manager.post_request(url, body, error_prefix=prefix, no_auth=True)
+            request = RequestManager.RequestData(url, body=body, type="POST", no_auth=True)
+            self._request_manager.request(request)
         self._session_manager.revoke_session()
+        # the cached responses of the user must not outlive the session
+        self._request_manager.clear_response_cache()
         self.logged_out_signal.emit()
 
     def get_refresh_auth_event(self) -> RecurringEvent:
@@ -209,23 +236,26 @@ class JMapAuth(QObject):
         """
         return self._refresh_auth_event
 
-    def get_member_self(self) -> dict:
+    def get_member_self_async(self) -> RequestFuture:
         """
-        Get the member associated with the given access token.
+        Get the member associated with the stored access token.
 
         :return:
-            A dictionary with the member information and all his organization ids
-            if the request is successful, otherwise None
+            The future of a dictionary with the member information and all his organization ids
+            if the request is successful, otherwise of None
         """
         organization_id = self._session_manager.get_organization_id()
         if organization_id is None:
-            return None
+            return RequestFuture.resolved(None)
 
         url = "{}/organizations/{}/members/self".format(API_AUTH_URL, organization_id)
-        prefix = "Unable to retrieve member information"
-        response = self._request_manager.get_request(url, error_prefix=prefix)
+        request = RequestManager.RequestData(url, priority=RequestManager.Priority.interactive)
 
-        if response.status == QNetworkReply.NetworkError.NoError:
-            return response.content
-        else:
-            return None
+        def on_response(response: RequestManager.ResponseData) -> dict:
+            if response.status == QNetworkReply.NetworkError.NoError:
+                return response.content
+            else:
+                return None
+
+        prefix = "Unable to retrieve member information"
+        return self._request_manager.request(request, error_prefix=prefix).then(on_response)
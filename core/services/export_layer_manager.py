@@ -5,6 +5,7 @@ from qgis.core import Qgis, QgsApplication, QgsFeedback, QgsMessageLog, QgsProje
 from qgis.PyQt.QtCore import QObject, pyqtSignal
 
 from ...ui.py_files.action_dialog import ActionDialog
+from ..plugin_util import refresh_mean_latitude_project
 from ..tasks.create_layer_task import CreateLayerTask
 from ..tasks.export_layer_style_task import ExportLayerStyleTask
 from ..tasks.load_jmc_datasource_references_task import LoadJMCDataSourceReferencesTask
@@ -79,6 +80,8 @@ class ExportLayerManager(QObject):
         self._feedback.canceled.connect(self._on_cancel)
         self._current_step = 0
         self._errors = []
+        # computed once here, on the main thread, for every zoom conversion of the export tasks
+        refresh_mean_latitude_project()
 
         self._convert_layer_to_zip(organisation_id, export_selected_layer_data)
 
@@ -190,7 +193,12 @@ class ExportLayerManager(QObject):
         self._action_dialog.set_text(self.tr("Creating datasource"))
 
         datasource_manager = DatasourceManager(
-            self._request_manager, [layer_data], organisation_id, export_selected_layer_data.mode
+            self._request_manager,
+            [layer_data],
+            organisation_id,
+            export_selected_layer_data.mode,
+            # an unchanged file already exported to this project reuses its datasource
+            export_selected_layer_data.JMC_project.project_id,
         )
 
         def next_step(layers_data):
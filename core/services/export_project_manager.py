@@ -15,7 +15,12 @@ from qgis.core import Qgis, QgsApplication, QgsMessageLog
 from qgis.PyQt.QtCore import QObject, pyqtSignal
 
 from ...ui.py_files.action_dialog import ActionDialog
-from ..tasks.create_jmc_project_task import CreateJMCProjectTask
+from ..plugin_util import refresh_mean_latitude_project
+from ..tasks.create_jmc_project_task import (
+    CreateJMCLayersTask,
+    CreateJMCProjectTask,
+    UpdateJMCLayerTreeTask,
+)
 from ..tasks.export_layer_style_task import ExportLayersStyleTask
 from ..tasks.write_layer_tasks import ConvertLayersToZipTask
 from ..views import LayerData, LayerFile, ProjectData
@@ -53,6 +58,8 @@ class ExportProjectManager(QObject):
             self.action_dialog.progress_info_label.setText(self.tr("Initializing loading"))
             self.action_dialog.set_cancelable_mode(self.tr("<h3>Project exportation canceled</h3>"))
             self.feedback.canceled.connect(self.cancel)
+            # computed once here, on the main thread, for every zoom conversion of the export tasks
+            refresh_mean_latitude_project()
             self._convert_layer_to_zip()
         else:
             self.action_dialog.show()
@@ -82,6 +89,13 @@ class ExportProjectManager(QObject):
         convert_layer_to_zip_task.start()
 
     def _upload_layer_files(self, layers_data: list[LayerData], layer_files: list[LayerFile]):
+        """
+        Export the layers as a per-layer pipeline: each layer moves to its next stage as soon as
+        its own previous stage is done, instead of waiting for every layer of the project.
+        Its file is uploaded, its datasource created, then it is added to the project, created
+        with the first ready layer, and its style is exported. The layer tree of the project is
+        set once every layer is created.
+        """
         if self._cancel:
             return
 
@@ -89,99 +103,189 @@ class ExportProjectManager(QObject):
             self._finish(False)
             return
         self.current_step += 1
+        self._upload_step = self.current_step
+        self._layers_count = len(layers_data)
+        self._project_state = None  # None, "CREATING", "CREATED" or "FAILED"
+        self._layers_waiting_project: list[LayerData] = []
+        self._layers_in_creation = 0
+        self._created_layers: list[LayerData] = []
+        self._datasources_completed = False
+        self._style_exports = 0
+        self._styles_exported = 0
+        self._layer_tree_updated = False
         self.action_dialog.set_text(self.tr("Uploading layers files"))
         files_upload_manager = FilesUploadManager(
             self._request_manager, layers_data, layer_files, self.project_data.organization_id
         )
+        datasource_manager = DatasourceManager(
+            self._request_manager, layers_data, self.project_data.organization_id
+        )
+        self._pipeline_managers = [files_upload_manager, datasource_manager]
+
+        def layers_ready(ready_layers_data):
+            if self._cancel:
+                return
+            uploaded = self._error_handler(ready_layers_data, self.tr("Upload layer files"))
+            datasource_manager.discard_layers(
+                [layer_data for layer_data in ready_layers_data if layer_data not in uploaded]
+            )
+            self._set_step(self._upload_step + 1, self.tr("Creating datasources"))
+            datasource_manager.add_layers(uploaded)
 
-        def next_step(layers_data):
-            self._create_datasource(self._error_handler(layers_data, self.tr("Upload layer files")))
+        def files_uploaded(_layers_data):
+            self.dir.cleanup()
+
+        def datasources_created(_layers_data):
+            self._datasources_completed = True
+            self._check_layers_created()
+
+        def set_progress(value, step):
+            if self.current_step == step:
+                self._set_progress(value, step)
 
         files_upload_manager.progress_changed.connect(
-            lambda value, current_step=self.current_step: self._set_progress(value, current_step)
+            lambda value: set_progress(value, self._upload_step)
         )
         files_upload_manager.step_title_changed.connect(self.action_dialog.set_text)
         files_upload_manager.error_occurred.connect(self.errors.append)
-        files_upload_manager.tasks_completed.connect(next_step)
+        files_upload_manager.layers_ready.connect(layers_ready)
+        files_upload_manager.tasks_completed.connect(files_uploaded)
         self.feedback.canceled.connect(files_upload_manager.cancel)
-        files_upload_manager.run()
-
-    def _create_datasource(self, layers_data: list[LayerData]):
-        if self._cancel:
-            return
-        self.dir.cleanup()
-        if len(layers_data) == 0:
-            self._finish(False)
-            return
 
-        self.current_step += 1
-        self.action_dialog.set_text(self.tr("Creating datasources"))
-
-        datasource_manager = DatasourceManager(
-            self._request_manager, layers_data, self.project_data.organization_id
-        )
-
-        def next_step(layers_data):
-            self._create_jmc_project(self._error_handler(layers_data, self.tr("Create datasource")))
-
-        datasource_manager.tasks_completed.connect(next_step)
         datasource_manager.progress_changed.connect(
-            lambda value, current_step=self.current_step: self._set_progress(value, current_step)
+            lambda value: set_progress(value, self._upload_step + 1)
         )
         datasource_manager.error_occurred.connect(self.errors.append)
         datasource_manager.step_title_changed.connect(self.action_dialog.set_text)
+        datasource_manager.layers_ready.connect(self._on_datasources_ready)
+        datasource_manager.tasks_completed.connect(datasources_created)
         self.feedback.canceled.connect(datasource_manager.cancel)
 
-        datasource_manager.run()
+        files_upload_manager.run()
+
+    def _set_step(self, step: int, text: str):
+        """show the furthest stage reached by a layer of the pipeline"""
+        if step > self.current_step:
+            self.current_step = step
+            self.action_dialog.set_text(text)
 
-    def _create_jmc_project(self, layers_data: list[LayerData]):
-        if self._cancel:
+    def _on_datasources_ready(self, layers_data: list[LayerData]):
+        if self._cancel or self._project_state == "FAILED":
             return
-        if len(layers_data) == 0:
-            self._finish(False)
+        layers_data = self._error_handler(layers_data, self.tr("Create datasource"))
+        if self._project_state == "CREATED":
+            self._create_jmc_layers(layers_data)
             return
+        self._layers_waiting_project.extend(layers_data)
+        if self._project_state is None and len(layers_data) > 0:
+            self._create_jmc_project()
+
+    def _create_jmc_project(self):
+        """create the project when its first layer is ready, so no empty project is left"""
+        self._project_state = "CREATING"
+        self._set_step(self._upload_step + 2, self.tr("Creating JMap Cloud project"))
+        create_project_task = CreateJMCProjectTask(self._jmap_mcs, self.project_data)
+
+        def next_step(created: bool):
+            if self._cancel:
+                return
+            if not created:
+                self._project_state = "FAILED"
+                for manager in self._pipeline_managers:
+                    manager.cancel()
+                self.dir.cleanup()
+                self._finish(False)
+                return
+            self._project_state = "CREATED"
+            layers_data, self._layers_waiting_project = self._layers_waiting_project, []
+            self._create_jmc_layers(layers_data)
 
-        self.current_step += 1
-        self.action_dialog.set_text(self.tr("Creating JMap Cloud project"))
+        create_project_task.project_creation_finished.connect(next_step)
+        create_project_task.error_occurred.connect(self.errors.append)
+        self.feedback.canceled.connect(create_project_task.cancel)
+        self.task_manager.addTask(create_project_task)
 
-        create_project_task = CreateJMCProjectTask(
-            self._request_manager, self._jmap_mcs, layers_data, self.project_data
+    def _create_jmc_layers(self, layers_data: list[LayerData]):
+        if len(layers_data) == 0:
+            self._check_layers_created()
+            return
+        self._layers_in_creation += len(layers_data)
+        create_layers_task = CreateJMCLayersTask(
+            self._request_manager, layers_data, self.project_data
         )
 
         def next_step(layers_data):
-            self._export_style(
-                self._error_handler(layers_data, self.tr("Create JMap Cloud project"))
+            if self._cancel:
+                return
+            self._layers_in_creation -= len(layers_data)
+            created = self._error_handler(layers_data, self.tr("Create JMap Cloud project"))
+            self._created_layers.extend(created)
+            self._set_progress(
+                len(self._created_layers) / self._layers_count * 100, self._upload_step + 2
             )
+            self._export_style(created)
+            self._check_layers_created()
+
+        create_layers_task.layers_creation_finished.connect(next_step)
+        create_layers_task.error_occurred.connect(self.errors.append)
+        self.feedback.canceled.connect(create_layers_task.cancel)
+        self.task_manager.addTask(create_layers_task)
+
+    def _check_layers_created(self):
+        """set the layer tree of the project once every layer went through the pipeline"""
+        if (
+            self._cancel
+            or self._project_state == "FAILED"
+            or not self._datasources_completed
+            or self._layers_in_creation > 0
+            or self._project_state == "CREATING"
+        ):
+            return
+        if len(self._created_layers) == 0:
+            self._finish(False)
+            return
 
-        create_project_task.project_creation_finished.connect(next_step)
-        create_project_task.error_occurred.connect(self.errors.append)
-        create_project_task.progressChanged.connect(
-            lambda value, current_step=self.current_step: self._set_progress(value, current_step)
+        update_layer_tree_task = UpdateJMCLayerTreeTask(
+            self._request_manager, self._created_layers, self.project_data
         )
-        self.feedback.canceled.connect(create_project_task.cancel)
-        self.task_manager.addTask(create_project_task)
+
+        def next_step():
+            self._layer_tree_updated = True
+            self._check_finished()
+
+        update_layer_tree_task.layer_tree_update_finished.connect(next_step)
+        update_layer_tree_task.error_occurred.connect(self.errors.append)
+        self.feedback.canceled.connect(update_layer_tree_task.cancel)
+        self.task_manager.addTask(update_layer_tree_task)
 
     def _export_style(self, layers_data: list[LayerData]):
-        if self._cancel:
-            return
-        if len(layers_data) == 0:
-            self._finish(False)
+        if self._cancel or len(layers_data) == 0:
             return
 
-        self.current_step += 1
-        self.action_dialog.set_text(self.tr("Exporting layer styles"))
-
+        self._set_step(self._upload_step + 3, self.tr("Exporting layer styles"))
+        self._style_exports += 1
         export_layer_styles_task = ExportLayersStyleTask(
             self._request_manager, layers_data, self.project_data
         )
-        export_layer_styles_task.layer_styles_exportation_finished.connect(self._finish)
+
+        def next_step():
+            self._style_exports -= 1
+            self._styles_exported += len(layers_data)
+            self._set_progress(
+                self._styles_exported / self._layers_count * 100, self._upload_step + 3
+            )
+            self._check_finished()
+
+        export_layer_styles_task.layer_styles_exportation_finished.connect(next_step)
         export_layer_styles_task.error_occurred.connect(self.errors.append)
-        export_layer_styles_task.progressChanged.connect(
-            lambda value, current_step=self.current_step: self._set_progress(value, current_step)
-        )
         self.feedback.canceled.connect(export_layer_styles_task.cancel)
         self.task_manager.addTask(export_layer_styles_task)
 
+    def _check_finished(self):
+        if self._cancel or not self._layer_tree_updated or self._style_exports > 0:
+            return
+        self._finish()
+
     def _error_handler(self, layers_data: list[LayerData], step_string: str) -> list[LayerData]:
         success: list[LayerData] = []
         file_error: list[LayerData] = []
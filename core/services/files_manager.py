@@ -12,31 +12,61 @@
 
 import base64
 import math
+import time
 from pathlib import Path
 from typing import Union
 
-from qgis.PyQt.QtCore import QTimer
+from qgis.core import Qgis, QgsApplication, QgsMessageLog, QgsTask
+from qgis.PyQt.QtCore import QFile, QIODevice, pyqtSignal
 from qgis.PyQt.QtNetwork import QNetworkReply
 
 from ..constant import API_FUS_URL, API_MCS_URL
 from ..DTOS.datasource_dto import CreateDatasourceDTO, UpdateDatasourceDTO
-from ..plugin_util import convert_crs_to_epsg
-from ..recurring_event import RecurringEvent
+from ..plugin_util import convert_crs_to_epsg, file_content_hash
 from ..tasks.custom_qgs_task import CustomTaskManager
 from ..views import ExportSelectedLayerData, LayerData, LayerFile, SupportedFileType
+from .request_future import RequestFuture
 from .request_manager import RequestManager
-
-CHUNK_SIZE = 1024 * 1024 * 5  # 5MB
+from .upload_cache import UploadCache
+from .upload_journal import UploadJournal
+
+CHUNK_SIZE = 1024 * 1024 * 5  # 5MB, first chunk size of every upload
+MIN_CHUNK_SIZE = 1024 * 1024 * 1  # 1MB
+MAX_CHUNK_SIZE = 1024 * 1024 * 64  # 64MB
+TARGET_CHUNK_DURATION = 2.0  # seconds, chunk size is adapted to keep PATCHes around this duration
+CHUNKS_IN_FLIGHT = 4  # per file, without TUS concatenation a file is sent one chunk at a time
+# chunk failures after the retries of the RequestManager, the chunk is halved after each one
+MAX_CHUNK_FAILURES = 3
 MESSAGE_CATEGORY = "FilesUploadManager"
 
 
+def _find_header(headers: Union[dict, None], name: str) -> Union[str, None]:
+    """Case-insensitive lookup in response headers"""
+    for header, value in (headers or {}).items():
+        if header.lower() == name.lower():
+            return value
+    return None
+
+
 class FilesUploadManager(CustomTaskManager):
+    """
+    Upload the files of the exported layers and wait for the server to analyze them.
+
+    `layers_ready` is emitted with the layers of each file as soon as that file is analyzed
+    (or failed), so the next export stage does not have to wait for the slowest file.
+    `tasks_completed` is still emitted once every file is done.
+    """
+
+    layers_ready = pyqtSignal(list)
+
     def __init__(
         self,
         request_manager: RequestManager,
         layers_data: list[LayerData],
         layer_files: list[LayerFile],
         organization_id: str,
+        chunks_in_flight: int = CHUNKS_IN_FLIGHT,
+        chunk_size_bounds: tuple[int, int] = (MIN_CHUNK_SIZE, MAX_CHUNK_SIZE),
     ):
         super().__init__("FilesUploadManager")
         self.layers_data: list[LayerData] = layers_data
@@ -44,24 +74,61 @@ class FilesUploadManager(CustomTaskManager):
         self.files_to_analyze: list[str] = []
         self.file_uploaders: list[FileUploader] = []
         self.organization_id = organization_id
+        self.chunks_in_flight = chunks_in_flight
+        self.chunk_size_bounds = chunk_size_bounds
         self._num_file_uploaded = 0
         self.progress = [0] * len(layer_files)
         self.total_steps = len(self.layer_files)
         self._request_manager = request_manager
         self._cancel = False
+        self._poll_ids: list[str] = []
 
     def run(self):
         if self._cancel:
             return False
 
         self.set_total_steps(len(self.layer_files))
+        layers_without_file = [
+            layer_data for layer_data in self.layers_data if layer_data.layer_file is None
+        ]
+        if len(layers_without_file) > 0:
+            self.layers_ready.emit(layers_without_file)
         if len(self.layer_files) == 0:
             self.progress_changed.emit(100.0)
             self.tasks_completed.emit(self.layers_data)
             return True
         self.step_title_changed.emit(self.tr("Uploading layers files"))
+        if self.chunks_in_flight > 1:
+            self.get_tus_extensions_async().then(
+                lambda extensions: self._start_uploads("concatenation" in extensions)
+            )
+        else:
+            self._start_uploads(False)
+        return True
+
+    def _start_uploads(self, concatenation_supported: bool):
+        if self._cancel:
+            return
+        if self.chunks_in_flight > 1 and not concatenation_supported:
+            QgsMessageLog.logMessage(
+                "The upload server does not support TUS concatenation, "
+                "files are uploaded one chunk at a time",
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
+        upload_journal = UploadJournal()
+        upload_cache = UploadCache()
         for i, layer_file in enumerate(self.layer_files):
-            file_uploader = FileUploader(self._request_manager, layer_file, self.organization_id)
+            file_uploader = FileUploader(
+                self._request_manager,
+                layer_file,
+                self.organization_id,
+                self.chunks_in_flight,
+                concatenation_supported,
+                self.chunk_size_bounds,
+                upload_journal,
+                upload_cache,
+            )
 
             def error_occurred(error_message, layer_file=layer_file):
                 layer_file.upload_status = LayerFile.Status.uploading_error
@@ -80,79 +147,117 @@ class FilesUploadManager(CustomTaskManager):
                 lambda progress, ref=i: progress_changed(progress, ref)
             )
 
-            def next_func(jmc_file_id):
-                self.is_all_files_uploaded(jmc_file_id)
+            def next_func(jmc_file_id, layer_file=layer_file):
+                self.is_all_files_uploaded(jmc_file_id, layer_file)
 
             file_uploader.tasks_completed.connect(next_func)
             self.file_uploaders.append(file_uploader)
             file_uploader.init_upload()
-        return True
+
+    def get_tus_extensions_async(self) -> RequestFuture:
+        """Ask the upload server which TUS extensions it supports"""
+        url = "{}/organizations/{}/upload".format(API_FUS_URL, self.organization_id)
+        request = RequestManager.RequestData(url, {"Tus-Resumable": "1.0.0"}, type="OPTIONS")
+
+        def read_extensions(response: RequestManager.ResponseData) -> list[str]:
+            if response.status != QNetworkReply.NetworkError.NoError:
+                return []
+            extensions = _find_header(response.headers, "Tus-Extension")
+            if not extensions:
+                return []
+            return [extension.strip() for extension in extensions.split(",")]
+
+        return self._request_manager.request(request).then(read_extensions)
 
     def cancel(self):
         self._cancel = True
         for file_uploader in self.file_uploaders:
             file_uploader.cancel()
+        for poll_id in self._poll_ids:
+            self._request_manager.poll_scheduler.cancel(poll_id)
 
-    def is_all_files_uploaded(self, jmc_file_id: str):
+    def is_all_files_uploaded(self, jmc_file_id: str, layer_file: LayerFile = None):
+        if self._cancel:
+            return
         self._num_file_uploaded += 1
-        if jmc_file_id:
+        if jmc_file_id and layer_file.upload_status == LayerFile.Status.no_error:
             self.files_to_analyze.append(jmc_file_id)
-        if self._num_file_uploaded == len(self.layer_files) and not self._cancel:
-            self._num_file_uploaded = 0
+            self._poll_file_analyzer(jmc_file_id)
+        else:
+            self._emit_layers_ready(layer_file)
+        if self._num_file_uploaded == len(self.layer_files):
             self.file_uploaders = []
             if len(self.files_to_analyze) == 0:
+                self._num_file_uploaded = 0
                 self.tasks_completed.emit(self.layers_data)
             else:
-                self.start_poking_jmc_file_analyzers()
-
-    def start_poking_jmc_file_analyzers(self):
-        self.step_title_changed.emit(self.tr("Server is analyzing files"))
-
-        def is_file_analyzed(response: RequestManager.ResponseData, jmc_file_id: str):
+                self.step_title_changed.emit(self.tr("Server is analyzing files"))
+
+    def _emit_layers_ready(self, layer_file: LayerFile):
+        if layer_file is None:
+            return
+        layers_data = [
+            layer_data for layer_data in self.layers_data if layer_data.layer_file is layer_file
+        ]
+        if len(layers_data) > 0:
+            self.layers_ready.emit(layers_data)
+
+    def _find_layer_file(self, jmc_file_id: str) -> Union[LayerFile, None]:
+        for layer_file in self.layer_files:
+            if layer_file.jmc_file_id == jmc_file_id:
+                return layer_file
+        return None
+
+    def _poll_file_analyzer(self, jmc_file_id: str):
+        def is_file_analyzed(response: RequestManager.ResponseData) -> bool:
+            if self._cancel:
+                return True
+            layer_file = self._find_layer_file(jmc_file_id)
             if (
                 not bool(response.content)
                 or "status" not in response.content
                 or response.content["status"] in ["UPLOADING", "ERROR"]
             ):
-                for layer_file in self.layer_files:
-                    if layer_file.jmc_file_id == jmc_file_id:
-                        layer_file.upload_status = LayerFile.Status.uploading_error
-                        break
-                self.files_to_analyze.remove(jmc_file_id)
+                if layer_file is not None:
+                    layer_file.upload_status = LayerFile.Status.uploading_error
             elif response.content["status"] == "ANALYZED":
-                for layer_file in self.layer_files:
-                    if layer_file.jmc_file_id == jmc_file_id:
-                        if layer_file.file_type != SupportedFileType.raster:
-                            for layer in response.content["metadata"]["layers"]:
-                                layer_file.fields[layer["name"]] = layer["fileAttributes"]
-                        break
-                self.files_to_analyze.remove(jmc_file_id)
-            if len(self.files_to_analyze) == 0 and not self._cancel:
-                self.recurring_event.stop()
-                self._num_file_uploaded = 0
-                self.tasks_completed.emit(self.layers_data)
-
-        def poke_all_not_analyzed_files():
-            if self._cancel:
-                self.recurring_event.stop()
-
-            for jmc_file_id in self.files_to_analyze:
-                url = "{}/organizations/{}/files/{}".format(
-                    API_FUS_URL, self.organization_id, jmc_file_id
-                )
-                request = RequestManager.RequestData(url, type="GET", id=jmc_file_id)
-
-                def next_func(response, _jmc_file_id=jmc_file_id):
-                    is_file_analyzed(response, _jmc_file_id)
+                if layer_file is not None and layer_file.file_type != SupportedFileType.raster:
+                    for layer in response.content["metadata"]["layers"]:
+                        layer_file.fields[layer["name"]] = layer["fileAttributes"]
+            else:
+                return False
+            self._on_file_analyzed(jmc_file_id)
+            return True
 
-                self._request_manager.add_requests(request).connect(next_func)
+        url = "{}/organizations/{}/files/{}".format(API_FUS_URL, self.organization_id, jmc_file_id)
+        self._poll_ids.append(
+            self._request_manager.poll_scheduler.poll(
+                url, is_file_analyzed, lambda: self.timeout(jmc_file_id)
+            )
+        )
 
-        self.recurring_event = RecurringEvent(2.5, poke_all_not_analyzed_files, False, 200)
-        self.recurring_event.call_count_exceeded.connect(self.timeout)
-        self.recurring_event.start()
+    def _on_file_analyzed(self, jmc_file_id: str):
+        self.files_to_analyze.remove(jmc_file_id)
+        self._emit_layers_ready(self._find_layer_file(jmc_file_id))
+        if (
+            len(self.files_to_analyze) == 0
+            and self._num_file_uploaded == len(self.layer_files)
+            and not self._cancel
+        ):
+            self._num_file_uploaded = 0
+            self.tasks_completed.emit(self.layers_data)
 
-    def timeout(self):
-        pass
+    def timeout(self, jmc_file_id: str):
+        if self._cancel:
+            return
+        self.error_occur(
+            self.tr("Timed out waiting for the server to analyze file {}").format(jmc_file_id),
+            MESSAGE_CATEGORY,
+        )
+        layer_file = self._find_layer_file(jmc_file_id)
+        if layer_file is not None:
+            layer_file.upload_status = LayerFile.Status.uploading_error
+        self._on_file_analyzed(jmc_file_id)
 
 
 class FileUploader(CustomTaskManager):
@@ -160,13 +265,29 @@ class FileUploader(CustomTaskManager):
     Send a list of requests and wait for all responses.
     This class is used to upload a file in chunks.
     Multiple instances of this class will upload multiple files in parallel.
+    When the server supports the TUS concatenation extension, the file is split in
+    `chunks_in_flight` partial uploads sent in parallel and merged by a final upload.
+    The chunk size starts at CHUNK_SIZE and follows the measured throughput of each
+    PATCH, within `chunk_size_bounds`.
+    Files larger than one chunk are recorded in `upload_journal` so an interrupted
+    upload is resumed with HEAD requests on the next export instead of restarting.
+    A file whose content is found in `upload_cache` is not uploaded again when the
+    server still has it.
     :tasks_completed: signal emit when all requests are finished
     """
 
     """returns jmc_file_id"""
 
     def __init__(
-        self, request_manager: RequestManager, layer_file: LayerFile, organization_id: str
+        self,
+        request_manager: RequestManager,
+        layer_file: LayerFile,
+        organization_id: str,
+        chunks_in_flight: int = 1,
+        concatenation_supported: bool = False,
+        chunk_size_bounds: tuple[int, int] = (MIN_CHUNK_SIZE, MAX_CHUNK_SIZE),
+        upload_journal: UploadJournal = None,
+        upload_cache: UploadCache = None,
     ):
         super().__init__("FileUploader")
         self.layer_file: LayerFile = layer_file
@@ -174,16 +295,25 @@ class FileUploader(CustomTaskManager):
 
         self.file_path = Path(layer_file.file_path)
         self.file_length: int = Path(layer_file.file_path).stat().st_size
-        self.file_offset: int = 0
+        self.upload_source = UploadSource(layer_file.file_path)
+        self.upload_url: str = "{}/organizations/{}/upload".format(API_FUS_URL, organization_id)
         self.url: str = None
+        self.chunks_in_flight: int = max(1, chunks_in_flight)
+        self.concatenation_supported: bool = concatenation_supported
+        self.min_chunk_size, self.max_chunk_size = chunk_size_bounds
+        self.upload_journal = upload_journal
+        self.upload_cache = upload_cache
 
-        self.request = None
+        self.segments: list[UploadSegment] = []
         self.responses: list[RequestManager.ResponseData] = []
         self.pending_requests: list[RequestManager.RequestData] = []
-        self.upload_safer_counter: int = 0
-        self.step: int = 0
-        self.total_steps: int = math.ceil(self.file_length / CHUNK_SIZE) + 1
         self._cancel: bool = False
+        self._finished: bool = False
+        self._finalizing: bool = False
+        self._journal_key: Union[str, None] = None
+        self._hash_task: Union[QgsTask, None] = None
+        self._create_future: Union[RequestFuture, None] = None
+        self._pending_offsets: int = 0
         self._request_manager = request_manager
 
     def run(self):
@@ -192,6 +322,193 @@ class FileUploader(CustomTaskManager):
     def init_upload(self) -> None:
         if self._cancel:
             return False
+        if self.upload_cache is None and not self._is_resumable():
+            return self._create_upload()
+
+        content_hash = self.layer_file.content_hash
+        if content_hash is None and self.upload_journal is not None:
+            content_hash = self.upload_journal.known_hash(self.file_path)
+        if content_hash is not None:
+            return self._on_content_hash_known(content_hash)
+
+        # hashing a large file takes a while, keep it off the main thread
+        self._hash_task = QgsTask.fromFunction(
+            "Hashing {}".format(self.file_path.name),
+            lambda task, file_path=self.file_path: file_content_hash(file_path),
+            on_finished=self._on_file_hashed,
+        )
+        QgsApplication.taskManager().addTask(self._hash_task)
+        return True
+
+    def _on_file_hashed(self, exception: Exception, content_hash: str = None):
+        self._hash_task = None
+        if self._cancel:
+            return
+        if exception is not None or content_hash is None:
+            # the journal and the cache are only optimizations, upload from scratch
+            self._create_upload()
+            return
+        self._on_content_hash_known(content_hash)
+
+    def _is_resumable(self) -> bool:
+        return self.upload_journal is not None and self.file_length > CHUNK_SIZE
+
+    def _on_content_hash_known(self, content_hash: str) -> bool:
+        self.layer_file.content_hash = content_hash
+        if self.upload_cache is not None:
+            file_id = self.upload_cache.find_file_id(self.organization_id, content_hash)
+            if file_id is not None:
+                self._check_uploaded_file(file_id)
+                return True
+        return self._resume_or_create_upload()
+
+    def _check_uploaded_file(self, file_id: str):
+        """Reuse an already uploaded file if the server still has it analyzed"""
+        url = "{}/organizations/{}/files/{}".format(API_FUS_URL, self.organization_id, file_id)
+        request = RequestManager.RequestData(
+            url, type="GET", id=file_id, priority=RequestManager.Priority.bulk
+        )
+
+        def next_func(response: RequestManager.ResponseData):
+            if self._cancel or self._finished:
+                return
+            content = response.content
+            if (
+                response.status == QNetworkReply.NetworkError.NoError
+                and isinstance(content, dict)
+                and content.get("status") == "ANALYZED"
+            ):
+                QgsMessageLog.logMessage(
+                    "{} is unchanged, reusing uploaded file {}".format(
+                        self.file_path.name, file_id
+                    ),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Info,
+                )
+                self.layer_file.jmc_file_id = file_id
+                self._finished = True
+                self.progress_changed.emit(100.0)
+                self.tasks_completed.emit(file_id)
+                return
+            self.upload_cache.remove_file(self.organization_id, self.layer_file.content_hash)
+            self._resume_or_create_upload()
+
+        self._request_manager.add_requests(request).connect(next_func)
+
+    def _resume_or_create_upload(self) -> bool:
+        if not self._is_resumable():
+            return self._create_upload()
+        self._journal_key = UploadJournal.make_key(
+            self.organization_id, self.layer_file.content_hash, self.file_length
+        )
+        entry = self.upload_journal.find(self._journal_key)
+        if entry is None or any(segment["url"] is None for segment in entry["segments"]):
+            return self._create_upload()
+        self._resume_upload(entry)
+        return True
+
+    def _resume_upload(self, entry: dict):
+        QgsMessageLog.logMessage(
+            "Resuming upload of {}".format(self.file_path.name),
+            MESSAGE_CATEGORY,
+            Qgis.MessageLevel.Info,
+        )
+        self.segments = [UploadSegment.from_dict(segment) for segment in entry["segments"]]
+        self.layer_file.jmc_file_id = entry["file_id"]
+        if len(self.segments) == 1:
+            self.url = self.segments[0].url
+        self._pending_offsets = len(self.segments)
+        for segment in self.segments:
+            request = RequestManager.RequestData(
+                segment.url,
+                {"Tus-Resumable": "1.0.0"},
+                type="HEAD",
+                priority=RequestManager.Priority.bulk,
+            )
+
+            def next_func(response, segment=segment):
+                self._on_upload_offset_received(response, segment)
+
+            self._request_manager.add_requests(request).connect(next_func)
+
+    def _on_upload_offset_received(
+        self, response: RequestManager.ResponseData, segment: "UploadSegment"
+    ):
+        if self._cancel or self._finished:
+            return
+        offset = None
+        if response.status == QNetworkReply.NetworkError.NoError:
+            offset = _find_header(response.headers, "Upload-Offset")
+        if offset is None or not offset.isdigit():
+            segment.url = None
+        else:
+            segment.offset = segment.start + int(offset)
+
+        self._pending_offsets -= 1
+        if self._pending_offsets > 0:
+            return
+        if any(segment.url is None for segment in self.segments):
+            # the server forgot the upload (expired or finished), start over
+            self.upload_journal.remove(self._journal_key)
+            self.segments = []
+            self.layer_file.jmc_file_id = None
+            self.url = None
+            self._create_upload()
+            return
+        self._update_journal()
+        self._emit_progress()
+        for segment in self.segments:
+            self.execute_next_request(segment)
+
+    def _record_journal(self):
+        if self._journal_key is None:
+            return
+        self.upload_journal.record(
+            self._journal_key,
+            self.file_path,
+            self.layer_file.content_hash,
+            self.layer_file.jmc_file_id,
+            [segment.to_dict() for segment in self.segments],
+        )
+
+    def _update_journal(self):
+        if self._journal_key is None:
+            return
+        self.upload_journal.update_segments(
+            self._journal_key, [segment.to_dict() for segment in self.segments]
+        )
+
+    def _create_upload(self) -> bool:
+        chunk_count = math.ceil(self.file_length / CHUNK_SIZE)
+        if self.concatenation_supported and self.chunks_in_flight > 1 and chunk_count > 1:
+            self._init_partial_uploads(min(self.chunks_in_flight, chunk_count))
+            return True
+
+        headers = self._metadata_headers()
+        headers["Upload-Length"] = "{}".format(self.file_length)
+        request = RequestManager.RequestData(
+            self.upload_url, headers, type="POST", priority=RequestManager.Priority.bulk
+        )
+        self._create_future = self._request_manager.request(request)
+        self._create_future.then(self._on_upload_created)
+        return True
+
+    def _on_upload_created(self, response: RequestManager.ResponseData):
+        self._create_future = None
+        if self._cancel:
+            return
+        file_id = self._read_created_file_id(response)
+        if file_id is None:
+            return
+
+        self.layer_file.jmc_file_id = file_id
+        self.url = "{}/{}".format(self.upload_url, file_id)
+        self.segments = [UploadSegment(0, self.file_length, self.url)]
+        self._record_journal()
+        self._emit_progress()
+        self.execute_next_request(self.segments[0])
+
+    def _metadata_headers(self) -> dict[str, str]:
         file_name64 = base64.b64encode(self.file_path.name.encode("utf-8")).decode("utf-8")
         if self.layer_file.file_type == SupportedFileType.raster:
             file_type64 = base64.b64encode("image/tiff".encode("utf-8")).decode("utf-8")
@@ -201,135 +518,408 @@ class FileUploader(CustomTaskManager):
                 "utf-8"
             )
             jmc_file_type64 = base64.b64encode("VECTOR_DATA".encode("utf-8")).decode("utf-8")
-
-        url = "{}/organizations/{}/upload".format(API_FUS_URL, self.organization_id)
-        headers = {
-            "Upload-Length": "{}".format(self.file_length),
+        return {
             "Upload-Metadata": "filename {},filetype {},JMC-fileType {}".format(
                 file_name64, file_type64, jmc_file_type64
             ),
             "Tus-Resumable": "1.0.0",
         }
-        error_prefix = "Error uploading file"
-        response = self._request_manager.post_request(
-            url, headers=headers, error_prefix=error_prefix
-        )
+
+    def _read_created_file_id(self, response: RequestManager.ResponseData) -> Union[str, None]:
         if response.status != QNetworkReply.NetworkError.NoError:
             self._fail_upload(
                 self.tr("Upload initialization failed: {}").format(response.error_message)
             )
-            return False
+            return None
         if response.headers is None:
             self._fail_upload(self.tr("Upload initialization failed: no response headers"))
-            return False
+            return None
 
-        location: Union[str, None] = None
-        for header, value in response.headers.items():
-            if header.lower() == "location":
-                location = value
-                break
+        location = _find_header(response.headers, "Location")
         if not location:
             self._fail_upload(self.tr("Upload initialization failed: missing Location header"))
-            return False
+            return None
 
         url_array = location.split("/")
-        file_id = url_array[-1]
-        self.layer_file.jmc_file_id = file_id
-        self.url = "{}/{}".format(url, file_id)
-        self.progress_changed.emit(self.step / self.total_steps * 100.0)
-        self.execute_next_request(response)
-        return True
+        return url_array[-1]
+
+    def _init_partial_uploads(self, segment_count: int):
+        # segments are cut on chunk boundaries so only their last PATCH is a partial chunk
+        chunk_count = math.ceil(self.file_length / CHUNK_SIZE)
+        segment_length = math.ceil(chunk_count / segment_count) * CHUNK_SIZE
+        self.segments = [
+            UploadSegment(start, min(start + segment_length, self.file_length))
+            for start in range(0, self.file_length, segment_length)
+        ]
+
+        for segment in self.segments:
+            headers = {
+                "Upload-Length": "{}".format(segment.length),
+                "Upload-Concat": "partial",
+                "Tus-Resumable": "1.0.0",
+            }
+            request = RequestManager.RequestData(
+                self.upload_url, headers, type="POST", priority=RequestManager.Priority.bulk
+            )
+
+            def next_func(response, segment=segment):
+                self._on_partial_upload_created(response, segment)
+
+            self._request_manager.add_requests(request).connect(next_func)
+
+    def _on_partial_upload_created(
+        self, response: RequestManager.ResponseData, segment: "UploadSegment"
+    ):
+        if self._cancel or self._finished:
+            return
+        partial_id = self._read_created_file_id(response)
+        if partial_id is None:
+            return
+        segment.url = "{}/{}".format(self.upload_url, partial_id)
+        self._record_journal()
+        self.execute_next_request(segment)
+
+    def _finalize_partial_uploads(self):
+        headers = self._metadata_headers()
+        headers["Upload-Concat"] = "final;{}".format(
+            " ".join(segment.url for segment in self.segments)
+        )
+        request = RequestManager.RequestData(
+            self.upload_url, headers, type="POST", priority=RequestManager.Priority.bulk
+        )
+
+        def next_func(response):
+            if self._cancel or self._finished:
+                return
+            file_id = self._read_created_file_id(response)
+            if file_id is None:
+                return
+            self.layer_file.jmc_file_id = file_id
+            self.url = "{}/{}".format(self.upload_url, file_id)
+            self._complete()
+
+        self._request_manager.add_requests(request).connect(next_func)
+
+    def _emit_progress(self):
+        if self.file_length == 0:
+            return
+        uploaded = sum(segment.offset - segment.start for segment in self.segments)
+        self.progress_changed.emit(uploaded / self.file_length * 100.0)
+
+    def _complete(self):
+        self._finished = True
+        self.pending_requests = []
+        self.upload_source.close()
+        if self._journal_key is not None:
+            self.upload_journal.remove(self._journal_key)
+        if self.upload_cache is not None and self.layer_file.content_hash is not None:
+            self.upload_cache.record_file(
+                self.organization_id, self.layer_file.content_hash, self.layer_file.jmc_file_id
+            )
+        self.progress_changed.emit(100.0)
+        self.tasks_completed.emit(self.layer_file.jmc_file_id)
 
     def _fail_upload(self, error_message: str):
+        if self._finished:
+            return
+        self._finished = True
+        self.pending_requests = []
+        self.upload_source.close()
         self.layer_file.upload_status = LayerFile.Status.uploading_error
         self.error_occur(error_message, MESSAGE_CATEGORY)
         self.progress_changed.emit(100.0)
         self.tasks_completed.emit(self.layer_file.jmc_file_id)
 
-    def execute_next_request(self, response: RequestManager.ResponseData = None) -> None:
+    def execute_next_request(
+        self, segment: "UploadSegment", response: RequestManager.ResponseData = None
+    ) -> None:
         """
-        this function must be call after upload initialization
+        this function must be call after the segment upload url is known
         """
-        if self._cancel:
+        if self._cancel or self._finished:
             return False
         if response is not None:
             if response.status != QNetworkReply.NetworkError.NoError:
-                self.upload_safer_counter += 1
-                if self.upload_safer_counter >= 5:
-                    error_message = "Request failed: {}".format(response.error_message)
-                    self.error_occur(error_message, MESSAGE_CATEGORY)
+                # transient errors were already retried with backoff by the RequestManager
+                segment.upload_safer_counter += 1
+                if segment.upload_safer_counter >= MAX_CHUNK_FAILURES:
                     self.responses.append(response)
-                    self.pending_requests = []
-                    self.layer_file.upload_status = LayerFile.Status.uploading_error
-                    self.tasks_completed.emit(self.layer_file.jmc_file_id)
-                    self.progress_changed.emit(100.0)
+                    self._fail_upload("Request failed: {}".format(response.error_message))
                     return False
 
-                def resend_request():
-                    response_signal_obj = self._request_manager.add_requests(self.request)
-                    response_signal_obj.connect(
-                        lambda response, this=self: this.execute_next_request(response)
-                    )
-                    self.pending_requests.append(response_signal_obj)
-
-                QTimer.singleShot(2000, resend_request)
+                # resend a smaller chunk from the offset the server received
+                self._set_chunk_size(segment, segment.chunk_size // 2)
+                self._release_request(segment)
+                self._resync_segment(segment)
                 return False
-            else:
-                self.upload_safer_counter = 0
-                self.responses.append(response)
-                self.step += 1  # first call will be on initialization
-                self.progress_changed.emit(self.step / self.total_steps * 100.0)
-            if self.file_offset >= self.file_length:
-                self.pending_requests = []
-                self.tasks_completed.emit(self.layer_file.jmc_file_id)
-                return True
-        self.request = self.define_next_request()
-        self.file_offset += CHUNK_SIZE
-        response_signal_obj = self._request_manager.add_requests(self.request)
-        response_signal_obj.connect(lambda response, this=self: this.execute_next_request(response))
-        self.pending_requests.append(response_signal_obj)
+
+            segment.upload_safer_counter = 0
+            self.responses.append(response)
+            sent_bytes = segment.request.body.size()
+            sent_at = segment.request.sent_at
+            segment.offset += sent_bytes
+            self._release_request(segment)
+            self._adapt_chunk_size(segment, sent_bytes, sent_at)
+            self._update_journal()
+            self._emit_progress()
+        if segment.is_completed():
+            self._on_segment_completed()
+            return True
+        segment.request = self.define_next_request(segment)
+        if segment.request is None:
+            self._fail_upload(
+                self.tr("Unable to read file: {}").format(self.upload_source.error_string())
+            )
+            return False
+        self._send_segment_request(segment)
         return True
 
-    def define_next_request(self) -> RequestManager.RequestData:
-        with open(self.layer_file.file_path, "rb") as f:
-            f.seek(self.file_offset)
-            chunk = f.read(CHUNK_SIZE)
-        length_left = self.file_length - self.file_offset
-        content_length = CHUNK_SIZE if CHUNK_SIZE < length_left else length_left
+    def _resync_segment(self, segment: "UploadSegment"):
+        """Ask the server the offset of a segment after a failed PATCH, then send the rest"""
+        request = RequestManager.RequestData(
+            segment.url,
+            {"Tus-Resumable": "1.0.0"},
+            type="HEAD",
+            priority=RequestManager.Priority.bulk,
+        )
+
+        def next_func(response: RequestManager.ResponseData):
+            if self._cancel or self._finished:
+                return
+            offset = None
+            if response.status == QNetworkReply.NetworkError.NoError:
+                offset = _find_header(response.headers, "Upload-Offset")
+            if offset is not None and offset.isdigit():
+                segment.offset = segment.start + int(offset)
+                self._update_journal()
+                self._emit_progress()
+            # the failed PATCH may have been received entirely
+            if segment.is_completed():
+                self._on_segment_completed()
+                return
+            segment.request = self.define_next_request(segment)
+            if segment.request is None:
+                self._fail_upload(
+                    self.tr("Unable to read file: {}").format(self.upload_source.error_string())
+                )
+                return
+            self._send_segment_request(segment)
+
+        self._request_manager.add_requests(request).connect(next_func)
+
+    def _on_segment_completed(self):
+        if self._finalizing or not all(segment.is_completed() for segment in self.segments):
+            return
+        self._finalizing = True
+        if len(self.segments) > 1:
+            self._finalize_partial_uploads()
+        else:
+            self._complete()
+
+    def _adapt_chunk_size(self, segment: "UploadSegment", sent_bytes: int, sent_at: float):
+        """
+        Grow the chunk size while PATCHes are fast (slow-start like doubling)
+        and shrink it to the measured throughput when they are slow.
+        The time spent waiting in the RequestManager queues is not measured.
+        """
+        if sent_at is None:
+            return
+        elapsed = max(time.monotonic() - sent_at, 0.001)
+        if elapsed < TARGET_CHUNK_DURATION / 2 and sent_bytes >= segment.chunk_size:
+            self._set_chunk_size(segment, segment.chunk_size * 2)
+        elif elapsed > TARGET_CHUNK_DURATION * 2:
+            throughput = sent_bytes / elapsed
+            self._set_chunk_size(segment, int(throughput * TARGET_CHUNK_DURATION))
+
+    def _set_chunk_size(self, segment: "UploadSegment", chunk_size: int):
+        chunk_size = min(max(chunk_size, self.min_chunk_size), self.max_chunk_size)
+        if chunk_size == segment.chunk_size:
+            return
+        QgsMessageLog.logMessage(
+            "{}: chunk size {} KB -> {} KB".format(
+                self.file_path.name, segment.chunk_size // 1024, chunk_size // 1024
+            ),
+            MESSAGE_CATEGORY,
+            Qgis.MessageLevel.Info,
+        )
+        segment.chunk_size = chunk_size
+
+    def _send_segment_request(self, segment: "UploadSegment"):
+        if self._cancel or self._finished:
+            return
+        response_signal_obj = self._request_manager.add_requests(segment.request)
+        response_signal_obj.connect(
+            lambda response, this=self: this.execute_next_request(segment, response)
+        )
+        self.pending_requests.append(response_signal_obj)
+
+    def define_next_request(
+        self, segment: "UploadSegment"
+    ) -> Union[RequestManager.RequestData, None]:
+        length_left = segment.end - segment.offset
+        content_length = min(segment.chunk_size, length_left)
+        chunk = self.upload_source.chunk(segment.offset, content_length)
+        if chunk is None:
+            return None
         headers = {
             "content-type": "application/offset+octet-stream",
             "Tus-Resumable": "1.0.0",
             "content-length": "{}".format(content_length),
-            "Upload-Offset": "{}".format(self.file_offset),
+            "Upload-Offset": "{}".format(segment.offset - segment.start),
         }
         return RequestManager.RequestData(
-            self.url,
+            segment.url,
             headers,
             chunk,
             "PATCH",
             self.layer_file.jmc_file_id,
+            priority=RequestManager.Priority.bulk,
+            # the server rejects a PATCH whose Upload-Offset it already received
+            idempotent=True,
         )
 
+    def _release_request(self, segment: "UploadSegment"):
+        if segment.request is not None and isinstance(segment.request.body, QIODevice):
+            segment.request.body.close()
+        segment.request = None
+
     def cancel(self):
         self._cancel = True
+        if self._hash_task is not None:
+            self._hash_task.cancel()
+        if self._create_future is not None:
+            self._create_future.cancel()
+        self.upload_source.close()
+
+
+class UploadSegment:
+    """
+    Byte range [start, end) of a file sent through its own TUS upload url.
+    A plain upload has a single segment covering the whole file.
+    """
+
+    def __init__(self, start: int, end: int, url: str = None):
+        self.start = start
+        self.end = end
+        self.offset = start
+        self.url = url
+        self.request: Union[RequestManager.RequestData, None] = None
+        self.upload_safer_counter = 0
+        self.chunk_size = CHUNK_SIZE
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+    def to_dict(self) -> dict:
+        return {"start": self.start, "end": self.end, "offset": self.offset, "url": self.url}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UploadSegment":
+        segment = cls(data["start"], data["end"], data["url"])
+        segment.offset = data["offset"]
+        return segment
+
+    def is_completed(self) -> bool:
+        return self.offset >= self.end
+
+
+class UploadSource:
+    """
+    Keep a single read handle on a file for the whole upload.
+    Chunks are handed to Qt as bounded QIODevice windows over that handle, read by the
+    network stack as it sends them, so a whole chunk is never held in memory.
+    """
+
+    def __init__(self, file_path: str):
+        self._file = QFile(file_path)
+
+    def open(self) -> bool:
+        if self._file.isOpen():
+            return True
+        return self._file.open(QIODevice.OpenModeFlag.ReadOnly)
+
+    def chunk(self, offset: int, length: int) -> Union["FileChunkDevice", None]:
+        if not self.open():
+            return None
+        return FileChunkDevice(self._file, offset, length)
+
+    def error_string(self) -> str:
+        return self._file.errorString()
+
+    def close(self):
+        if self._file.isOpen():
+            self._file.close()
+
+
+class FileChunkDevice(QIODevice):
+    """
+    Read-only window of `length` bytes starting at `offset` in an already opened file.
+    The device can be rewound with reset() to resend the same chunk.
+    PyQt readData returns bytes, so each block Qt reads still passes through Python once.
+    """
+
+    def __init__(self, file: QFile, offset: int, length: int):
+        super().__init__()
+        self._file = file
+        self._offset = offset
+        self._length = length
+        self.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered)
+
+    def isSequential(self) -> bool:
+        return False
+
+    def size(self) -> int:
+        return self._length
+
+    def readData(self, max_size: int) -> bytes:
+        remaining = self._length - self.pos()
+        if remaining <= 0:
+            return b""
+        if not self._file.seek(self._offset + self.pos()):
+            return None
+        # QIODevice.read already returns bytes
+        return self._file.read(min(max_size, remaining))
+
+    def writeData(self, data: bytes) -> int:
+        return -1
 
 
 class DatasourceManager(CustomTaskManager):
+    """
+    Create or update the datasources of the exported layers and wait for the server to
+    analyze them.
+
+    run() processes every layer at once. A pipelined export can instead feed layers with
+    add_layers() as their files become ready, and drop the layers that failed upstream with
+    discard_layers(). `layers_ready` is emitted with each layer as soon as its datasource is
+    ready (or failed), `tasks_completed` once every expected layer is done.
+    A datasource created from the same file content is only reused within `project_id`, so
+    projects never share a datasource. Without a project id, every datasource is created.
+    """
+
+    layers_ready = pyqtSignal(list)
+
     def __init__(
         self,
         request_manager: RequestManager,
         layers_data: list[LayerData],
         organization_id: str,
         export_mode: ExportSelectedLayerData.ExportMode = ExportSelectedLayerData.ExportMode.create,
+        project_id: str = None,
     ):
         super().__init__("DatasourceManager")
-        self._layers_data = layers_data
+        self._layers_data = list(layers_data)
         self._export_mode = export_mode
         self.organization_id = organization_id
+        self.project_id = project_id
         self._num_datasource_created = 0
         self.datasource_to_analyze: list[LayerData] = []
         self._request_manager = request_manager
+        self._upload_cache = UploadCache()
+        self._completed = False
         self._cancel = False
+        self._poll_ids: list[str] = []
 
     def run(self):
         if self._export_mode == ExportSelectedLayerData.ExportMode.create:
@@ -339,6 +929,8 @@ class DatasourceManager(CustomTaskManager):
 
     def cancel(self):
         self._cancel = True
+        for poll_id in self._poll_ids:
+            self._request_manager.poll_scheduler.cancel(poll_id)
 
     def create_datasources(self):
         self.step_title_changed.emit(self.tr("Creating datasources"))
@@ -350,7 +942,33 @@ class DatasourceManager(CustomTaskManager):
         for layer_data in self._layers_data:
             self.update_datasource(layer_data)
 
+    def add_layers(self, layers_data: list[LayerData]):
+        """Process layers whose files are ready, before the other layers of the export"""
+        for layer_data in layers_data:
+            if self._cancel:
+                return
+            if self._export_mode == ExportSelectedLayerData.ExportMode.create:
+                self.create_datasource(layer_data)
+            else:
+                self.update_datasource(layer_data)
+
+    def discard_layers(self, layers_data: list[LayerData]):
+        """Stop waiting for layers that failed in a previous stage"""
+        for layer_data in layers_data:
+            if layer_data in self._layers_data:
+                self._layers_data.remove(layer_data)
+        self._check_completed()
+
     def create_datasource(self, layer_data: LayerData) -> bool:
+        datasource_id = self._find_cached_datasource_id(layer_data)
+        if datasource_id is not None:
+            self._reuse_datasource(layer_data, datasource_id)
+            return True
+        return self._post_datasource(layer_data)
+
+    def _post_datasource(self, layer_data: LayerData) -> bool:
+        if self._cancel:
+            return False
         # prepare request data
         request_DTO = CreateDatasourceDTO()
         request_DTO.description = ""  # TODO
@@ -425,16 +1043,73 @@ class DatasourceManager(CustomTaskManager):
         ):
             request_DTO.capabilitiesUrl = layer_data.datasource["capabilitiesUrl"]
         else:
+            layer_data.status = LayerData.Status.creating_datasource_error
+            self._on_datasource_processed(layer_data, analyze=False)
             return False
 
         # request
         url = "{}/organizations/{}/datasources".format(API_MCS_URL, self.organization_id)
         body = request_DTO.to_json()
         request = RequestManager.RequestData(url, body=body, type="POST", id=layer_data.layer_id)
-        response = self._request_manager.custom_request(request)
-        self.read_datasource_creation_response(response, layer_data)
+
+        def next_func(response: RequestManager.ResponseData):
+            if not self._cancel:
+                self.read_datasource_creation_response(response, layer_data)
+
+        self._request_manager.add_requests(request).connect(next_func)
         return True
 
+    def _datasource_cache_key(self, layer_data: LayerData) -> str:
+        uri_layer_name = (layer_data.uri_components or {}).get("layerName") or ""
+        return "{}|{}|{}".format(self.project_id, uri_layer_name, layer_data.layer.crs().authid())
+
+    def _find_cached_datasource_id(self, layer_data: LayerData) -> Union[str, None]:
+        layer_file = layer_data.layer_file
+        if self.project_id is None or layer_file is None or layer_file.content_hash is None:
+            return None
+        return self._upload_cache.find_datasource_id(
+            self.organization_id, layer_file.content_hash, self._datasource_cache_key(layer_data)
+        )
+
+    def _reuse_datasource(self, layer_data: LayerData, datasource_id: str):
+        """
+        Reuse the datasource already created from the same file content, if the server still
+        has it. The datasource then goes through the usual analyzer polling.
+        """
+        url = "{}/organizations/{}/datasources/{}".format(
+            API_MCS_URL, self.organization_id, datasource_id
+        )
+        request = RequestManager.RequestData(url, type="GET", id=layer_data.layer_id)
+
+        def next_func(response: RequestManager.ResponseData):
+            if self._cancel:
+                return
+            content = response.content
+            if (
+                response.status != QNetworkReply.NetworkError.NoError
+                or not isinstance(content, dict)
+                or content.get("status") != "READY"
+            ):
+                self._upload_cache.remove_datasource(
+                    self.organization_id,
+                    layer_data.layer_file.content_hash,
+                    self._datasource_cache_key(layer_data),
+                )
+                self._post_datasource(layer_data)
+                return
+
+            QgsMessageLog.logMessage(
+                "{} is unchanged, reusing datasource {}".format(
+                    layer_data.layer_name, datasource_id
+                ),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Info,
+            )
+            layer_data.datasource_id = datasource_id
+            self._on_datasource_processed(layer_data, analyze=True)
+
+        self._request_manager.add_requests(request).connect(next_func)
+
     def update_datasource(self, layer_data: LayerData) -> bool:
         # prepare request data
         request_DTO = UpdateDatasourceDTO()
@@ -490,6 +1165,8 @@ class DatasourceManager(CustomTaskManager):
         ):
             request_DTO.capabilitiesUrl = layer_data.datasource["capabilitiesUrl"]
         else:
+            layer_data.status = LayerData.Status.updating_datasource_error
+            self._on_datasource_processed(layer_data, analyze=False)
             return False
 
         url = "{}/organizations/{}/datasources/{}".format(
@@ -498,19 +1175,19 @@ class DatasourceManager(CustomTaskManager):
         body = request_DTO.to_json()
         request = RequestManager.RequestData(url, body=body, type="PATCH", id=layer_data.layer_id)
 
-        response = self._request_manager.custom_request(request)
-
-        if response.status != QNetworkReply.NetworkError.NoError:
-            error_message = self.tr("Error updating datasource {}: {}").format(
-                layer_data.datasource_id, response.error_message
-            )
-            self.error_occur(error_message, MESSAGE_CATEGORY)
-            layer_data.status = LayerData.Status.updating_datasource_error
+        def next_func(response: RequestManager.ResponseData):
+            if self._cancel:
+                return
+            if response.status != QNetworkReply.NetworkError.NoError:
+                error_message = self.tr("Error updating datasource {}: {}").format(
+                    layer_data.datasource_id, response.error_message
+                )
+                self.error_occur(error_message, MESSAGE_CATEGORY)
+                layer_data.status = LayerData.Status.updating_datasource_error
             # For updates, do not wait on analyzer polling.
             self._on_datasource_processed(layer_data, analyze=False)
-            return False
-        # For updates, do not wait on analyzer polling.
-        self._on_datasource_processed(layer_data, analyze=False)
+
+        self._request_manager.add_requests(request).connect(next_func)
         return True
 
     def read_datasource_creation_response(
@@ -526,65 +1203,89 @@ class DatasourceManager(CustomTaskManager):
         self._on_datasource_processed(layer_data, analyze=True)
 
     def _on_datasource_processed(self, layer_data: LayerData, analyze: bool):
-        self._num_datasource_created += 1
-        self.progress_changed.emit(self._num_datasource_created / len(self._layers_data) * 100)
         if analyze and layer_data.status == LayerData.Status.no_error:
-            self.datasource_to_analyze.append(layer_data)
-        if self._num_datasource_created == len(self._layers_data):
+            self._poll_datasource_analyzer(layer_data)
+        else:
+            self._on_layer_done(layer_data)
+
+    def _on_layer_done(self, layer_data: LayerData):
+        self._num_datasource_created += 1
+        if not self._cancel:
+            self.layers_ready.emit([layer_data])
+        if len(self._layers_data) > 0:
+            self.progress_changed.emit(self._num_datasource_created / len(self._layers_data) * 100)
+        self._check_completed()
+
+    def _check_completed(self):
+        if self._completed or self._cancel:
+            return
+        if self._num_datasource_created >= len(self._layers_data):
+            self._completed = True
             self._num_datasource_created = 0
-            if analyze:
-                self.start_poking_jmc_datasource_analyzers()
-            else:
-                self.tasks_completed.emit(self._layers_data)
+            self.tasks_completed.emit(self._layers_data)
 
     def is_all_datasources_created(self, layer_data: LayerData):
         # Backward-compat: treat as creation flow.
         self._on_datasource_processed(layer_data, analyze=True)
 
-    def start_poking_jmc_datasource_analyzers(self):
-        self.step_title_changed.emit(self.tr("Server is analyzing datasources"))
+    def _poll_datasource_analyzer(self, layer_data: LayerData):
+        if len(self.datasource_to_analyze) == 0:
+            self.step_title_changed.emit(self.tr("Server is analyzing datasources"))
+        self.datasource_to_analyze.append(layer_data)
 
-        def is_datasource_analyzed(
-            response: RequestManager.ResponseData, layer_data: LayerData = None
-        ):
+        def is_datasource_analyzed(response: RequestManager.ResponseData) -> bool:
+            if self._cancel:
+                return True
             if response.status != QNetworkReply.NetworkError.NoError:
-                self.datasource_to_analyze.remove(layer_data)
                 layer_data.status = LayerData.Status.unknown_error
                 self.error_occur(
                     self.tr("Unknown error : {}").format(response.error_message), MESSAGE_CATEGORY
                 )
             elif "status" not in response.content or response.content["status"] == "ERROR":
-                self.datasource_to_analyze.remove(layer_data)
                 layer_data.status = LayerData.Status.datasource_analyzing_error
                 self.error_occur(
                     self.tr("JMap server error : {}").format(response.error_message),
                     MESSAGE_CATEGORY,
                 )
             elif response.content["status"] in ["READY"]:
-                self.datasource_to_analyze.remove(layer_data)
                 layer_data.datasource_id = response.content["id"]
-            if len(self.datasource_to_analyze) == 0:
-                recurring_event.stop()
-                self.tasks_completed.emit(self._layers_data)
-
-        def poke_all_not_analyzed_datasources():
-            for layer_data in self.datasource_to_analyze:
-                url = "{}/organizations/{}/datasources/{}".format(
-                    API_MCS_URL, self.organization_id, layer_data.datasource_id
-                )
-                request = RequestManager.RequestData(url, type="GET", id=layer_data.datasource_id)
-
-                def next_func(response, layer_data=layer_data):
-                    is_datasource_analyzed(response, layer_data)
+                if (
+                    self.project_id is not None
+                    and layer_data.layer_file
+                    and layer_data.layer_file.content_hash
+                ):
+                    self._upload_cache.record_datasource(
+                        self.organization_id,
+                        layer_data.layer_file.content_hash,
+                        self._datasource_cache_key(layer_data),
+                        layer_data.datasource_id,
+                    )
+            else:
+                return False
+            self._on_datasource_analyzed(layer_data)
+            return True
 
-                self._request_manager.add_requests(request).connect(next_func)
-            if len(self.datasource_to_analyze) == 0:
-                recurring_event.stop()
-                self.tasks_completed.emit(self._layers_data)
+        url = "{}/organizations/{}/datasources/{}".format(
+            API_MCS_URL, self.organization_id, layer_data.datasource_id
+        )
+        self._poll_ids.append(
+            self._request_manager.poll_scheduler.poll(
+                url, is_datasource_analyzed, lambda: self.timeout(layer_data)
+            )
+        )
 
-        recurring_event = RecurringEvent(2.5, poke_all_not_analyzed_datasources, False, 200)
-        recurring_event.call_count_exceeded.connect(self.timeout)
-        recurring_event.start()
+    def _on_datasource_analyzed(self, layer_data: LayerData):
+        self.datasource_to_analyze.remove(layer_data)
+        self._on_layer_done(layer_data)
 
-    def timeout(self):
-        pass
+    def timeout(self, layer_data: LayerData):
+        if self._cancel:
+            return
+        layer_data.status = LayerData.Status.timeout
+        self.error_occur(
+            self.tr("Timed out waiting for the server to analyze datasource of layer {}").format(
+                layer_data.layer_name
+            ),
+            MESSAGE_CATEGORY,
+        )
+        self._on_datasource_analyzed(layer_data)
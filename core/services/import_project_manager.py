@@ -41,6 +41,7 @@ from ..constant import (
 )
 from ..plugin_util import find_value_in_dict_or_first
 from .jmap_services_access import JMapDAS, JMapMCS, JMapMIS
+from .request_future import RequestFuture
 from .request_manager import RequestManager
 from .style_manager import StyleManager
 from ..tasks.custom_qgs_task import CustomTaskManager
@@ -104,11 +105,13 @@ class ImportProjectManager(CustomTaskManager):
         self.project_vector_type = project_vector_type
         self.nodes: dict[str, QgsLayerTreeNode] = {}
 
-        def next_function(replies):
-            self.project_layers_data = self._check_project_layers_data(replies)
+        def next_function(project_layers_data: ProjectLayersData):
+            self.project_layers_data = project_layers_data
             self._load_project()
 
-        self._get_project_layers_data().connect(next_function)
+        self._get_project_layers_data().connect(
+            lambda replies: self._check_project_layers_data(replies).then(next_function)
+        )
 
     def _get_project_layers_data(self) -> pyqtSignal:
         self.action_dialog.set_text(self.tr("Getting project data"))
@@ -129,7 +132,7 @@ class ImportProjectManager(CustomTaskManager):
         }
         requests = []
         for id, url in urls.items():
-            requests.append(RequestManager.RequestData(url, type="GET", id=id))
+            requests.append(RequestManager.RequestData(url, type="GET", id=id, cache=True))
 
         query = (
             """{
@@ -164,7 +167,15 @@ class ImportProjectManager(CustomTaskManager):
         )
         return self._request_manager.multi_request_async(requests)
 
-    def _check_project_layers_data(self, replies: dict[str, RequestManager.ResponseData]) -> ProjectLayersData:
+    def _check_project_layers_data(
+        self, replies: dict[str, RequestManager.ResponseData]
+    ) -> RequestFuture:
+        """
+        Check the replies of the project data requests and format the layers properties
+        once the sprite sheet icons are loaded.
+
+        :return: The future of the project layers data, of None if a request failed
+        """
         layers_data = replies["layers-data"].content
         self.total_steps = len(layers_data) + NUM_STEPS
         self._next_step(self.tr("Checking project data"))
@@ -172,7 +183,7 @@ class ImportProjectManager(CustomTaskManager):
 
         for reply in replies.values():
             if reply.status != QNetworkReply.NetworkError.NoError:
-                return None
+                return RequestFuture.resolved(None)
 
         self.project_layers_data.layer_groups = replies["layer-groups"].content
         self.project_layers_data.layer_order = replies["layer-order"].content
@@ -181,15 +192,20 @@ class ImportProjectManager(CustomTaskManager):
         mapbox_styles = replies["mapbox-styles"].content
         graphql_style_data = replies["graphql-style-data"].content
 
-        formatted_layers_properties = self.style_manager.format_properties(mapbox_styles, graphql_style_data, layers_data)
-        if formatted_layers_properties == None:
-            message = self.tr("error formatting properties")
-            self._unmanageable_error_occur(message)
-            return None
-            # -------
+        def format_properties(icons) -> ProjectLayersData:
+            formatted_layers_properties = self.style_manager.format_properties(
+                mapbox_styles, graphql_style_data, layers_data, icons
+            )
+            if formatted_layers_properties == None:
+                message = self.tr("error formatting properties")
+                self._unmanageable_error_occur(message)
+                return None
+                # -------
+
+            self.project_layers_data.layers_properties = formatted_layers_properties
+            return self.project_layers_data
 
-        self.project_layers_data.layers_properties = formatted_layers_properties
-        return self.project_layers_data
+        return self.style_manager.get_project_icons_async(mapbox_styles).then(format_properties)
 
     def _load_project(self):
         """
@@ -622,7 +638,7 @@ class ImportProjectManager(CustomTaskManager):
             url = "{}/organizations/{}/projects/{}/extent?crs={}".format(
                 API_MCS_URL, self.project_data.organization_id, self.project_data.project_id, qgis_epsg
             )
-            request = RequestManager.RequestData(url, type="GET")
+            request = RequestManager.RequestData(url, type="GET", priority=RequestManager.Priority.interactive)
 
             def on_extent_loaded(reply: RequestManager.ResponseData):
                 if reply.status != QNetworkReply.NetworkError.NoError or not reply.content:
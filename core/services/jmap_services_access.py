@@ -17,6 +17,7 @@ from qgis.PyQt.QtCore import pyqtSignal
 
 from ..constant import API_DAS_URL, API_MCS_URL, API_MIS_URL, AUTH_CONFIG_ID
 from ..DTOS import LayerDTO, ProjectDTO, UpdateLayerDTO
+from .request_future import RequestFuture
 from .request_manager import RequestManager
 from .session_manager import SessionManager
 
@@ -28,16 +29,17 @@ class JMapMCS:
         self._request_manager = request_manager
         self._session_manager = session_manager
 
-    def get_project_permissions(self, project_id: str) -> RequestManager.ResponseData:
+    def get_project_permissions_async(self, project_id: str) -> RequestFuture:
         organization_id = self._session_manager.get_organization_id()
         if organization_id is None:
-            return None
+            return RequestFuture.resolved(None)
         url = (
             f"{API_MCS_URL}/organizations/{organization_id}/projects/{project_id}"
             "/permissions/self"
         )
-        return self._request_manager.get_request(
-            url, error_prefix="error getting project permissions"
+        request = RequestManager.RequestData(url, priority=RequestManager.Priority.interactive)
+        return self._request_manager.request(
+            request, error_prefix="error getting project permissions"
         )
 
     def get_projects_async(self) -> pyqtSignal:
@@ -46,7 +48,9 @@ class JMapMCS:
         if organization_id is None:
             return None
         url = f"{API_MCS_URL}/organizations/{organization_id}/projects"
-        request = RequestManager.RequestData(url, type="GET")
+        request = RequestManager.RequestData(
+            url, type="GET", cache=True, priority=RequestManager.Priority.interactive
+        )
 
         return self._request_manager.add_requests(request)
 
@@ -58,7 +62,9 @@ class JMapMCS:
             f"{API_MCS_URL}/organizations/{organization_id}/projects/"
             f"{project_id}/layers?q=elementType={elementType}"
         )
-        request = RequestManager.RequestData(url, type="GET")
+        request = RequestManager.RequestData(
+            url, type="GET", priority=RequestManager.Priority.interactive
+        )
 
         return self._request_manager.add_requests(request)
 
@@ -138,19 +144,20 @@ class JMapMCS:
     def get_wmts_layer_uri(self, url: str, minZoom: int = 0, maxZoom: int = 21) -> str:
         return "http-header:referer=&type=xyz&url={}&zmax={}&zmin={}".format(url, maxZoom, minZoom)
 
-    def get_project_sprites(self, url: str) -> tuple[dict, bytes]:
+    def get_project_sprite_async(self, url: str, etag: str = None) -> RequestFuture:
+        """
+        GET a sprite sheet file (.json or .png).
+        The request is conditional if `etag` is given: an unchanged file is not sent again.
+        """
         organization_id = self._session_manager.get_organization_id()
         if organization_id is None:
-            return None
+            return RequestFuture.resolved(None)
 
-        json_url = "{}.json".format(url)
-        png_url = "{}.png".format(url)
-        prefix = "Error loading sprites"
-        json_sprites = self._request_manager.get_request(json_url, error_prefix=prefix).content
-        if not bool(json_sprites):
-            return None, None
-        png_sprites = self._request_manager.get_request(png_url, error_prefix=prefix).content
-        return json_sprites, png_sprites
+        headers = {"If-None-Match": etag} if etag else {}
+        request = RequestManager.RequestData(
+            url, headers, priority=RequestManager.Priority.interactive
+        )
+        return self._request_manager.request(request, error_prefix="Error loading sprites")
 
     def get_project_extent(
         self, organization_id: str, project_id: str, epsg: str
@@ -0,0 +1,139 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import random
+import time
+import uuid
+from typing import TYPE_CHECKING, Callable
+
+from qgis.PyQt.QtCore import QObject, QTimer
+
+if TYPE_CHECKING:
+    from .request_manager import RequestManager
+
+INITIAL_POLL_INTERVAL = 1.0  # seconds
+MAX_POLL_INTERVAL = 30.0  # seconds
+POLL_BACKOFF_FACTOR = 1.5
+POLL_JITTER = 0.2  # +/- 20% of the interval
+POLL_TIMEOUT = 600.0  # seconds
+
+
+class PollScheduler(QObject):
+    """
+    Poll status urls until a condition is met, with one timer shared by every poller.
+
+    Each polled item waits INITIAL_POLL_INTERVAL before its first GET, then its interval grows
+    by POLL_BACKOFF_FACTOR up to MAX_POLL_INTERVAL, with jitter so items registered together
+    spread out. Items polling the same url share a single request.
+    """
+
+    class PollItem:
+        def __init__(
+            self,
+            url: str,
+            callback: Callable[["RequestManager.ResponseData"], bool],
+            on_timeout: Callable[[], None],
+            timeout: float,
+        ):
+            self.url = url
+            self.callback = callback
+            self.on_timeout = on_timeout
+            self.interval = INITIAL_POLL_INTERVAL
+            self.due_at = time.monotonic() + PollScheduler._jitter(self.interval)
+            self.deadline = time.monotonic() + timeout
+
+    def __init__(self, request_manager: "RequestManager"):
+        super().__init__()
+        self._request_manager = request_manager
+        self._items: dict[str, PollScheduler.PollItem] = {}
+        self._urls_in_flight: set[str] = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._poll_due_items)
+
+    def poll(
+        self,
+        url: str,
+        callback: Callable[["RequestManager.ResponseData"], bool],
+        on_timeout: Callable[[], None] = None,
+        timeout: float = POLL_TIMEOUT,
+    ) -> str:
+        """
+        Start polling a url with GET requests.
+
+        :param url: the status url to poll
+        :param callback: called with every response, returns True to stop polling
+        :param on_timeout: called if the callback did not return True before `timeout` seconds
+        :param timeout: maximum polling duration in seconds
+        :return: the poll id, to use with cancel()
+        """
+        poll_id = uuid.uuid4().__str__()
+        self._items[poll_id] = self.PollItem(url, callback, on_timeout, timeout)
+        self._schedule()
+        return poll_id
+
+    def cancel(self, poll_id: str):
+        self._items.pop(poll_id, None)
+        if len(self._items) == 0:
+            self._timer.stop()
+
+    @staticmethod
+    def _jitter(interval: float) -> float:
+        return interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)  # nosec B311
+
+    def _schedule(self):
+        waiting = [
+            item.due_at for item in self._items.values() if item.url not in self._urls_in_flight
+        ]
+        if len(waiting) == 0:
+            self._timer.stop()
+            return
+        delay = max(min(waiting) - time.monotonic(), 0.0)
+        self._timer.start(int(delay * 1000))
+
+    def _poll_due_items(self):
+        from .request_manager import RequestManager
+
+        now = time.monotonic()
+        for poll_id, item in list(self._items.items()):
+            if item.deadline <= now:
+                self._items.pop(poll_id)
+                if item.on_timeout:
+                    item.on_timeout()
+        due_urls = {
+            item.url
+            for item in self._items.values()
+            if item.due_at <= now and item.url not in self._urls_in_flight
+        }
+        for url in due_urls:
+            self._urls_in_flight.add(url)
+            request = RequestManager.RequestData(
+                url, type="GET", priority=RequestManager.Priority.polling
+            )
+
+            def next_func(response, url=url):
+                self._on_response(url, response)
+
+            self._request_manager.add_requests(request).connect(next_func)
+        self._schedule()
+
+    def _on_response(self, url: str, response: "RequestManager.ResponseData"):
+        self._urls_in_flight.discard(url)
+        for poll_id, item in list(self._items.items()):
+            if item.url != url or poll_id not in self._items:
+                continue
+            if item.callback(response):
+                self._items.pop(poll_id, None)
+                continue
+            item.interval = min(item.interval * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+            item.due_at = time.monotonic() + self._jitter(item.interval)
+        self._schedule()
@@ -0,0 +1,158 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+from typing import Callable
+
+from qgis.PyQt.QtCore import QTimer
+
+
+class RequestFuture:
+    """
+    Result of an asynchronous request, or of a chain of requests, available later.
+
+    Callbacks are called on the thread of the event loop that resolves the future, without ever
+    blocking it. then() chains a callback and returns the future of its result; a callback
+    returning a RequestFuture is waited for before the chained future resolves.
+    Canceling a future cancels what it waits for, and its chained callbacks are not called.
+    """
+
+    def __init__(self):
+        self._done = False
+        self._canceled = False
+        self._result = None
+        self._callbacks: list[Callable[[any], None]] = []
+        self._cancel_handler: Callable[[], None] = None
+        self._timer: QTimer = None
+        # results of a canceled or timed out future, set by the creator of the future
+        self.canceled_result = None
+        self.timeout_result = None
+
+    @classmethod
+    def resolved(cls, result: any) -> "RequestFuture":
+        """a future already resolved with `result`"""
+        future = cls()
+        future.set_result(result)
+        return future
+
+    @classmethod
+    def gather(cls, futures: list["RequestFuture"]) -> "RequestFuture":
+        """
+        Future resolved with the list of the results of `futures`, in the same order, once all
+        of them are resolved. Canceling it cancels all of them.
+        """
+        gathered = cls()
+        futures = list(futures)
+        results = [None] * len(futures)
+        remaining = len(futures)
+        if remaining == 0:
+            gathered.set_result(results)
+            return gathered
+
+        def on_done(result, index: int):
+            nonlocal remaining
+            results[index] = result
+            remaining -= 1
+            if remaining == 0:
+                gathered.set_result(results)
+
+        gathered.set_cancel_handler(lambda: [future.cancel() for future in futures])
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda result, index=index: on_done(result, index))
+        return gathered
+
+    def done(self) -> bool:
+        return self._done
+
+    def canceled(self) -> bool:
+        return self._canceled
+
+    def result(self) -> any:
+        """the result of the future, None while it is not resolved"""
+        return self._result
+
+    def set_result(self, result: any):
+        if self._done:
+            return
+        self._done = True
+        self._result = result
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(result)
+
+    def set_cancel_handler(self, cancel_handler: Callable[[], None]):
+        """set the function stopping the work of the future when it is canceled"""
+        self._cancel_handler = cancel_handler
+
+    def add_done_callback(self, callback: Callable[[any], None]) -> "RequestFuture":
+        """call `callback` with the result, immediately if the future is already resolved"""
+        if self._done:
+            callback(self._result)
+        else:
+            self._callbacks.append(callback)
+        return self
+
+    def then(self, callback: Callable[[any], any]) -> "RequestFuture":
+        """
+        Chain a callback, called with the result of this future.
+
+        :return: the future of the value returned by the callback
+        """
+        chained = RequestFuture()
+        chained.set_cancel_handler(self.cancel)
+
+        def on_done(result):
+            if self._canceled:
+                chained.cancel()
+                return
+            if chained.done():
+                return
+            value = callback(result)
+            if isinstance(value, RequestFuture):
+                chained.set_cancel_handler(value.cancel)
+                value.add_done_callback(
+                    lambda value_result: (
+                        chained.cancel() if value.canceled() else chained.set_result(value_result)
+                    )
+                )
+            else:
+                chained.set_result(value)
+
+        self.add_done_callback(on_done)
+        return chained
+
+    def cancel(self, result: any = None):
+        """
+        Cancel the future, it is resolved with `result` or with its canceled_result.
+        Does nothing if the future is already resolved.
+        """
+        if self._done:
+            return
+        self._canceled = True
+        cancel_handler, self._cancel_handler = self._cancel_handler, None
+        if cancel_handler is not None:
+            cancel_handler()
+        self.set_result(result if result is not None else self.canceled_result)
+
+    def set_timeout(self, timeout: float) -> "RequestFuture":
+        """cancel the future with its timeout_result if not resolved after `timeout` seconds"""
+        if self._done:
+            return self
+        if self._timer is not None:
+            self._timer.stop()
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(lambda: self.cancel(self.timeout_result))
+        self._timer.start(int(timeout * 1000))
+        return self
@@ -11,23 +11,56 @@
 # -----------------------------------------------------------
 
 import json
+import time
+import urllib.parse
 import uuid
+from collections import deque
+from enum import Enum
+from typing import Callable, Union
 
 from qgis.core import (
+    QgsApplication,
     QgsBlockingNetworkRequest,
     QgsMessageLog,
     QgsNetworkAccessManager,
     QgsNetworkReplyContent,
+    QgsTask,
 )
-from qgis.PyQt.QtCore import QEventLoop, QObject, Qt, QUrl, pyqtSignal
+from qgis.PyQt.QtCore import QEventLoop, QIODevice, QObject, Qt, QThread, QTimer, QUrl, pyqtSignal
 from qgis.PyQt.QtNetwork import QNetworkReply, QNetworkRequest
 
-from ..constant import AUTH_CONFIG_ID
+from ..constant import (
+    API_AUTH_URL,
+    API_DAS_URL,
+    API_FUS_URL,
+    API_MCS_URL,
+    API_MIS_URL,
+    API_VTCS_URL,
+    AUTH_CONFIG_ID,
+)
 from ..qgs_message_bar_handler import Qgis, QgsMessageBarHandler
 from ..services.session_manager import SessionManager
 from ..signal_object import TemporarySignalObject
+from .poll_scheduler import PollScheduler
+from .request_future import RequestFuture
+from .response_cache import ResponseCache
+from .retry_policy import CircuitBreaker, get_retry_after, get_retry_policy, is_transient_failure
 
 MESSAGE_CATEGORY = "RequestManager"
+# share of the dispatched requests of each priority, when several priorities are waiting
+PRIORITY_WEIGHTS = {"INTERACTIVE": 8, "METADATA": 4, "BULK": 2, "POLLING": 1}
+# maximum requests in flight by JMap service, so bulk uploads can not starve the other services
+SERVICE_MAX_CONCURRENT = {
+    API_AUTH_URL: 2,
+    API_MCS_URL: 6,
+    API_VTCS_URL: 4,
+    API_MIS_URL: 4,
+    API_DAS_URL: 4,
+    API_FUS_URL: 6,
+}
+MAX_CONCURRENT_PER_HOST = 6  # other hosts
+WAIT_TIME_SAMPLES = 1000  # per priority, for the wait time percentiles
+JSON_DECODE_THRESHOLD = 512 * 1024  # bytes, larger JSON replies are decoded in a DecodeJsonTask
 
 
 class RequestManager(QObject):
@@ -37,6 +70,14 @@ class RequestManager(QObject):
     A class for making requests_data to the JMap API and handling the response and errors.
     """
 
+    class Priority(Enum):
+        """queue classes of the requests, see PRIORITY_WEIGHTS"""
+
+        interactive = "INTERACTIVE"  # the user is waiting for the response
+        metadata = "METADATA"
+        bulk = "BULK"  # file uploads
+        polling = "POLLING"
+
     class RequestData:
         def __init__(
             self,
@@ -46,10 +87,25 @@ class RequestManager(QObject):
             type: str = "GET",
             id: str = None,
             no_auth: bool = False,
+            cache: bool = False,
+            priority: "RequestManager.Priority" = None,
+            idempotent: bool = None,
         ):
             self.url = url
             self.headers = headers
             self.no_auth = no_auth
+            # GET responses can be reused from the response cache
+            self.cache = cache and type == "GET"
+            self.priority = priority or RequestManager.Priority.metadata
+            # a canceled request is dropped if it is still queued
+            self.canceled = False
+            # idempotent requests are retried on more errors, see retry_policy
+            self.retry_policy = get_retry_policy(type, idempotent)
+            self.attempt = 0
+            # the last attempt is the trial request of a half-open circuit
+            self.circuit_trial = False
+            # time.monotonic() when the last attempt left the queue and was sent
+            self.sent_at: float = None
             self.request = None
             self.body = RequestManager._encode_body(body)
             self.type = type
@@ -61,6 +117,11 @@ class RequestManager(QObject):
             if self.request is None:
                 self.request = request_manager._prepare_request(self.url, self.headers, self.no_auth)
 
+        def rewind_body(self):
+            # a streamed body must be read from the start every time the request is sent
+            if isinstance(self.body, QIODevice):
+                self.body.reset()
+
     class ResponseData:
         def __init__(
             self,
@@ -69,54 +130,349 @@ class RequestManager(QObject):
             status: QNetworkReply.NetworkError = None,
             error_message: str = None,
             id=None,
+            status_code: int = None,
         ):
             self.content = content
             self.headers = headers
             self.status = status
             self.error_message = error_message
             self.id = id
+            # HTTP status code, None if the server did not answer
+            self.status_code = status_code
 
         @classmethod
         def no_reply(cls):
             return cls(None, None, None, QNetworkReply.NetworkError.UnknownContentError)
 
-    def __init__(self, session_manager: SessionManager, max_concurrent: int = 10):
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        max_concurrent: int = 10,
+        max_concurrent_per_host: int = MAX_CONCURRENT_PER_HOST,
+    ):
         super().__init__()
         self.session_manager = session_manager
         self.nam = QgsNetworkAccessManager()
         self.max_concurrent = max_concurrent
+        self.max_concurrent_per_host = max_concurrent_per_host
         self.active_requests = 0
-        self.queue: list[tuple["RequestManager.RequestData", TemporarySignalObject]] = []
+        self.active_requests_per_pool: dict[str, int] = {}
+        # (request, signal object, queued at) by priority
+        self.queues: dict[RequestManager.Priority, deque] = {
+            priority: deque() for priority in self.Priority
+        }
+        self._dispatch_credits = {priority: 0 for priority in self.Priority}
+        self._wait_times = {priority: deque(maxlen=WAIT_TIME_SAMPLES) for priority in self.Priority}
         self.finished_requests = {}
         self.pending_request = {}
+        self.poll_scheduler = PollScheduler(self)
+        self.response_cache = ResponseCache()
+        self.circuit_breakers: dict[str, CircuitBreaker] = {}
+        self._decode_tasks: set[DecodeJsonTask] = set()
+        self._cache_tasks: set[ResponseCacheTask] = set()
+        # dispatches the requests held back by an open circuit when it can be tried again
+        self._circuit_timer = QTimer(self)
+        self._circuit_timer.setSingleShot(True)
+        self._circuit_timer.timeout.connect(self._send_next_request)
         self.trigger_next_request.connect(self._send_next_request, Qt.ConnectionType.QueuedConnection)
 
     def add_requests(self, request: "RequestManager.RequestData") -> pyqtSignal:
-        """add a request to the queue"""
+        """add a request to the queue of its priority"""
         signal_obj = TemporarySignalObject()
-        self.queue.append((request, signal_obj))
-        self.trigger_next_request.emit()
+        self._queue_request(request, signal_obj)
 
         return signal_obj.signal
 
-    def _send_next_request(self):
-        """execute the next request in the queue"""
-        while self.queue and self.active_requests < self.max_concurrent:
+    def _queue_request(
+        self, request: "RequestManager.RequestData", signal_obj: TemporarySignalObject
+    ):
+        self.queues[request.priority].append((request, signal_obj, time.monotonic()))
+        self.trigger_next_request.emit()
 
-            request, signal_obj = self.queue.pop(0)
+    def request(
+        self, request: "RequestManager.RequestData", timeout: float = None, error_prefix: str = None
+    ) -> RequestFuture:
+        """
+        Queue a request, like add_requests, and return the future of its ResponseData.
+        Canceling the future drops the request if it is still queued, or aborts it.
+
+        :param request: The data for the request
+        :param timeout: Optional delay in seconds after which the request is canceled,
+        the future then resolves with a TimeoutError response
+        :param error_prefix: Optional prefix of the message bar warning shown if the request fails
+        :return: the future of the response
+        """
+        future = RequestFuture()
+        future.canceled_result = self.ResponseData(
+            None,
+            None,
+            QNetworkReply.NetworkError.OperationCanceledError,
+            "Request canceled",
+            request.id,
+        )
+        future.timeout_result = self.ResponseData(
+            None, None, QNetworkReply.NetworkError.TimeoutError, "Request timed out", request.id
+        )
+
+        def cancel():
+            request.canceled = True
+            reply = self.pending_request.get(request.id)
+            if reply is not None:
+                reply.abort()
+
+        future.set_cancel_handler(cancel)
+        self.add_requests(request).connect(future.set_result)
+        if error_prefix is not None:
+
+            def show_error(response: RequestManager.ResponseData):
+                if response.status not in (
+                    QNetworkReply.NetworkError.NoError,
+                    QNetworkReply.NetworkError.OperationCanceledError,
+                ):
+                    message = "{}, {}".format(response.error_message, response.content)
+                    QgsMessageBarHandler.send_message_to_message_bar(
+                        message, prefix=error_prefix, level=Qgis.MessageLevel.Warning
+                    )
+
+            future.add_done_callback(show_error)
+        if timeout is not None:
+            future.set_timeout(timeout)
+        return future
 
-            def _handle_queue_response(response: RequestManager.ResponseData, signal_obj=signal_obj):
+    def _send_next_request(self):
+        """execute the next requests in the queues"""
+        while self.active_requests < self.max_concurrent:
+            priority = self._next_priority()
+            if priority is None:
+                break
+            request, signal_obj, queued_at = self.queues[priority].popleft()
+            if request.canceled:
+                continue
+            self._wait_times[priority].append(time.monotonic() - queued_at)
+            pool = self._get_pool(request.url)
+
+            def _handle_queue_response(
+                response: RequestManager.ResponseData,
+                request=request,
+                signal_obj=signal_obj,
+                pool=pool,
+            ):
                 self.pending_request.pop(response.id, None)
-                signal_obj.signal.emit(response)
                 self.active_requests -= 1
+                self.active_requests_per_pool[pool] -= 1
+                if request.circuit_trial:
+                    self._end_circuit_trial(request, response, pool)
+                retry_delay = self._retry_delay(request, response)
+                if retry_delay is None:
+                    signal_obj.signal.emit(response)
+                else:
+                    QTimer.singleShot(
+                        int(retry_delay * 1000), lambda: self._requeue(request, signal_obj)
+                    )
                 self._send_next_request()
 
-            self.pending_request[request.id] = self.custom_request_async(request, _handle_queue_response)
             self.active_requests += 1
+            self.active_requests_per_pool[pool] = self.active_requests_per_pool.get(pool, 0) + 1
+            request.circuit_trial = self._get_circuit_breaker(pool).on_send()
+            self.pending_request[request.id] = self.custom_request_async(
+                request, _handle_queue_response
+            )
+
+        self._schedule_circuit_timer()
+        if self.active_requests == 0 and any(self._wait_times.values()):
+            self.log_queue_stats()
+
+    def _requeue(self, request: "RequestManager.RequestData", signal_obj: TemporarySignalObject):
+        """queue a request to retry before the requests of its priority"""
+        if request.canceled:
+            return
+        self.queues[request.priority].appendleft((request, signal_obj, time.monotonic()))
+        self._send_next_request()
+
+    def _schedule_circuit_timer(self):
+        """wake the dispatch up when the first open circuit holding back a request can be tried"""
+        delays = [
+            self._get_circuit_breaker(self._get_pool(queue[0][0].url)).delay()
+            for queue in self.queues.values()
+            if queue
+        ]
+        delays = [delay for delay in delays if delay > 0]
+        if delays and not self._circuit_timer.isActive():
+            self._circuit_timer.start(int(min(delays) * 1000) + 1)
+
+    def _end_circuit_trial(
+        self,
+        request: "RequestManager.RequestData",
+        response: "RequestManager.ResponseData",
+        pool: str,
+    ):
+        """
+        Release the trial of a half-open circuit that _retry_delay does not record, else the
+        circuit never lets a request through again.
+        """
+        request.circuit_trial = False
+        if not request.canceled and (
+            response.status_code is not None
+            or is_transient_failure(response.status_code, response.status)
+        ):
+            return  # recorded as a success or a failure by _retry_delay
+        failed = not request.canceled and response.status != QNetworkReply.NetworkError.NoError
+        if self._get_circuit_breaker(pool).release_trial(failed):
+            QgsMessageLog.logMessage(
+                "The trial request to {} failed, requests are held back for {:.0f}s".format(
+                    pool, self._get_circuit_breaker(pool).delay()
+                ),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
+
+    def _get_circuit_breaker(self, pool: str) -> CircuitBreaker:
+        circuit_breaker = self.circuit_breakers.get(pool)
+        if circuit_breaker is None:
+            # setdefault is atomic, the blocking requests can run in several tasks threads
+            circuit_breaker = self.circuit_breakers.setdefault(pool, CircuitBreaker(pool))
+        return circuit_breaker
+
+    def _retry_delay(
+        self, request: "RequestManager.RequestData", response: "RequestManager.ResponseData"
+    ) -> Union[float, None]:
+        """
+        Record a response in the circuit breaker of its service.
+
+        :return: the seconds to wait before sending the request again,
+        None if it must not be retried
+        """
+        if request.canceled:
+            return None
+        pool = self._get_pool(request.url)
+        circuit_breaker = self._get_circuit_breaker(pool)
+        if is_transient_failure(response.status_code, response.status):
+            if circuit_breaker.record_failure():
+                QgsMessageLog.logMessage(
+                    "Too many failures, requests to {} are held back for {:.0f}s".format(
+                        pool, circuit_breaker.delay()
+                    ),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Warning,
+                )
+        elif response.status_code is not None and circuit_breaker.record_success():
+            QgsMessageLog.logMessage(
+                "Requests to {} are sent again".format(pool),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Info,
+            )
+
+        policy = request.retry_policy
+        if not policy.should_retry(request.attempt, response.status_code, response.status):
+            return None
+        delay = max(
+            policy.delay(request.attempt, get_retry_after(response.headers)),
+            circuit_breaker.delay(),
+        )
+        request.attempt += 1
+        QgsMessageLog.logMessage(
+            "Retrying {} {} in {:.1f}s ({}/{}): {}".format(
+                request.type,
+                request.url,
+                delay,
+                request.attempt,
+                policy.max_retries,
+                response.status_code or response.error_message,
+            ),
+            MESSAGE_CATEGORY,
+            Qgis.MessageLevel.Info,
+        )
+        return delay
+
+    def _send_with_retries(
+        self,
+        request_data: "RequestManager.RequestData",
+        send: Callable[[], "RequestManager.ResponseData"],
+    ) -> "RequestManager.ResponseData":
+        """
+        Call send() until its response does not need to be retried, sleeping between the attempts.
+        Only for the blocking requests, sent outside the main thread.
+        """
+        circuit_breaker = self._get_circuit_breaker(self._get_pool(request_data.url))
+        while True:
+            time.sleep(circuit_breaker.delay())
+            response = send()
+            retry_delay = self._retry_delay(request_data, response)
+            if retry_delay is None:
+                return response
+            time.sleep(retry_delay)
+
+    def _next_priority(self) -> "RequestManager.Priority":
+        """
+        Smooth weighted round robin between the priorities whose next request can be sent:
+        each priority gets PRIORITY_WEIGHTS of the dispatches, without bursts of one priority.
+        """
+        candidates = [
+            priority
+            for priority, queue in self.queues.items()
+            if queue and self._pool_has_capacity(queue[0][0].url)
+        ]
+        if not candidates:
+            return None
+        total_weight = 0
+        for priority in candidates:
+            self._dispatch_credits[priority] += PRIORITY_WEIGHTS[priority.value]
+            total_weight += PRIORITY_WEIGHTS[priority.value]
+        chosen = max(candidates, key=self._dispatch_credits.get)
+        self._dispatch_credits[chosen] -= total_weight
+        return chosen
+
+    @staticmethod
+    def _get_pool(url: str) -> str:
+        """the JMap service of a url, or its host for the other urls"""
+        for service_url in SERVICE_MAX_CONCURRENT:
+            if url.startswith(service_url):
+                return service_url
+        return urllib.parse.urlsplit(url).netloc
+
+    def _pool_has_capacity(self, url: str) -> bool:
+        pool = self._get_pool(url)
+        max_concurrent = SERVICE_MAX_CONCURRENT.get(pool, self.max_concurrent_per_host)
+        return (
+            self.active_requests_per_pool.get(pool, 0) < max_concurrent
+            and self._get_circuit_breaker(pool).can_send()
+        )
+
+    def queue_stats(self) -> dict[str, dict[str, float]]:
+        """queue depth and wait time percentiles in seconds, by priority"""
+        stats = {}
+        for priority in self.Priority:
+            wait_times = sorted(self._wait_times[priority])
+            stats[priority.value] = {"depth": len(self.queues[priority])}
+            for percentile in (50, 90, 99):
+                stats[priority.value]["p{}".format(percentile)] = (
+                    wait_times[min(len(wait_times) * percentile // 100, len(wait_times) - 1)]
+                    if wait_times
+                    else 0.0
+                )
+        return stats
+
+    def log_queue_stats(self):
+        """log the queue stats of the requests sent since the last call"""
+        for priority, stats in self.queue_stats().items():
+            samples = len(self._wait_times[self.Priority(priority)])
+            if samples == 0:
+                continue
+            QgsMessageLog.logMessage(
+                "{}: {} requests, depth {}, wait p50 {:.3f}s p90 {:.3f}s p99 {:.3f}s".format(
+                    priority, samples, stats["depth"], stats["p50"], stats["p90"], stats["p99"]
+                ),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Info,
+            )
+        for wait_times in self._wait_times.values():
+            wait_times.clear()
 
     def get_request(self, url: str, headers: dict = {}, error_prefix: str = "JMap Error", no_auth: bool = False) -> ResponseData:
         """
         Perform an blocking GET request to a given URL.
+        Only for the tasks running outside the main thread, the main thread uses request().
+        Transient errors are retried, see retry_policy.
 
         :param url: URL for the request
         :param headers: Optional headers to pass with the request
@@ -127,23 +483,23 @@ class RequestManager(QObject):
         if not no_auth:
             request_manager.setAuthCfg(AUTH_CONFIG_ID)
         request = self._prepare_request(url, headers, no_auth)
-        try:
-            response = request_manager.get(request, forceRefresh=True)
+
+        def send() -> RequestManager.ResponseData:
+            request_manager.get(request, forceRefresh=True)
             reply = request_manager.reply()
-            if response != QgsBlockingNetworkRequest.ErrorCode.NoError:
-                QgsMessageBarHandler.send_message_to_message_bar(
-                    str(reply.content(), "utf-8"), prefix=error_prefix, level=Qgis.MessageLevel.Warning
-                )
+            response_data = self._handle_reply(reply)
+            reply.clear()
+            return response_data
 
+        try:
+            response_data = self._send_with_retries(self.RequestData(url, type="GET"), send)
         except Exception as e:
             QgsMessageBarHandler.send_message_to_message_bar(str(e), prefix=error_prefix, level=Qgis.MessageLevel.Critical)
             return self.ResponseData.no_reply()
 
-        if response != QgsBlockingNetworkRequest.ErrorCode.NoError:
-            message = "{}, {}".format(reply.errorString(), str(reply.content(), "utf-8"))
+        if response_data.status != QNetworkReply.NetworkError.NoError:
+            message = "{}, {}".format(response_data.error_message, response_data.content)
             QgsMessageBarHandler.send_message_to_message_bar(message, prefix=error_prefix, level=Qgis.MessageLevel.Warning)
-        response_data = self._handle_reply(reply)
-        reply.clear()
         return response_data
 
     def post_request(
@@ -151,6 +507,8 @@ class RequestManager(QObject):
     ) -> ResponseData:
         """
         Perform an blocking POST request to a given URL.
+        Only for the tasks running outside the main thread, the main thread uses request().
+        Only the requests the server did not process are retried, see retry_policy.
 
         :param url: URL for the request
         :param body: The body of the request
@@ -162,66 +520,182 @@ class RequestManager(QObject):
         if not no_auth:
             request_manager.setAuthCfg(AUTH_CONFIG_ID)
         request = self._prepare_request(url, headers, no_auth)
-        try:
-            response = request_manager.post(
+
+        def send() -> RequestManager.ResponseData:
+            request_manager.post(
                 request,
                 self._encode_body(body),
                 forceRefresh=True,
             )
-
             reply = request_manager.reply()
+            response_data = self._handle_reply(reply)
+            reply.clear()
+            return response_data
 
+        try:
+            response_data = self._send_with_retries(self.RequestData(url, type="POST"), send)
         except Exception as e:
             QgsMessageLog.logMessage(str(e), MESSAGE_CATEGORY, Qgis.MessageLevel.Warning)
             return self.ResponseData.no_reply()
 
-        if response != QgsBlockingNetworkRequest.ErrorCode.NoError:
-            message = "{}, {}".format(reply.errorString(), str(reply.content(), "utf-8"))
+        if response_data.status != QNetworkReply.NetworkError.NoError:
+            message = "{}, {}".format(response_data.error_message, response_data.content)
             QgsMessageLog.logMessage(message, MESSAGE_CATEGORY, Qgis.MessageLevel.Warning)
-        response_data = self._handle_reply(reply)
-        reply.clear()
         return response_data
 
     def custom_request(self, request_data: RequestData) -> ResponseData:
         """
         Perform a blocking custom request to a given URL.
+        Only for the tasks running outside the main thread, the main thread uses request().
+        Transient errors are retried according to the retry policy of the request.
 
         :param request_data: The data for the request
         :return: a ResponseData object
         """
-        request_data.ensure_prepared(self)
-        request_manager = QgsNetworkAccessManager.instance()
-        if request_data.body is None:
-            reply = request_manager.sendCustomRequest(request_data.request, request_data.type.encode())
-        else:
-            reply = request_manager.sendCustomRequest(
-                request_data.request, request_data.type.encode(), request_data.body
-            )
+
+        def send() -> RequestManager.ResponseData:
+            request_data.ensure_prepared(self)
+            request_data.rewind_body()
+            request_manager = QgsNetworkAccessManager.instance()
+            if request_data.body is None:
+                reply = request_manager.sendCustomRequest(
+                    request_data.request, request_data.type.encode()
+                )
+            else:
+                reply = request_manager.sendCustomRequest(
+                    request_data.request, request_data.type.encode(), request_data.body
+                )
+            loop = QEventLoop()
+            reply.finished.connect(loop.quit)
+            loop.exec()
+            return self._handle_reply(reply, request_data.id)
+
+        response = self._send_with_retries(request_data, send)
+        self._invalidate_response_cache(request_data, response)
+        return response
+
+    def multi_request(
+        self,
+        requests_data: list[RequestData],
+        callback: callable = None,
+    ) -> dict[str, ResponseData]:
+        """
+        Queue multiple requests and wait for all of their responses.
+        The requests go through the queues like add_requests, so their priority, the limits of
+        SERVICE_MAX_CONCURRENT and the circuit breakers apply, and transient errors are retried.
+        Like custom_request, it runs its own event loop, so it can be used inside a QgsTask.
+
+        :param requests_data: The list of data for the requests
+        :param callback: Optional callback called with each response as it arrives,
+        in the thread calling multi_request
+        :return: the responses, by request id
+        """
+        responses: dict[str, RequestManager.ResponseData] = {}
+        remaining = len(requests_data)
+        if remaining == 0:
+            return responses
         loop = QEventLoop()
-        reply.finished.connect(loop.quit)
+
+        def on_response(response: RequestManager.ResponseData):
+            nonlocal remaining
+            responses[response.id] = response
+            if callback:
+                callback(response)
+            # counted by request, several requests can share an id
+            remaining -= 1
+            if remaining == 0:
+                loop.quit()
+
+        # kept until the loop ends, so no queued response is dropped with its signal object
+        signal_objs = []
+        for request_data in requests_data:
+            signal_obj = TemporarySignalObject()
+            # the queue answers on the main thread, the responses are delivered to the event
+            # loop of the calling thread. Connected before queuing, a cached response can be
+            # emitted before add_requests would return
+            signal_obj.signal.connect(on_response, Qt.ConnectionType.QueuedConnection)
+            signal_objs.append(signal_obj)
+            self._queue_request(request_data, signal_obj)
         loop.exec()
-        response_data = self._handle_reply(reply, request_data.id)
-        return response_data
+        return responses
 
-    def custom_request_async(self, request_data: RequestData, callback: callable = None) -> QNetworkReply:
+    def custom_request_async(
+        self, request_data: RequestData, callback: callable = None
+    ) -> QNetworkReply:
         """
         Perform an async custom request to a given URL.
 
         :param request_data: The data for the request
         :param callback: The callback to call when the request is finished
         you can connect the callback with the reply finished signal
-        :return: The QNetworkReply object that will emit the finished signal
+        :return: The QNetworkReply object that will emit the finished signal,
+        None if the request is first looked up in the response cache
         """
         request_data.ensure_prepared(self)
+        request_data.rewind_body()
+        if not request_data.cache:
+            return self._send_custom_request_async(request_data, callback)
+
+        url = request_data.url
+        user = self.session_manager.get_username()
+
+        def look_up() -> tuple[ResponseCache.Entry, bool]:
+            cache_entry = self.response_cache.get(url, user)
+            fresh = cache_entry is not None and self.response_cache.is_fresh(url, cache_entry)
+            if fresh:
+                self.response_cache.record_hit()
+                self.response_cache.log_stats()
+            return cache_entry, fresh
+
+        def on_looked_up(result: tuple[ResponseCache.Entry, bool]):
+            cache_entry, fresh = result or (None, False)
+            if request_data.canceled:
+                if callback:
+                    callback(
+                        self.ResponseData(
+                            None,
+                            None,
+                            QNetworkReply.NetworkError.OperationCanceledError,
+                            "Request canceled",
+                            request_data.id,
+                        )
+                    )
+                return
+            if fresh:
+                if callback:
+                    callback(self._cached_response(cache_entry, request_data.id))
+                return
+            self.pending_request[request_data.id] = self._send_custom_request_async(
+                request_data, callback, cache_entry, user
+            )
+
+        self._run_cache_operation(look_up, on_looked_up)
+        return None
+
+    def _send_custom_request_async(
+        self,
+        request_data: RequestData,
+        callback: callable = None,
+        cache_entry: ResponseCache.Entry = None,
+        user: str = None,
+    ) -> QNetworkReply:
+        """send a request, made conditional if a stale cache entry can be revalidated"""
+        request = request_data.request
+        if cache_entry is not None:
+            request = QNetworkRequest(request)
+            for key, value in self.response_cache.validators(cache_entry).items():
+                request.setRawHeader(key.encode(), value.encode())
+
         request_manager = QgsNetworkAccessManager.instance()
+        request_data.sent_at = time.monotonic()
         if request_data.body is None:
             reply = request_manager.sendCustomRequest(
-                request_data.request,
+                request,
                 request_data.type.encode(),
             )
         else:
             reply = request_manager.sendCustomRequest(
-                request_data.request,
+                request,
                 request_data.type.encode(),
                 request_data.body,
             )
@@ -231,12 +705,122 @@ class RequestManager(QObject):
                     reply.finished.disconnect(on_finished)
                 except Exception:
                     pass
-                response_data = self._handle_reply(reply, id)
-                callback(response_data)
+
+                def on_response(response_data: RequestManager.ResponseData):
+                    if request_data.cache:
+                        self._update_response_cache(
+                            request_data.url, user, response_data, cache_entry, callback
+                        )
+                    else:
+                        self._invalidate_response_cache(request_data, response_data, callback)
+
+                self._handle_reply_async(reply, id, on_response)
 
             reply.finished.connect(on_finished)
         return reply
 
+    def _cached_response(self, cache_entry: ResponseCache.Entry, id: str) -> ResponseData:
+        return self.ResponseData(
+            cache_entry.content, cache_entry.headers, QNetworkReply.NetworkError.NoError, "", id
+        )
+
+    def _update_response_cache(
+        self,
+        url: str,
+        user: str,
+        response_data: ResponseData,
+        cache_entry: ResponseCache.Entry,
+        callback: Callable[[ResponseData], None],
+    ):
+        """Serve a 304 Not Modified response from the cache, or store a new response"""
+        if response_data.status_code == 304 and cache_entry is not None:
+            self.response_cache.record_revalidated()
+            callback(self._cached_response(cache_entry, response_data.id))
+
+            def refresh():
+                self.response_cache.refresh(url, user)
+                self.response_cache.log_stats()
+
+            self._run_cache_operation(refresh)
+            return
+
+        self.response_cache.record_miss()
+        if (
+            response_data.status_code != 200
+            or response_data.status != QNetworkReply.NetworkError.NoError
+        ):
+            callback(response_data)
+            self._run_cache_operation(self.response_cache.log_stats)
+            return
+
+        def store():
+            self.response_cache.store(url, user, response_data.content, response_data.headers)
+            self.response_cache.log_stats()
+
+        # the content is serialized by the store, it is only handed over once stored
+        self._run_cache_operation(store, lambda _result: callback(response_data))
+
+    def _invalidate_response_cache(
+        self,
+        request_data: RequestData,
+        response_data: ResponseData,
+        callback: Callable[[ResponseData], None] = None,
+    ):
+        """
+        Drop the cached responses of the organization modified by a request, before its response
+        is handed over, so a request sent on that response is not answered from the cache.
+        """
+        if (
+            request_data.type == "GET"
+            or response_data.status != QNetworkReply.NetworkError.NoError
+        ):
+            if callback:
+                callback(response_data)
+            return
+        url = request_data.url
+        self._run_cache_operation(
+            lambda: self.response_cache.invalidate(url),
+            (lambda _result: callback(response_data)) if callback else None,
+        )
+
+    def _run_cache_operation(
+        self, operation: Callable[[], any], callback: Callable[[any], None] = None
+    ):
+        """
+        Run a response cache operation in a ResponseCacheTask, the cache reads and writes files
+        and serializes the responses. The blocking requests of the tasks are already outside the
+        main thread, they run it directly.
+
+        :param callback: called with the result of the operation, None if it failed
+        """
+        if QThread.currentThread() != QgsApplication.instance().thread():
+            result = operation()
+            if callback:
+                callback(result)
+            return
+
+        task = ResponseCacheTask(operation)
+
+        def on_completed():
+            self._cache_tasks.remove(task)
+            if task.exception is not None:
+                QgsMessageLog.logMessage(
+                    "Response cache operation failed: {}".format(task.exception),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Warning,
+                )
+            if callback:
+                callback(task.result)
+
+        task.operation_completed.connect(on_completed)
+        # the task manager does not keep a reference to the python object
+        self._cache_tasks.add(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def clear_response_cache(self):
+        """remove every cached response, when the user logs out"""
+        self._run_cache_operation(self.response_cache.clear)
+
     def multi_request_async(self, requests_data: list[RequestData]) -> pyqtSignal:
         """
         Perform multiple async custom requests to given URLs. and emit a signal when all requests are finished
@@ -255,21 +839,21 @@ class RequestManager(QObject):
             nonlocal signal_object
             no_request_finished += 1
             replies[id] = reply
-            request_manager.pending_request.pop(id)
 
             if no_request_finished >= len(requests_data):
                 signal_object.signal.emit(replies)
 
+        # queued like the other requests, so they are retried on transient errors
         for request_data in requests_data:
             recursive_callback = lambda reply, id=request_data.id: request_counter(reply, id)
-            request_manager.pending_request[request_data.id] = self.custom_request_async(
-                request_data, recursive_callback
-            )
+            request_manager.add_requests(request_data).connect(recursive_callback)
         return signal_object.signal
 
     def _prepare_request(self, url, headers: dict[str, str] = {}, no_auth: bool = False) -> QNetworkRequest:
         request = QNetworkRequest(QUrl(url))
         request.setHeader(QNetworkRequest.KnownHeaders.ContentTypeHeader, "application/json")
+        # multiplex the requests to a server on one connection when it supports HTTP/2
+        request.setAttribute(QNetworkRequest.Attribute.Http2AllowedAttribute, True)
         if not no_auth:
             request.setRawHeader("Authorization".encode(), f"Bearer {self.session_manager.get_access_token()}".encode())
         for key, value in headers.items():
@@ -295,27 +879,80 @@ class RequestManager(QObject):
     def _handle_reply(self, reply, id=None):
         if isinstance(reply, QgsNetworkReplyContent):
             content = reply.content()
-            error_string = reply.errorString()
-            if reply.rawHeader("Content-type".encode()) == b"application/json":
-                if content == "":
-                    content = "{}"
-                content = json.loads(str(content, "utf-8"))
-                if "result" in content:
-                    content = content["result"]
+            if self._is_json_reply(reply):
+                content = self._parse_json(str(content, "utf-8"))
         elif isinstance(reply, QNetworkReply):
-            content = reply.readAll().data().decode("utf-8")
-            if reply.rawHeader("Content-type".encode()) == b"application/json":
-                if content == "":
-                    content = "{}"
-                content = json.loads(content)
-                if "result" in content:
-                    content = content["result"]
+            content = reply.readAll().data()
+            try:
+                content = content.decode("utf-8")
+            except UnicodeDecodeError:
+                pass  # binary content, like images, is kept as bytes
+            if self._is_json_reply(reply):
+                content = self._parse_json(content)
+
+        return self._reply_response(reply, content, id)
+
+    def _handle_reply_async(
+        self,
+        reply: QNetworkReply,
+        id: str,
+        callback: Callable[["RequestManager.ResponseData"], None],
+    ):
+        """
+        Like _handle_reply, but JSON bodies larger than JSON_DECODE_THRESHOLD are decoded in a
+        DecodeJsonTask, so the main thread does not stall on them.
 
+        :param callback: called with the response and its parsed content
+        """
+        if (
+            not self._is_json_reply(reply)
+            or reply.bytesAvailable() < JSON_DECODE_THRESHOLD
+            # the blocking requests of the tasks are already outside the main thread
+            or QThread.currentThread() != QgsApplication.instance().thread()
+        ):
+            callback(self._handle_reply(reply, id))
+            return
+
+        task = DecodeJsonTask(reply.readAll().data())
+
+        def on_decoded():
+            self._decode_tasks.remove(task)
+            content = task.content
+            if task.exception is not None:
+                QgsMessageLog.logMessage(
+                    "Unable to decode response {}: {}".format(id, task.exception),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Critical,
+                )
+                content = task.data.decode("utf-8", errors="replace")
+            callback(self._reply_response(reply, content, id))
+
+        task.decode_completed.connect(on_decoded)
+        # the task manager does not keep a reference to the python object
+        self._decode_tasks.add(task)
+        QgsApplication.taskManager().addTask(task)
+
+    @staticmethod
+    def _is_json_reply(reply) -> bool:
+        return reply.rawHeader("Content-type".encode()) == b"application/json"
+
+    @staticmethod
+    def _parse_json(text: str) -> any:
+        if text == "":
+            text = "{}"
+        content = json.loads(text)
+        if "result" in content:
+            content = content["result"]
+        return content
+
+    def _reply_response(self, reply, content: any, id=None) -> ResponseData:
         error_code = reply.error()
         error_string = ""
         if error_code != QNetworkReply.NetworkError.NoError:
             QgsMessageLog.logMessage(
-                self.tr("Error occurred {}").format(content), MESSAGE_CATEGORY, Qgis.MessageLevel.Critical
+                self.tr("Error occurred {}").format(content),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Critical,
             )
             reply_error_string = reply.errorString()
             if bool(reply_error_string):
@@ -324,5 +961,57 @@ class RequestManager(QObject):
                 error_string += "content : {}\n".format(content)
 
         headers = self._get_headers(reply)
+        status_code = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        status_code = int(status_code) if status_code else None
+
+        return self.ResponseData(content, headers, error_code, error_string, id, status_code)
+
+
+class DecodeJsonTask(QgsTask):
+    """
+    Decode a JSON reply body outside the main thread.
+    decode_completed is emitted from finished(), on the main thread.
+    """
+
+    decode_completed = pyqtSignal()
+
+    def __init__(self, data: bytes):
+        super().__init__("Decode JSON response", QgsTask.Flag.Hidden)
+        self.data = data
+        self.content = None
+        self.exception: Exception = None
+
+    def run(self) -> bool:
+        try:
+            self.content = RequestManager._parse_json(self.data.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            self.exception = e
+        return True
+
+    def finished(self, result: bool):
+        self.decode_completed.emit()
+
+
+class ResponseCacheTask(QgsTask):
+    """
+    Run a response cache operation outside the main thread.
+    operation_completed is emitted from finished(), on the main thread.
+    """
+
+    operation_completed = pyqtSignal()
+
+    def __init__(self, operation: Callable[[], any]):
+        super().__init__("Response cache", QgsTask.Flag.Hidden)
+        self.operation = operation
+        self.result = None
+        self.exception: Exception = None
+
+    def run(self) -> bool:
+        try:
+            self.result = self.operation()
+        except Exception as e:
+            self.exception = e
+        return True
 
-        return self.ResponseData(content, headers, error_code, error_string, id)
+    def finished(self, result: bool):
+        self.operation_completed.emit()
@@ -0,0 +1,262 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+from qgis.core import Qgis, QgsMessageLog
+
+from ..plugin_util import get_plugin_data_dir
+
+CACHE_DIR_NAME = "http_cache"
+INDEX_FILE_NAME = "index.json"
+MAX_CACHE_SIZE = 50 * 1024 * 1024  # bytes
+DEFAULT_TTL = 0.0  # seconds, always revalidate
+# seconds during which a cached response is used without asking the server, by url pattern
+ENDPOINT_TTLS = [
+    (re.compile(r"/projects/?(\?.*)?$"), 30.0),
+    (re.compile(r"/projects/[^/]+/(layers|layers-order|layers-groups|mapbox-styles)/?$"), 10.0),
+]
+# a request modifying a resource of an organization invalidates its cached responses
+ORGANIZATION_PATTERN = re.compile(r"/organizations/[^/?]+/")
+MESSAGE_CATEGORY = "ResponseCache"
+
+
+class ResponseCache:
+    """
+    On disk cache of GET responses, for the requests created with `cache=True`.
+
+    Responses are stored with their validators (ETag, Last-Modified). A response younger than
+    the TTL of its endpoint is used without any request, an older one is revalidated with a
+    conditional request and reused if the server answers 304 Not Modified.
+    Responses are keyed on the user and the url, so a user never gets the responses of another
+    one. A request modifying an organization invalidates the responses of that organization.
+    The cache is bounded by MAX_CACHE_SIZE, least recently used responses are removed first.
+    It reads and writes files, so the main thread calls it from a ResponseCacheTask.
+    """
+
+    class Entry:
+        def __init__(self, content: any, headers: dict, stored_at: float):
+            self.content = content
+            self.headers = headers
+            self.stored_at = stored_at
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = None,
+        max_size: int = MAX_CACHE_SIZE,
+        endpoint_ttls: list[tuple[re.Pattern, float]] = None,
+    ):
+        self._cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_size = max_size
+        self.endpoint_ttls = ENDPOINT_TTLS if endpoint_ttls is None else endpoint_ttls
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._index: dict[str, dict] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self) -> Path:
+        if self._cache_dir is None:
+            self._cache_dir = Path(get_plugin_data_dir(), CACHE_DIR_NAME)
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        return self._cache_dir
+
+    def ttl(self, url: str) -> float:
+        path = url.split("://", 1)[-1]
+        for pattern, ttl in self.endpoint_ttls:
+            if pattern.search(path):
+                return ttl
+        return DEFAULT_TTL
+
+    @staticmethod
+    def make_key(url: str, user: str) -> str:
+        return "{}|{}".format(user, url)
+
+    def get(self, url: str, user: str) -> Union["ResponseCache.Entry", None]:
+        key = self.make_key(url, user)
+        with self._lock:
+            record = self._get_index().get(key)
+            if record is None:
+                return None
+            try:
+                data = json.loads((self.cache_dir / record["file"]).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            record["last_access"] = time.time()
+            return self.Entry(data["content"], data["headers"], record["stored_at"])
+
+    def is_fresh(self, url: str, entry: "ResponseCache.Entry") -> bool:
+        return time.time() - entry.stored_at < self.ttl(url)
+
+    def validators(self, entry: "ResponseCache.Entry") -> dict[str, str]:
+        """headers of a conditional request revalidating the entry"""
+        headers = {}
+        etag = self._find_header(entry.headers, "ETag")
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        last_modified = self._find_header(entry.headers, "Last-Modified")
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def store(self, url: str, user: str, content: any, headers: dict):
+        """store a 200 response, if it has validators or a TTL"""
+        if self.ttl(url) <= 0 and not self.validators(self.Entry(None, headers, 0)):
+            return
+        try:
+            data = json.dumps({"content": content, "headers": headers})
+        except (TypeError, ValueError):
+            return
+        key = self.make_key(url, user)
+        with self._lock:
+            file_name = "{}.json".format(hashlib.sha256(key.encode("utf-8")).hexdigest())
+            try:
+                tmp_path = self.cache_dir / (file_name + ".tmp")
+                tmp_path.write_text(data, encoding="utf-8")
+                os.replace(tmp_path, self.cache_dir / file_name)
+            except OSError as e:
+                QgsMessageLog.logMessage(
+                    "Unable to write cached response {}: {}".format(url, e),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Warning,
+                )
+                return
+            now = time.time()
+            self._get_index()[key] = {
+                "file": file_name,
+                "size": len(data),
+                "stored_at": now,
+                "last_access": now,
+            }
+            self._evict()
+            self._save_index()
+
+    def refresh(self, url: str, user: str):
+        """restart the TTL of an entry revalidated by a 304 response"""
+        with self._lock:
+            record = self._get_index().get(self.make_key(url, user))
+            if record is not None:
+                record["stored_at"] = time.time()
+                self._save_index()
+
+    def invalidate(self, url: str):
+        """remove the responses of the organization modified by a request to `url`"""
+        match = ORGANIZATION_PATTERN.search(url)
+        if match is None:
+            return
+        with self._lock:
+            keys = [key for key in self._get_index() if match.group(0) in key]
+            for key in keys:
+                self._remove(key)
+            if keys:
+                self._save_index()
+
+    def record_hit(self):
+        self.hits += 1
+
+    def record_revalidated(self):
+        self.revalidated += 1
+
+    def record_miss(self):
+        self.misses += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            size = sum(record["size"] for record in self._get_index().values())
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "entries": len(self._get_index()),
+                "size": size,
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        hit_rate = (stats["hits"] + stats["revalidated"]) / lookups if lookups else 0.0
+        QgsMessageLog.logMessage(
+            "{} hits, {} revalidated, {} misses (hit rate {:.0%}), {} entries, {} bytes".format(
+                stats["hits"],
+                stats["revalidated"],
+                stats["misses"],
+                hit_rate,
+                stats["entries"],
+                stats["size"],
+            ),
+            MESSAGE_CATEGORY,
+            Qgis.MessageLevel.Info,
+        )
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._get_index()):
+                self._remove(key)
+            self._save_index()
+            self.hits = 0
+            self.revalidated = 0
+            self.misses = 0
+
+    @staticmethod
+    def _find_header(headers: dict, name: str) -> Union[str, None]:
+        for key, value in (headers or {}).items():
+            if key.lower() == name.lower():
+                return value
+        return None
+
+    def _get_index(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads(
+                    (self.cache_dir / INDEX_FILE_NAME).read_text(encoding="utf-8")
+                )
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        try:
+            (self.cache_dir / INDEX_FILE_NAME).write_text(
+                json.dumps(self._get_index()), encoding="utf-8"
+            )
+        except OSError as e:
+            QgsMessageLog.logMessage(
+                "Unable to write response cache index: {}".format(e),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
+
+    def _remove(self, key: str):
+        record = self._get_index().pop(key, None)
+        if record is not None:
+            try:
+                (self.cache_dir / record["file"]).unlink()
+            except OSError:
+                pass
+
+    def _evict(self):
+        index = self._get_index()
+        size = sum(record["size"] for record in index.values())
+        for key, record in sorted(index.items(), key=lambda item: item[1]["last_access"]):
+            if size <= self.max_size:
+                break
+            size -= record["size"]
+            self._remove(key)
@@ -0,0 +1,235 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Union
+
+from qgis.PyQt.QtNetwork import QNetworkReply
+
+BASE_RETRY_DELAY = 1.0  # seconds
+MAX_RETRY_DELAY = 60.0  # seconds
+MAX_RETRY_AFTER = 300.0  # seconds, longer Retry-After values are not waited for
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# transient server errors
+RETRY_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# the server did not process the request, it can be sent again even if it is not idempotent
+NOT_PROCESSED_STATUS_CODES = frozenset({429, 503})
+NOT_SENT_ERRORS = frozenset(
+    {
+        QNetworkReply.NetworkError.ConnectionRefusedError,
+        QNetworkReply.NetworkError.HostNotFoundError,
+        QNetworkReply.NetworkError.TemporaryNetworkFailureError,
+        QNetworkReply.NetworkError.NetworkSessionFailedError,
+    }
+)
+# the connection failed, the request may have been processed. OperationCanceledError is the
+# error of the replies aborted by the QGIS network timeout
+TRANSIENT_ERRORS = NOT_SENT_ERRORS | frozenset(
+    {
+        QNetworkReply.NetworkError.RemoteHostClosedError,
+        QNetworkReply.NetworkError.TimeoutError,
+        QNetworkReply.NetworkError.OperationCanceledError,
+        QNetworkReply.NetworkError.UnknownNetworkError,
+    }
+)
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures opening the circuit
+CIRCUIT_OPEN_DURATION = 15.0  # seconds, doubled every time the trial request fails
+MAX_CIRCUIT_OPEN_DURATION = 120.0  # seconds
+
+
+class RetryPolicy:
+    """
+    When and after how long a failed request is sent again.
+
+    Delays grow exponentially from `base_delay` with full jitter, so requests failing together
+    are not retried together, and are never shorter than the Retry-After of the response.
+    """
+
+    def __init__(
+        self,
+        max_retries: int,
+        retry_status_codes: frozenset,
+        retry_errors: frozenset,
+        base_delay: float = BASE_RETRY_DELAY,
+        max_delay: float = MAX_RETRY_DELAY,
+    ):
+        self.max_retries = max_retries
+        self.retry_status_codes = retry_status_codes
+        self.retry_errors = retry_errors
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(
+        self, attempt: int, status_code: Union[int, None], error: QNetworkReply.NetworkError
+    ) -> bool:
+        """
+        :param attempt: number of retries already done
+        :param status_code: HTTP status code of the response, None if no response was received
+        :param error: network error of the reply
+        """
+        if attempt >= self.max_retries:
+            return False
+        if status_code is not None:
+            return status_code in self.retry_status_codes
+        return error in self.retry_errors
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """seconds to wait before the retry following `attempt` retries"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+        return delay
+
+
+IDEMPOTENT_RETRY_POLICY = RetryPolicy(4, RETRY_STATUS_CODES, TRANSIENT_ERRORS)
+NON_IDEMPOTENT_RETRY_POLICY = RetryPolicy(2, NOT_PROCESSED_STATUS_CODES, NOT_SENT_ERRORS)
+
+
+def get_retry_policy(method: str, idempotent: bool = None) -> RetryPolicy:
+    """
+    The retry policy of a request.
+
+    :param method: HTTP method of the request
+    :param idempotent: overrides the idempotency of the method, e.g. for a POST that can be
+        sent twice safely
+    """
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    return IDEMPOTENT_RETRY_POLICY if idempotent else NON_IDEMPOTENT_RETRY_POLICY
+
+
+def is_transient_failure(status_code: Union[int, None], error: QNetworkReply.NetworkError) -> bool:
+    """a failure of the server or of the connection, counted by the circuit breakers"""
+    if status_code is not None:
+        return status_code in RETRY_STATUS_CODES
+    return error in TRANSIENT_ERRORS
+
+
+def get_retry_after(headers: Union[dict, None]) -> Union[float, None]:
+    """seconds to wait from the Retry-After header of a response, in seconds or as an HTTP date"""
+    value = None
+    for key, header_value in (headers or {}).items():
+        if key.lower() == "retry-after":
+            value = header_value.strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a failing service.
+
+    After CIRCUIT_FAILURE_THRESHOLD consecutive transient failures the circuit opens: requests
+    are held back until the open duration is over. A single trial request is then sent, its
+    success closes the circuit and its failure opens it again for twice as long.
+    Used from the tasks threads by the blocking requests, so its state is guarded by a lock.
+    """
+
+    closed = "CLOSED"
+    open = "OPEN"
+    half_open = "HALF_OPEN"
+
+    def __init__(self, name: str):
+        self.name = name
+        self._state = self.closed
+        self._failures = 0
+        self._open_duration = CIRCUIT_OPEN_DURATION
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def delay(self) -> float:
+        """seconds before a request can be sent, 0 if it can be sent now"""
+        with self._lock:
+            self._update_state()
+            if self._state == self.open:
+                return max(0.0, self._opened_at + self._open_duration - time.monotonic())
+            return 0.0
+
+    def can_send(self) -> bool:
+        with self._lock:
+            self._update_state()
+            if self._state == self.half_open:
+                return not self._trial_in_flight
+            return self._state == self.closed
+
+    def on_send(self) -> bool:
+        """:return: True if the request is the trial of a half-open circuit"""
+        with self._lock:
+            self._update_state()
+            if self._state == self.half_open:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self, failed: bool = False) -> bool:
+        """
+        End a trial that was neither a success nor a transient failure: canceled, answered from
+        the response cache or failed without an HTTP status.
+
+        :param failed: the trial failed, the circuit opens again
+        :return: True if the circuit opened
+        """
+        with self._lock:
+            if not self._trial_in_flight:
+                return False
+            self._trial_in_flight = False
+            if not failed or self._state != self.half_open:
+                return False
+            self._failures += 1
+            self._open_duration = min(self._open_duration * 2, MAX_CIRCUIT_OPEN_DURATION)
+            self._state = self.open
+            self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self) -> bool:
+        """:return: True if the circuit closed"""
+        with self._lock:
+            closed = self._state != self.closed
+            self._state = self.closed
+            self._failures = 0
+            self._open_duration = CIRCUIT_OPEN_DURATION
+            self._trial_in_flight = False
+            return closed
+
+    def record_failure(self) -> bool:
+        """:return: True if the circuit opened"""
+        with self._lock:
+            self._update_state()
+            self._failures += 1
+            if self._state == self.half_open:
+                self._open_duration = min(self._open_duration * 2, MAX_CIRCUIT_OPEN_DURATION)
+            elif self._state == self.open or self._failures < CIRCUIT_FAILURE_THRESHOLD:
+                return False
+            self._state = self.open
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+            return True
+
+    def _update_state(self):
+        if self._state == self.open and time.monotonic() >= self._opened_at + self._open_duration:
+            self._state = self.half_open
@@ -37,6 +37,11 @@ class SessionManager:
             return self.claims["organizationId"]
         return None
 
+    def get_username(self):
+        if self.claims and "username" in self.claims:
+            return self.claims["username"]
+        return None
+
     def get_access_token(self):
         if self.claims and "accessToken" in self.claims:
             return self.claims["accessToken"]
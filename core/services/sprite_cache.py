@@ -0,0 +1,244 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Union
+
+from qgis.core import Qgis, QgsMessageLog, QgsProject
+from qgis.PyQt.QtGui import QImage
+from qgis.PyQt.QtNetwork import QNetworkReply
+
+from ..plugin_util import get_plugin_data_dir
+from .jmap_services_access import JMapMCS
+from .request_future import RequestFuture
+from .request_manager import RequestManager
+
+SPRITES_DIR_NAME = "sprites"
+ICONS_DIR_NAME = "icons"
+ETAGS_FILE_NAME = "etags.json"
+MESSAGE_CATEGORY = "SpriteCache"
+
+
+class SpriteSheet(Mapping):
+    """
+    Icons of a sprite sheet by icon id, cut out of the sheet the first time they are accessed.
+
+    Extracted icons are kept in the cache folder of the sheet, so later projects using the same
+    sheet only copy them in the project attachments. QgsProject must only be used from the main
+    thread, so the attachments are created beforehand by attach_icons().
+    Icons are accessed from the style tasks, so extraction is guarded by a lock; only the sheet
+    decoding and the icons bookkeeping are serialized, icons are written concurrently.
+    """
+
+    def __init__(self, icons_data: dict, png_path: Path, icons_dir: Path):
+        # selection icons are never used by the layers symbology
+        self._icons_data = {
+            icon_id: icon_data
+            for icon_id, icon_data in icons_data.items()
+            if "selection" not in icon_id
+        }
+        self._png_path = png_path
+        self._icons_dir = icons_dir
+        self._sprite_sheet: QImage = None
+        self._icons: dict[str, dict] = {}
+        self._attached_paths: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, icon_id: str) -> dict:
+        with self._lock:
+            if icon_id in self._icons:
+                return self._icons[icon_id]
+        icon_data = self._icons_data[icon_id]
+
+        icon_path = self._icons_dir / "{}.png".format(hashlib.sha256(icon_id.encode()).hexdigest())
+        if not icon_path.is_file():
+            self._extract_icon(icon_data, icon_path)
+
+        with self._lock:
+            if icon_id not in self._icons:
+                path = self._attached_paths.get(icon_id)
+                if path is None:
+                    # not attached beforehand, the cached icon is used as is
+                    path = str(icon_path)
+                else:
+                    shutil.copyfile(icon_path, path)
+                self._icons[icon_id] = {
+                    "path": path,
+                    "width": icon_data["width"],
+                    "height": icon_data["height"],
+                    "pixelRatio": icon_data["pixelRatio"],
+                }
+            return self._icons[icon_id]
+
+    def attach_icons(self, icon_ids: Iterable[str]):
+        """
+        Create the project attachments of the icons, before the style tasks access them.
+        Must be called from the main thread.
+        """
+        project = QgsProject.instance()
+        for icon_id in icon_ids:
+            if icon_id in self._icons_data and icon_id not in self._attached_paths:
+                self._attached_paths[icon_id] = project.createAttachedFile("{}.png".format(icon_id))
+
+    def __iter__(self):
+        return iter(self._icons_data)
+
+    def __len__(self) -> int:
+        return len(self._icons_data)
+
+    def _extract_icon(self, icon_data: dict, icon_path: Path):
+        with self._lock:
+            # QImage, unlike QPixmap, can be used outside the main thread
+            if self._sprite_sheet is None:
+                self._sprite_sheet = QImage(str(self._png_path))
+            sprite_sheet = self._sprite_sheet
+
+        icon_image = sprite_sheet.copy(
+            icon_data["x"], icon_data["y"], icon_data["width"], icon_data["height"]
+        )
+        # write then rename, another task can be extracting the same icon
+        tmp_path = icon_path.with_name("{}.{}.tmp".format(icon_path.name, threading.get_ident()))
+        icon_image.save(str(tmp_path), "PNG")
+        os.replace(tmp_path, icon_path)
+
+
+class SpriteCache:
+    """
+    On disk cache of the project sprite sheets, by sprite url.
+
+    The sprite json and png are revalidated with their ETag, so an unchanged sprite sheet is not
+    downloaded again. Icons extracted from a previous version of a sheet are discarded when it
+    changes.
+    """
+
+    def __init__(self, jmap_mcs: JMapMCS, cache_dir: Union[str, Path] = None):
+        self.jmap_mcs = jmap_mcs
+        self._cache_dir = Path(cache_dir) if cache_dir is not None else None
+
+    @property
+    def cache_dir(self) -> Path:
+        if self._cache_dir is None:
+            self._cache_dir = Path(get_plugin_data_dir(), SPRITES_DIR_NAME)
+        return self._cache_dir
+
+    def get_sprite_sheet_async(self, url: str) -> RequestFuture:
+        """
+        Get the sprite sheet of a sprite url, downloading it only if it changed.
+
+        :param url: the mapbox style sprite url, without extension
+        :return: the future of the sprite sheet, of None if it can not be loaded
+        """
+        sprite_dir = self.cache_dir / hashlib.sha256(url.encode()).hexdigest()
+        icons_dir = sprite_dir / ICONS_DIR_NAME
+        icons_dir.mkdir(parents=True, exist_ok=True)
+        json_path = sprite_dir / "sprite.json"
+        png_path = sprite_dir / "sprite.png"
+
+        etags = self._load_etags(sprite_dir)
+        # the json and the png are revalidated concurrently
+        updates = RequestFuture.gather(
+            [
+                self._update_file_async("{}.json".format(url), json_path, etags.get("json")),
+                self._update_file_async("{}.png".format(url), png_path, etags.get("png")),
+            ]
+        )
+
+        def load_sprite_sheet(results: list[tuple[str, bool]]) -> Union[SpriteSheet, None]:
+            (json_etag, json_changed), (png_etag, png_changed) = results
+            if not json_path.is_file() or not png_path.is_file():
+                return None
+            if json_changed or png_changed:
+                shutil.rmtree(icons_dir, ignore_errors=True)
+                icons_dir.mkdir(parents=True, exist_ok=True)
+                self._save_etags(sprite_dir, {"json": json_etag, "png": png_etag})
+
+            try:
+                icons_data = json.loads(json_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                QgsMessageLog.logMessage(
+                    "Unable to read sprite {}: {}".format(json_path, e),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Warning,
+                )
+                return None
+            if not bool(icons_data):
+                return None
+            return SpriteSheet(icons_data, png_path, icons_dir)
+
+        return updates.then(load_sprite_sheet)
+
+    def _update_file_async(self, url: str, path: Path, etag: str) -> RequestFuture:
+        """
+        Download a sprite file if it is not cached or if its ETag changed.
+
+        :return: the future of the ETag of the file and whether the file was downloaded
+        """
+        if not path.is_file():
+            etag = None
+        return self.jmap_mcs.get_project_sprite_async(url, etag).then(
+            lambda response: self._write_file(response, path, etag)
+        )
+
+    def _write_file(
+        self, response: RequestManager.ResponseData, path: Path, etag: str
+    ) -> tuple[str, bool]:
+        if response is None or response.status != QNetworkReply.NetworkError.NoError:
+            return etag, False
+        response_etag = self._find_header(response, "ETag")
+        # 304 Not Modified replies carry the ETag that was sent
+        if etag is not None and response_etag == etag:
+            return etag, False
+
+        content = response.content
+        if isinstance(content, (dict, list)):
+            content = json.dumps(content).encode("utf-8")
+        elif isinstance(content, str):
+            content = content.encode("utf-8")
+        elif not isinstance(content, bytes):
+            content = bytes(content)
+        if len(content) == 0:
+            return etag, False
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+        return response_etag, True
+
+    @staticmethod
+    def _find_header(response: RequestManager.ResponseData, name: str) -> Union[str, None]:
+        for key, value in response.headers.items():
+            if key.lower() == name.lower():
+                return value
+        return None
+
+    @staticmethod
+    def _load_etags(sprite_dir: Path) -> dict[str, str]:
+        try:
+            return json.loads((sprite_dir / ETAGS_FILE_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_etags(sprite_dir: Path, etags: dict[str, str]):
+        try:
+            (sprite_dir / ETAGS_FILE_NAME).write_text(json.dumps(etags), encoding="utf-8")
+        except OSError as e:
+            QgsMessageLog.logMessage(
+                "Unable to write sprite ETags {}: {}".format(sprite_dir, e),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
@@ -10,11 +10,14 @@
 # (at your option) any later version.
 # -----------------------------------------------------------
 
-import io
+import copy
+import functools
+import json
 import re
 
 from qgis.core import (
     Qgis,
+    QgsExpression,
     QgsFillSymbol,
     QgsFillSymbolLayer,
     QgsFontMarkerSymbolLayer,
@@ -24,8 +27,8 @@ from qgis.core import (
     QgsLineSymbolLayer,
     QgsMarkerSymbol,
     QgsMarkerSymbolLayer,
+    QgsMessageLog,
     QgsPalLayerSettings,
-    QgsProject,
     QgsRasterMarkerSymbolLayer,
     QgsRuleBasedLabeling,
     QgsRuleBasedRenderer,
@@ -42,7 +45,7 @@ from qgis.core import (
     QgsVectorTileBasicRendererStyle,
 )
 from qgis.PyQt.QtCore import QPointF, QSizeF, Qt
-from qgis.PyQt.QtGui import QColor, QFont, QPixmap
+from qgis.PyQt.QtGui import QColor, QFont
 
 from ..constant import ElementTypeWrapper
 from ..plugin_util import (
@@ -52,7 +55,22 @@ from ..plugin_util import (
     find_value_in_dict_or_first,
 )
 from ..qgs_message_bar_handler import QgsMessageBarHandler
+from ..views import StyleConditionData, StyleMapScaleData, StyleRuleData
 from .jmap_services_access import JMapMCS
+from .request_future import RequestFuture
+from .sprite_cache import SpriteCache, SpriteSheet
+
+MESSAGE_CATEGORY = "StyleManager"
+MAPBOX_EXPRESSION_CACHE_SIZE = 4096
+# mapbox styles that are not layer symbology
+IGNORED_STYLE_PATTERN = re.compile("selection|background|hillshade|label")
+# Mapbox functions of one argument -> QGIS function
+MAPBOX_FUNCTIONS = {
+    "to-string": "to_string",
+    "to-number": "to_real",
+    "to-object": "to_object",
+    "length": "array_length",
+}
 
 
 class StyleManager:
@@ -78,46 +96,19 @@ class StyleManager:
 
     def __init__(self, jmap_mcs: JMapMCS):
         self.jmap_mcs = jmap_mcs
+        self.sprite_cache = SpriteCache(jmap_mcs)
 
-    def _get_project_icons_from_sprite_sheet(self, url) -> dict:
+    def get_project_icons_async(self, mapbox_styles: dict) -> RequestFuture:
         """
-        Extracts icons from a sprite sheet and saves them without resizing.
+        Get the icons of the sprite sheet of mapbox styles, from the sprite cache if it did not
+        change. Icons are extracted and saved without resizing when first accessed.
 
-        :return: Dictionary containing the paths and dimensions of the extracted icons.
+        :return: The future of the mapping of the icon ids to the paths and dimensions of the
+            extracted icons, of None if the sprite sheet can not be loaded.
         """
-        icons_data, sprite_sheet_data = self.jmap_mcs.get_project_sprites(url)
-        if not sprite_sheet_data or not icons_data:
-            return None
-
-        sprite_sheet = QPixmap()
-        sprite_sheet.loadFromData(io.BytesIO(sprite_sheet_data).read())
-
-        icons = {}
-        project = QgsProject.instance()
-        for icon_id, icon_data in icons_data.items():
-            if "selection" in icon_id:
-                continue
-
-            x, y, width, height = (
-                icon_data["x"],
-                icon_data["y"],
-                icon_data["width"],
-                icon_data["height"],
-            )
-
-            icon_image = sprite_sheet.copy(x, y, width, height)
-
-            path = project.createAttachedFile("{}.png".format(icon_id))
-            icon_image.save(path, "PNG")
-
-            icons[icon_id] = {
-                "path": path,
-                "width": width,
-                "height": height,
-                "pixelRatio": icon_data["pixelRatio"],
-            }
-
-        return icons
+        if "sprite" not in mapbox_styles or mapbox_styles["sprite"] == "":
+            return RequestFuture.resolved({})
+        return self.sprite_cache.get_sprite_sheet_async(mapbox_styles["sprite"])
 
     def format_layer_label_config(
         self, layer_data: dict, default_language: str = "en"
@@ -158,168 +149,167 @@ class StyleManager:
         return text_label
 
     def format_properties(
-        self, mapbox_styles: dict, graphql_style_data: dict = {}, layers_data: list = []
+        self,
+        mapbox_styles: dict,
+        graphql_style_data: dict = {},
+        layers_data: list = [],
+        icons: SpriteSheet = None,
     ) -> dict:
         """
         Formats a mapbox styles with graphql style name data to make it easier to use for a QGIS project.
+        Indexes the mapbox styles in one pass by layer, style rule, condition and map scale;
+        the style properties of each layer are converted by format_layer_style_rules(), which is
+        called from the layer's style task.
         :param mapbox_styles: mapbox styles file
         :param graphql_style_data: dict of style names
         :param labels_config: dict of layer labels
+        :param icons: icons of the sprite sheet, returned by get_project_icons_async()
         """
-        icons = {}
-        if "sprite" in mapbox_styles and mapbox_styles["sprite"] != "":
-            icons = self._get_project_icons_from_sprite_sheet(mapbox_styles["sprite"])
-        filtered_styles = []
-        for index, style in enumerate(mapbox_styles["layers"]):
-            matches = ["selection", "background", "hillshade", "label"]
-            if not ("basemap-id" in style["metadata"]) and not any(
-                x in style["id"] for x in matches
-            ):
-                filtered_styles.append(mapbox_styles["layers"][index])
+        if icons is None:
+            icons = {}
+        sources = mapbox_styles.get("sources", {})
         layer_styles = {}
+        icon_ids = set()
 
-        for mapbox_style in filtered_styles:
-            layer_id = mapbox_style["metadata"]["layer-id"]
+        for mapbox_style in mapbox_styles["layers"]:
+            metadata = mapbox_style["metadata"]
+            if "basemap-id" in metadata or IGNORED_STYLE_PATTERN.search(mapbox_style["id"]):
+                continue
 
             # symbology of layer
-            if layer_id not in layer_styles:
-                layer_styles[layer_id] = {
+            layer = layer_styles.get(metadata["layer-id"])
+            if layer is None:
+                layer = layer_styles[metadata["layer-id"]] = {
                     "styleRules": {},
+                    "icons": icons,
                     "label": {},
                     "mouseOver": None,
                     "elementType": None,
                 }
-            layer = layer_styles[layer_id]
 
-            if (
-                "source" in mapbox_style
-                and "tiles" in mapbox_styles["sources"][mapbox_style["source"]]
-            ):
-                layer["sources"] = mapbox_styles["sources"][mapbox_style["source"]]
+            if "source" in mapbox_style and "tiles" in sources[mapbox_style["source"]]:
+                layer["sources"] = sources[mapbox_style["source"]]
 
             # styleRules are symbol groups
-            # elif "style-rule-id" in mapbox_style["metadata"]:
-            if "style-rule-id" in mapbox_style["metadata"]:
-                style_rule_id = mapbox_style["metadata"]["style-rule-id"]
-                if style_rule_id not in layer["styleRules"]:
-                    layer["styleRules"][style_rule_id] = {}
-                style_rule = layer["styleRules"][style_rule_id]
-
-                # styleConditions are symbols with filters
-                if "rule-condition-id" in mapbox_style["metadata"]:
-                    rule_condition_id = mapbox_style["metadata"]["rule-condition-id"]
-                    if rule_condition_id not in style_rule:
-                        style_rule[rule_condition_id] = {
-                            "conditionExpressions": None,
-                            "styleMapScales": {},
-                        }
-                    rule_condition = style_rule[rule_condition_id]
-
-                    # Should be the same for each style_scale and fill border-line styles
-                    if "filter" in mapbox_style:
-                        filter_expression = mapbox_style["filter"]
-                    else:
-                        filter_expression = None
-                    if rule_condition["conditionExpressions"] is None:
-                        rule_condition["conditionExpressions"] = filter_expression
-
-                    # styleMapScales are symbols with zoom condition
-                    if "style-map-scale-id" in mapbox_style["metadata"]:
-                        style_map_scale_id = mapbox_style["metadata"][
-                            "style-map-scale-id"
-                        ]
-                        if style_map_scale_id not in rule_condition["styleMapScales"]:
-                            rule_condition["styleMapScales"][style_map_scale_id] = {
-                                "styles": {},
-                                "maximumZoom": mapbox_style["maxzoom"],
-                                "minimumZoom": mapbox_style["minzoom"],
-                                "type": (
-                                    "fill"
-                                    if "border" in mapbox_style["id"]
-                                    else mapbox_style["type"]
-                                ),
-                            }
-                        # styles are symbol_layer
-                        style_map_scale = rule_condition["styleMapScales"][
-                            style_map_scale_id
-                        ]
-                        if "style-id" in mapbox_style["metadata"]:
-                            style_id = mapbox_style["metadata"]["style-id"]
-                            if style_id not in style_map_scale["styles"]:
-                                style_map_scale["styles"][style_id] = {}
-
-                            # convert every mapbox expression
-                            properties = {
-                                **mapbox_style["paint"],
-                                **mapbox_style["layout"],
-                            }
-
-                            for key, value in properties.items():
-                                # ALL JMAP HARDCODE IS HERE--------------------------
-                                if (
-                                    "opacity" in key
-                                    and not isinstance(value, float)
-                                    and "case" in value
-                                ):
-                                    properties[key] = value[-1]
-                                elif "text-opacity" in key and "interpolate" in value:
-                                    properties[key] = 1.0
-                                elif "text-size" in key and "interpolate" in value:
-                                    properties[key] = self.QGISExpression(
-                                        "{}/2^(23-  @vector_tile_zoom )".format(
-                                            self._convert_mapbox_expression(
-                                                value[4][2][1]
-                                            )
-                                        )
-                                    )
-                                # END OF JMAP HARDCODE-------------------------------
-                                elif isinstance(value, list):
-                                    if "literal" in value and all(
-                                        isinstance(x, int) or isinstance(x, float)
-                                        for x in value[1]
-                                    ):
-                                        properties[key] = value[1]
-                                    else:
-                                        properties[key] = (
-                                            self._convert_mapbox_expression(value)
-                                        )
-                                elif "icon-image" in key:
-                                    properties[key] = icons[value]
-
-                            # merge style. Should only appen for fill border-line styles
-                            style_map_scale["styles"][style_id] = {
-                                **style_map_scale["styles"][style_id],
-                                **properties,
-                            }
+            if "style-rule-id" not in metadata:
+                continue
+            style_rule = layer["styleRules"].get(metadata["style-rule-id"])
+            if style_rule is None:
+                style_rule = StyleRuleData(metadata["style-rule-id"])
+                layer["styleRules"][style_rule.id] = style_rule
+
+            # styleConditions are symbols with filters
+            if "rule-condition-id" not in metadata:
+                continue
+            rule_condition = style_rule.conditions.get(metadata["rule-condition-id"])
+            if rule_condition is None:
+                rule_condition = StyleConditionData(metadata["rule-condition-id"])
+                style_rule.conditions[rule_condition.id] = rule_condition
+            # Should be the same for each style_scale and fill border-line styles
+            if rule_condition.condition_expressions is None:
+                rule_condition.condition_expressions = mapbox_style.get("filter")
+
+            # styleMapScales are symbols with zoom condition
+            if "style-map-scale-id" not in metadata:
+                continue
+            style_map_scale = rule_condition.style_map_scales.get(metadata["style-map-scale-id"])
+            if style_map_scale is None:
+                style_map_scale = StyleMapScaleData(
+                    metadata["style-map-scale-id"],
+                    mapbox_style["minzoom"],
+                    mapbox_style["maxzoom"],
+                    "fill" if "border" in mapbox_style["id"] else mapbox_style["type"],
+                )
+                rule_condition.style_map_scales[style_map_scale.id] = style_map_scale
+
+            # styles are symbol_layer, converted by format_layer_style_rules()
+            if "style-id" in metadata:
+                style_map_scale.mapbox_styles.append((metadata["style-id"], mapbox_style))
+                icon_image = mapbox_style.get("layout", {}).get("icon-image")
+                if isinstance(icon_image, str):
+                    icon_ids.add(icon_image)
+
+        # the style tasks cannot create project attachments, they are created here
+        if isinstance(icons, SpriteSheet):
+            icons.attach_icons(icon_ids)
+
         # rename data
         if bool(graphql_style_data):
-            for style_rule in graphql_style_data["data"]["getStyleRules"]:
-                for condition in style_rule["conditions"]:
-                    c = layer_styles[style_rule["layerId"]]["styleRules"][
-                        style_rule["id"]
-                    ][condition["id"]]
-                    c["name"] = condition["name"]
-                    # the style rule name cannot be in style rule because there  is only condition id that can be here for now
-                    c["styleRuleName"] = style_rule["name"]
+            for graphql_style_rule in graphql_style_data["data"]["getStyleRules"]:
+                layer = layer_styles[graphql_style_rule["layerId"]]
+                style_rule = layer["styleRules"][graphql_style_rule["id"]]
+                style_rule.name = graphql_style_rule["name"]
+                for graphql_condition in graphql_style_rule["conditions"]:
+                    condition = style_rule.conditions[graphql_condition["id"]]
+                    condition.name = graphql_condition["name"]
+                    # the style rule name cannot be in style rule because there  is only
+                    # condition id that can be here for now
+                    condition.style_rule_name = graphql_style_rule["name"]
 
         # format layer data properties
         for layer_data in layers_data:
-            labeling_config = self.format_layer_label_config(layer_data)
-            mouse_over_config = self.format_layer_mouse_over_configs(layer_data)
-
-            layer_styles[layer_data["id"]]["label"] = labeling_config
-            layer_styles[layer_data["id"]]["mouseOver"] = mouse_over_config
+            layer = layer_styles[layer_data["id"]]
+            layer["label"] = self.format_layer_label_config(layer_data)
+            layer["mouseOver"] = self.format_layer_mouse_over_configs(layer_data)
             if layer_data["elementType"] in ElementTypeWrapper.__members__:
-                layer_styles[layer_data["id"]]["elementType"] = ElementTypeWrapper[
+                layer["elementType"] = ElementTypeWrapper[
                     layer_data["elementType"]
                 ].to_qgis_geometry_type()
             else:
-                layer_styles[layer_data["id"]][
-                    "elementType"
-                ] = Qgis.GeometryType.Unknown
+                layer["elementType"] = Qgis.GeometryType.Unknown
 
         return layer_styles
 
+    def format_layer_style_rules(self, layer_properties: dict) -> dict[str, StyleRuleData]:
+        """
+        Converts the mapbox style properties of a layer formatted by format_properties().
+        Layers are independent, so it can run in the layer's style task.
+        :param layer_properties: properties of a layer returned by format_properties()
+        :return: the style rules of the layer
+        """
+        icons = layer_properties["icons"]
+        for style_rule in layer_properties["styleRules"].values():
+            for condition in style_rule.conditions.values():
+                for style_map_scale in condition.style_map_scales.values():
+                    if style_map_scale.styles is not None:
+                        continue
+                    styles = {}
+                    for style_id, mapbox_style in style_map_scale.mapbox_styles:
+                        # merge style. Should only appen for fill border-line styles
+                        properties = styles.setdefault(style_id, {})
+                        paint, layout = mapbox_style["paint"], mapbox_style["layout"]
+                        for key, value in paint.items():
+                            if key not in layout:
+                                properties[key] = self._convert_style_property(key, value, icons)
+                        for key, value in layout.items():
+                            properties[key] = self._convert_style_property(key, value, icons)
+                    style_map_scale.styles = styles
+        return layer_properties["styleRules"]
+
+    def _convert_style_property(self, key: str, value, icons: dict):
+        """convert the mapbox expression of a paint or layout property"""
+        # ALL JMAP HARDCODE IS HERE--------------------------
+        if "opacity" in key and not isinstance(value, float) and "case" in value:
+            return value[-1]
+        elif "text-opacity" in key and "interpolate" in value:
+            return 1.0
+        elif "text-size" in key and "interpolate" in value:
+            return self.QGISExpression(
+                "{}/2^(23-  @vector_tile_zoom )".format(
+                    self._convert_mapbox_expression(value[4][2][1])
+                )
+            )
+        # END OF JMAP HARDCODE-------------------------------
+        elif isinstance(value, list):
+            if "literal" in value and all(
+                isinstance(x, int) or isinstance(x, float) for x in value[1]
+            ):
+                return value[1]
+            return self._convert_mapbox_expression(value)
+        elif "icon-image" in key:
+            return icons[value]
+        return value
+
     def get_layer_labels(
         self, labeling_data: dict, element_type: Qgis.GeometryType
     ) -> QgsRuleBasedLabeling:
@@ -344,7 +334,7 @@ class StyleManager:
 
         return QgsRuleBasedLabeling(root_rule)
 
-    def get_layer_styles(self, style_rules: dict) -> QgsRuleBasedRenderer:
+    def get_layer_styles(self, style_rules: dict[str, StyleRuleData]) -> QgsRuleBasedRenderer:
         """
         Convert JMap style rules from specific layer to QGIS RuleBasedRenderer
 
@@ -370,33 +360,33 @@ class StyleManager:
             )
 
             # conditions are filters
-            for condition in style_rule.values():
-                rule_group.setLabel(condition["styleRuleName"])
+            for condition in style_rule.conditions.values():
+                rule_group.setLabel(condition.style_rule_name)
 
                 filter_expression = self._convert_mapbox_expression(
-                    condition["conditionExpressions"]
+                    condition.condition_expressions
                 )
                 # style by zoom level
-                for style_map_scale in condition["styleMapScales"].values():
+                for style_map_scale in condition.style_map_scales.values():
                     symbol = self._convert_formatted_style_map_scale_to_symbol(
                         style_map_scale
                     )
                     if symbol is None:
                         continue
 
-                    rule_name = condition["name"] + (
+                    rule_name = condition.name + (
                         " {}-{}".format(
-                            int(style_map_scale["minimumZoom"]),
-                            int(style_map_scale["maximumZoom"]),
+                            int(style_map_scale.minimum_zoom),
+                            int(style_map_scale.maximum_zoom),
                         )
-                        if len(condition["styleMapScales"]) > 1
+                        if len(condition.style_map_scales) > 1
                         else ""
                     )
                     min_scale = round(
-                        convert_zoom_to_scale(style_map_scale["minimumZoom"])
+                        convert_zoom_to_scale(style_map_scale.minimum_zoom)
                     )
                     max_scale = round(
-                        convert_zoom_to_scale(style_map_scale["maximumZoom"])
+                        convert_zoom_to_scale(style_map_scale.maximum_zoom)
                     )
                     rule = QgsRuleBasedRenderer.Rule(
                         symbol,
@@ -442,7 +432,7 @@ class StyleManager:
         return labeling
 
     def get_mvt_layer_styles(
-        self, style_rules: dict, element_type: Qgis.GeometryType
+        self, style_rules: dict[str, StyleRuleData], element_type: Qgis.GeometryType
     ) -> list[dict[str, list[QgsVectorTileBasicRendererStyle]]]:
 
         # MVT layer are in a group of layer because of impossibility to handle multiple styles in one layer
@@ -452,13 +442,13 @@ class StyleManager:
             # one group foreach style_rule
             styles = {"name": None, "style_list": []}
             # conditions are filters
-            for condition in style_rule.values():
-                styles["name"] = condition["styleRuleName"]
+            for condition in style_rule.conditions.values():
+                styles["name"] = condition.style_rule_name
                 filter_expression = self._convert_mapbox_expression(
-                    condition["conditionExpressions"]
+                    condition.condition_expressions
                 )
                 # style by zoom level
-                for h, style_map_scale in condition["styleMapScales"].items():
+                for h, style_map_scale in condition.style_map_scales.items():
                     symbol = self._convert_formatted_style_map_scale_to_symbol(
                         style_map_scale
                     )
@@ -479,14 +469,14 @@ class StyleManager:
                     else:
                         continue
                     style.setFilterExpression(str(filter_expression))
-                    max_zoom = int(style_map_scale["maximumZoom"])
-                    min_zoom = int(style_map_scale["minimumZoom"])
+                    max_zoom = int(style_map_scale.maximum_zoom)
+                    min_zoom = int(style_map_scale.minimum_zoom)
                     style.setMaxZoomLevel(max_zoom)
                     style.setMinZoomLevel(min_zoom)
                     style.setSymbol(symbol)
-                    styleName = condition["name"] + (
+                    styleName = condition.name + (
                         " {}-{}".format(min_zoom, max_zoom)
-                        if len(condition["styleMapScales"]) > 1
+                        if len(condition.style_map_scales) > 1
                         else ""
                     )
                     style.setStyleName(styleName)
@@ -495,7 +485,7 @@ class StyleManager:
         return style_groups
 
     def _convert_formatted_style_map_scale_to_symbol(
-        self, formatted_style_map_scale: dict
+        self, formatted_style_map_scale: StyleMapScaleData
     ) -> QgsSymbol:
         """
         Converts a formatted_style_map_scale style to QGIS Symbol.
@@ -507,31 +497,31 @@ class StyleManager:
         # define the symbol type
         # POINT
         symbol = None
-        if formatted_style_map_scale["type"].lower() == "symbol":
+        if formatted_style_map_scale.type.lower() == "symbol":
             symbol = QgsMarkerSymbol()
             symbol.deleteSymbolLayer(0)
-            for style in formatted_style_map_scale["styles"].values():
+            for style in formatted_style_map_scale.styles.values():
                 symbol_layer = symbol_layer = self.handle_marker_symbol_layer(style)
                 symbol.appendSymbolLayer(symbol_layer)
         # LINE
-        elif formatted_style_map_scale["type"].lower() == "line":
+        elif formatted_style_map_scale.type.lower() == "line":
             symbol = QgsLineSymbol()
             symbol.deleteSymbolLayer(0)
-            for style in formatted_style_map_scale["styles"].values():
+            for style in formatted_style_map_scale.styles.values():
                 symbol_layer = self.handle_line_symbol_layer(style)
                 symbol.appendSymbolLayer(symbol_layer)
         # POLYGON
-        elif formatted_style_map_scale["type"].lower() == "fill":
+        elif formatted_style_map_scale.type.lower() == "fill":
             symbol = QgsFillSymbol()
             symbol.deleteSymbolLayer(0)
-            for style in formatted_style_map_scale["styles"].values():
+            for style in formatted_style_map_scale.styles.values():
                 symbol_layer = self.handle_polygon_symbol_layer(style)
                 symbol.appendSymbolLayer(symbol_layer)
                 if "line-color" in style:
                     symbol_layer_border = self.handle_line_symbol_layer(style)
                     symbol.appendSymbolLayer(symbol_layer_border)
         # IMAGE
-        elif formatted_style_map_scale["type"].lower() == "image":
+        elif formatted_style_map_scale.type.lower() == "image":
             QgsMessageBarHandler.send_message_to_message_bar(
                 "IMAGE style type not yet supported",
                 prefix="Error loading style",
@@ -778,6 +768,36 @@ class StyleManager:
         return symbol_layer
 
     def _convert_mapbox_expression(self, condition_expressions) -> any:
+        """
+        Convert a Mapbox expression to a QGIS expression.
+
+        Translations are cached by the canonical JSON of the expression, since the same
+        filters and paints come back for every style map scale, condition and layer.
+        """
+        if not isinstance(condition_expressions, list):
+            return self._translate_mapbox_expression(condition_expressions)
+        key = json.dumps(condition_expressions, sort_keys=True, default=str)
+        # copied because QGISExpression values are rewritten by their users
+        return copy.deepcopy(self._translate_mapbox_expression_cached(key))
+
+    @classmethod
+    @functools.lru_cache(maxsize=MAPBOX_EXPRESSION_CACHE_SIZE)
+    def _translate_mapbox_expression_cached(cls, key: str) -> any:
+        expression = cls._translate_mapbox_expression(json.loads(key))
+        if isinstance(expression, (str, cls.QGISExpression)) and str(expression):
+            qgs_expression = QgsExpression(str(expression))
+            if qgs_expression.hasParserError():
+                QgsMessageLog.logMessage(
+                    "Invalid expression '{}' converted from {}: {}".format(
+                        expression, key, qgs_expression.parserErrorString()
+                    ),
+                    MESSAGE_CATEGORY,
+                    Qgis.MessageLevel.Warning,
+                )
+        return expression
+
+    @classmethod
+    def _translate_mapbox_expression(cls, condition_expressions) -> any:
         if condition_expressions is None:
             return ""
         if not isinstance(condition_expressions, list):
@@ -790,178 +810,194 @@ class StyleManager:
 
         # https://maplibre.org/maplibre-style-spec/expressions
         try:
-            if condition_expressions[0] == "literal":
-                exp = self._convert_mapbox_expression(condition_expressions[1])
-                exp = str(exp).replace("[", "").replace("]", "")
-                return self.QGISExpression("array({})".format(exp))
-
-            elif condition_expressions[0] in ["string", "number", "boolean", "object"]:
-                exp = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression(exp)
-
-            elif condition_expressions[0] == "to-string":
-                exp = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression("to_string({})".format(exp))
-
-            elif condition_expressions[0] == "to-number":
-                exp = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression("to_real({})".format(exp))
-
-            elif condition_expressions[0] == "to-object":
-                exp = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression("to_object({})".format(exp))
-
-            elif condition_expressions[0] == "at":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                exp2 = self._convert_mapbox_expression(condition_expressions[2])
-                return self.QGISExpression("{}[{}]".format(exp2, exp1))
-
-            elif condition_expressions[0] == "index-of":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                exp2 = self._convert_mapbox_expression(condition_expressions[2])
-                return self.QGISExpression("array_find({}, {})".format(exp1, exp2))
-
-            elif condition_expressions[0] == "slice":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                exp2 = self._convert_mapbox_expression(condition_expressions[2])
-                converted_string = "array_slice({}, {})".format(exp1, exp2)
-                if len(condition_expressions) > 3:
-                    exp3 = self._convert_mapbox_expression(condition_expressions[3])
-                    converted_string += ", {}".format(exp3)
-                return self.QGISExpression(converted_string)
-
-            elif condition_expressions[0] == "get":
-                return self.QGISExpression(condition_expressions[1])
-
-            elif condition_expressions[0] == "has":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression("attribute({}) is not null".format(exp1))
-
-            elif condition_expressions[0] == "length":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression("array_length({})".format(exp1))
-
-            elif condition_expressions[0] == "case":
-                converted_expression = "CASE"
-                for i in range(1, len(condition_expressions) - 1, 2):
-                    exp_x = self._convert_mapbox_expression(condition_expressions[i])
-                    exp_y = self._convert_mapbox_expression(
-                        condition_expressions[i + 1]
-                    )
-                    converted_expression += " WHEN {} THEN {}".format(exp_x, exp_y)
-                if len(condition_expressions) % 2 == 0:
-                    exp1 = self._convert_mapbox_expression(condition_expressions[-1])
-                    converted_expression += " ELSE {}".format(exp1)
-                converted_expression += " END"
-                return self.QGISExpression(converted_expression)
-
-            elif condition_expressions[0] == "match":
-                converted_expression = "CASE"
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                for i in range(2, len(condition_expressions), 2):
-                    exp_x = self._convert_mapbox_expression(condition_expressions[i])
-                    exp_y = self._convert_mapbox_expression(
-                        condition_expressions[i + 1]
-                    )
-                    converted_expression += " WHEN {} in {} THEN {}".format(
-                        exp1, exp_x, exp_y
-                    )
-                if len(condition_expressions) % 2 == 0:
-                    exp2 = self._convert_mapbox_expression(condition_expressions[-1])
-                    converted_expression += " ELSE {}".format(exp2)
-                converted_expression += " END"
-                return self.QGISExpression(converted_expression)
-
-            elif condition_expressions[0] in [
-                "==",
-                ">",
-                "<",
-                ">=",
-                "<=",
-                "!=",
-                "in",
-                "/",
-                "%",
-                "^",
-            ]:
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                exp2 = self._convert_mapbox_expression(condition_expressions[2])
-                return "{} {} {}".format(
-                    exp1,
-                    (
-                        condition_expressions[0]
-                        if condition_expressions[0] != "=="
-                        else "="
-                    ),
-                    exp2,
-                )
-
-            elif condition_expressions[0] in ["+", "*"]:
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                converted_expression = "{}".format(exp1)
-                for i in range(2, len(condition_expressions)):
-                    exp_x = self._convert_mapbox_expression(condition_expressions[i])
-                    converted_expression += " {} {}".format(
-                        condition_expressions[0], exp_x
-                    )
-                return self.QGISExpression(converted_expression)
-
-            elif condition_expressions[0] == "-":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                if len(condition_expressions) == 3:
-                    exp2 = self._convert_mapbox_expression(condition_expressions[2])
-                    return "{} - {}".format(exp1, exp2)
-                else:
-                    return self.QGISExpression("-({})".format(exp1))
-
-            elif condition_expressions[0] in ["all", "any"]:
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                converted_expression = "({}".format(exp1)
-                for i in range(2, len(condition_expressions)):
-                    exp_x = self._convert_mapbox_expression(condition_expressions[i])
-                    converted_expression += "{} {}".format(
-                        " and" if condition_expressions[0] == "all" else " or", exp_x
-                    )
-                converted_expression += ")"
-                return self.QGISExpression(converted_expression)
-
-            elif condition_expressions[0] == "!":
-                exp1 = self._convert_mapbox_expression(condition_expressions[1])
-                return self.QGISExpression("not {}".format(exp1))
-
-            elif condition_expressions[0] == "within":
-                message = "Within expression not supported"
-                QgsMessageBarHandler.send_message_to_message_bar(
-                    message, prefix="Expression error", level=Qgis.MessageLevel.Warning
-                )
-                return ""
-
-            elif condition_expressions[0] == "feature-state":
-                message = "Feature state expression not supported"
-                QgsMessageBarHandler.send_message_to_message_bar(
-                    message, prefix="Expression error", level=Qgis.MessageLevel.Warning
-                )
-                return "false"
-
-            elif condition_expressions[0] == "format":
-                exp = "{}".format(
-                    self._convert_mapbox_expression(condition_expressions[1])
-                )
-                for i in range(3, len(condition_expressions), 2):
-                    exp += "+{}".format(
-                        self._convert_mapbox_expression(condition_expressions[i])
-                    )
-                return self.QGISExpression(exp)
-
-            else:
+            operator = condition_expressions[0]
+            handler = (
+                cls._MAPBOX_OPERATORS.get(operator) if isinstance(operator, str) else None
+            )
+            if handler is None:
                 return condition_expressions
-
+            return getattr(cls, handler)(condition_expressions)
         except Exception as e:
             QgsMessageBarHandler.send_message_to_message_bar(
                 str(e), prefix="Expression error", level=Qgis.MessageLevel.Warning
             )
             return "false"
 
+    @classmethod
+    def _mapbox_literal(cls, expressions: list) -> any:
+        exp = cls._translate_mapbox_expression(expressions[1])
+        exp = str(exp).replace("[", "").replace("]", "")
+        return cls.QGISExpression("array({})".format(exp))
+
+    @classmethod
+    def _mapbox_type(cls, expressions: list) -> any:
+        return cls.QGISExpression(cls._translate_mapbox_expression(expressions[1]))
+
+    @classmethod
+    def _mapbox_function(cls, expressions: list) -> any:
+        exp = cls._translate_mapbox_expression(expressions[1])
+        return cls.QGISExpression("{}({})".format(MAPBOX_FUNCTIONS[expressions[0]], exp))
+
+    @classmethod
+    def _mapbox_at(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        exp2 = cls._translate_mapbox_expression(expressions[2])
+        return cls.QGISExpression("{}[{}]".format(exp2, exp1))
+
+    @classmethod
+    def _mapbox_index_of(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        exp2 = cls._translate_mapbox_expression(expressions[2])
+        return cls.QGISExpression("array_find({}, {})".format(exp1, exp2))
+
+    @classmethod
+    def _mapbox_slice(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        exp2 = cls._translate_mapbox_expression(expressions[2])
+        converted_string = "array_slice({}, {})".format(exp1, exp2)
+        if len(expressions) > 3:
+            exp3 = cls._translate_mapbox_expression(expressions[3])
+            converted_string += ", {}".format(exp3)
+        return cls.QGISExpression(converted_string)
+
+    @classmethod
+    def _mapbox_get(cls, expressions: list) -> any:
+        return cls.QGISExpression(expressions[1])
+
+    @classmethod
+    def _mapbox_has(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        return cls.QGISExpression("attribute({}) is not null".format(exp1))
+
+    @classmethod
+    def _mapbox_case(cls, expressions: list) -> any:
+        converted_expression = "CASE"
+        for i in range(1, len(expressions) - 1, 2):
+            exp_x = cls._translate_mapbox_expression(expressions[i])
+            exp_y = cls._translate_mapbox_expression(expressions[i + 1])
+            converted_expression += " WHEN {} THEN {}".format(exp_x, exp_y)
+        if len(expressions) % 2 == 0:
+            exp1 = cls._translate_mapbox_expression(expressions[-1])
+            converted_expression += " ELSE {}".format(exp1)
+        converted_expression += " END"
+        return cls.QGISExpression(converted_expression)
+
+    @classmethod
+    def _mapbox_match(cls, expressions: list) -> any:
+        converted_expression = "CASE"
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        for i in range(2, len(expressions), 2):
+            exp_x = cls._translate_mapbox_expression(expressions[i])
+            exp_y = cls._translate_mapbox_expression(expressions[i + 1])
+            converted_expression += " WHEN {} in {} THEN {}".format(exp1, exp_x, exp_y)
+        if len(expressions) % 2 == 0:
+            exp2 = cls._translate_mapbox_expression(expressions[-1])
+            converted_expression += " ELSE {}".format(exp2)
+        converted_expression += " END"
+        return cls.QGISExpression(converted_expression)
+
+    @classmethod
+    def _mapbox_binary_operator(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        exp2 = cls._translate_mapbox_expression(expressions[2])
+        return "{} {} {}".format(exp1, expressions[0] if expressions[0] != "==" else "=", exp2)
+
+    @classmethod
+    def _mapbox_sum_product(cls, expressions: list) -> any:
+        converted_expression = "{}".format(cls._translate_mapbox_expression(expressions[1]))
+        for i in range(2, len(expressions)):
+            exp_x = cls._translate_mapbox_expression(expressions[i])
+            converted_expression += " {} {}".format(expressions[0], exp_x)
+        return cls.QGISExpression(converted_expression)
+
+    @classmethod
+    def _mapbox_minus(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        if len(expressions) == 3:
+            exp2 = cls._translate_mapbox_expression(expressions[2])
+            return "{} - {}".format(exp1, exp2)
+        else:
+            return cls.QGISExpression("-({})".format(exp1))
+
+    @classmethod
+    def _mapbox_all_any(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        converted_expression = "({}".format(exp1)
+        for i in range(2, len(expressions)):
+            exp_x = cls._translate_mapbox_expression(expressions[i])
+            converted_expression += "{} {}".format(
+                " and" if expressions[0] == "all" else " or", exp_x
+            )
+        converted_expression += ")"
+        return cls.QGISExpression(converted_expression)
+
+    @classmethod
+    def _mapbox_not(cls, expressions: list) -> any:
+        exp1 = cls._translate_mapbox_expression(expressions[1])
+        return cls.QGISExpression("not {}".format(exp1))
+
+    @classmethod
+    def _mapbox_within(cls, expressions: list) -> any:
+        message = "Within expression not supported"
+        QgsMessageBarHandler.send_message_to_message_bar(
+            message, prefix="Expression error", level=Qgis.MessageLevel.Warning
+        )
+        return ""
+
+    @classmethod
+    def _mapbox_feature_state(cls, expressions: list) -> any:
+        message = "Feature state expression not supported"
+        QgsMessageBarHandler.send_message_to_message_bar(
+            message, prefix="Expression error", level=Qgis.MessageLevel.Warning
+        )
+        return "false"
+
+    @classmethod
+    def _mapbox_format(cls, expressions: list) -> any:
+        exp = "{}".format(cls._translate_mapbox_expression(expressions[1]))
+        for i in range(3, len(expressions), 2):
+            exp += "+{}".format(cls._translate_mapbox_expression(expressions[i]))
+        return cls.QGISExpression(exp)
+
+    # Mapbox operator -> translation method
+    _MAPBOX_OPERATORS = {
+        "literal": "_mapbox_literal",
+        "string": "_mapbox_type",
+        "number": "_mapbox_type",
+        "boolean": "_mapbox_type",
+        "object": "_mapbox_type",
+        "to-string": "_mapbox_function",
+        "to-number": "_mapbox_function",
+        "to-object": "_mapbox_function",
+        "length": "_mapbox_function",
+        "at": "_mapbox_at",
+        "index-of": "_mapbox_index_of",
+        "slice": "_mapbox_slice",
+        "get": "_mapbox_get",
+        "has": "_mapbox_has",
+        "case": "_mapbox_case",
+        "match": "_mapbox_match",
+        "==": "_mapbox_binary_operator",
+        ">": "_mapbox_binary_operator",
+        "<": "_mapbox_binary_operator",
+        ">=": "_mapbox_binary_operator",
+        "<=": "_mapbox_binary_operator",
+        "!=": "_mapbox_binary_operator",
+        "in": "_mapbox_binary_operator",
+        "/": "_mapbox_binary_operator",
+        "%": "_mapbox_binary_operator",
+        "^": "_mapbox_binary_operator",
+        "+": "_mapbox_sum_product",
+        "*": "_mapbox_sum_product",
+        "-": "_mapbox_minus",
+        "all": "_mapbox_all_any",
+        "any": "_mapbox_all_any",
+        "!": "_mapbox_not",
+        "within": "_mapbox_within",
+        "feature-state": "_mapbox_feature_state",
+        "format": "_mapbox_format",
+    }
+
     def _convert_mapbox_font(self, fonts: list) -> tuple[str, str]:
         qgis_font_styles = [
             "Regular",
@@ -1309,10 +1345,10 @@ class StyleManager:
 
     def get_raster_opacity(self, layer_properties: dict, default: float = 1.0) -> float:
         try:
-            for style_rule in layer_properties["styleRules"].values():
-                for condition in style_rule.values():
-                    for style_map_scale in condition["styleMapScales"].values():
-                        for style in style_map_scale["styles"].values():
+            for style_rule in self.format_layer_style_rules(layer_properties).values():
+                for condition in style_rule.conditions.values():
+                    for style_map_scale in condition.style_map_scales.values():
+                        for style in style_map_scale.styles.values():
                             return float(style.get("raster-opacity", default))
         except Exception:
             QgsMessageBarHandler.send_message_to_message_bar(
@@ -0,0 +1,121 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Union
+
+from qgis.core import Qgis, QgsMessageLog
+
+from ..plugin_util import get_plugin_data_dir
+
+CACHE_FILE_NAME = "upload_cache.json"
+MAX_CACHE_ENTRIES = 2000
+MESSAGE_CATEGORY = "UploadCache"
+
+
+class UploadCache:
+    """
+    Content-addressed cache of files already uploaded to JMap Cloud.
+
+    Maps the content hash of an uploaded zip or raster to its JMap Cloud file id and to the
+    datasources created from it in each project, so an unchanged file is not uploaded again
+    by a later export.
+    The cache is read from disk on every access because several managers of the same export
+    use it one after the other.
+    Cached ids must still be checked against the server before being reused.
+    """
+
+    def __init__(self, cache_path: Union[str, Path] = None):
+        if cache_path is None:
+            cache_path = Path(get_plugin_data_dir(), CACHE_FILE_NAME)
+        self.cache_path = Path(cache_path)
+
+    @staticmethod
+    def make_key(organization_id: str, content_hash: str) -> str:
+        return "{}:{}".format(organization_id, content_hash)
+
+    def find_file_id(self, organization_id: str, content_hash: str) -> Union[str, None]:
+        entry = self._load().get(self.make_key(organization_id, content_hash))
+        return entry["file_id"] if entry else None
+
+    def find_datasource_id(
+        self, organization_id: str, content_hash: str, datasource_key: str
+    ) -> Union[str, None]:
+        entry = self._load().get(self.make_key(organization_id, content_hash))
+        return entry["datasources"].get(datasource_key) if entry else None
+
+    def record_file(self, organization_id: str, content_hash: str, file_id: str):
+        entries = self._load()
+        key = self.make_key(organization_id, content_hash)
+        previous = entries.get(key)
+        entries[key] = {
+            "file_id": file_id,
+            # datasources were created from the previous file, they stay valid for this content
+            "datasources": previous["datasources"] if previous else {},
+            "updated": time.time(),
+        }
+        self._save(entries)
+
+    def record_datasource(
+        self, organization_id: str, content_hash: str, datasource_key: str, datasource_id: str
+    ):
+        entries = self._load()
+        entry = entries.get(self.make_key(organization_id, content_hash))
+        if entry is None:
+            return
+        entry["datasources"][datasource_key] = datasource_id
+        entry["updated"] = time.time()
+        self._save(entries)
+
+    def remove_file(self, organization_id: str, content_hash: str):
+        entries = self._load()
+        if entries.pop(self.make_key(organization_id, content_hash), None) is not None:
+            self._save(entries)
+
+    def remove_datasource(self, organization_id: str, content_hash: str, datasource_key: str):
+        entries = self._load()
+        entry = entries.get(self.make_key(organization_id, content_hash))
+        if entry is None or entry["datasources"].pop(datasource_key, None) is None:
+            return
+        self._save(entries)
+
+    def _load(self) -> dict[str, dict]:
+        if not self.cache_path.is_file():
+            return {}
+        try:
+            return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            QgsMessageLog.logMessage(
+                "Unable to read upload cache {}: {}".format(self.cache_path, e),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
+            return {}
+
+    def _save(self, entries: dict[str, dict]):
+        if len(entries) > MAX_CACHE_ENTRIES:
+            newest = sorted(entries.items(), key=lambda item: item[1]["updated"], reverse=True)
+            entries = dict(newest[:MAX_CACHE_ENTRIES])
+        try:
+            # written then renamed, a crash while writing must not lose the cache
+            tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            tmp_path.write_text(json.dumps(entries), encoding="utf-8")
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            QgsMessageLog.logMessage(
+                "Unable to write upload cache {}: {}".format(self.cache_path, e),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
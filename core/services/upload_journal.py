@@ -0,0 +1,121 @@
+# -----------------------------------------------------------
+# 2025-04-29
+# Copyright (C) 2025 K2 Geospatial
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 3
+# #
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# -----------------------------------------------------------
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Union
+
+from qgis.core import Qgis, QgsMessageLog
+
+from ..plugin_util import get_plugin_data_dir
+
+JOURNAL_FILE_NAME = "upload_journal.json"
+JOURNAL_EXPIRATION = 60 * 60 * 24 * 7  # 7 days, unfinished TUS uploads expire on the server
+MESSAGE_CATEGORY = "UploadJournal"
+
+
+class UploadJournal:
+    """
+    On-disk journal of unfinished TUS uploads.
+
+    Entries are keyed by organization, file content hash and size, and hold the upload url
+    and last acknowledged offset of every segment of the upload, so an interrupted upload
+    can be resumed by a later export instead of starting over from byte zero.
+    The path and mtime of the uploaded file are kept to skip hashing an unchanged file.
+    """
+
+    def __init__(self, journal_path: Union[str, Path] = None):
+        if journal_path is None:
+            journal_path = Path(get_plugin_data_dir(), JOURNAL_FILE_NAME)
+        self.journal_path = Path(journal_path)
+        self.entries: dict[str, dict] = self._load()
+
+    @staticmethod
+    def make_key(organization_id: str, content_hash: str, file_size: int) -> str:
+        return "{}:{}:{}".format(organization_id, content_hash, file_size)
+
+    def known_hash(self, file_path: Union[str, Path]) -> Union[str, None]:
+        """Return the content hash recorded for a file that did not change since then"""
+        stat = Path(file_path).stat()
+        for entry in self.entries.values():
+            if (
+                entry["path"] == str(file_path)
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime
+            ):
+                return entry["content_hash"]
+        return None
+
+    def find(self, key: str) -> Union[dict, None]:
+        return self.entries.get(key)
+
+    def record(
+        self,
+        key: str,
+        file_path: Union[str, Path],
+        content_hash: str,
+        file_id: Union[str, None],
+        segments: list[dict],
+    ):
+        stat = Path(file_path).stat()
+        self.entries[key] = {
+            "path": str(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "content_hash": content_hash,
+            "file_id": file_id,
+            "segments": segments,
+            "updated": time.time(),
+        }
+        self._save()
+
+    def update_segments(self, key: str, segments: list[dict]):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        entry["segments"] = segments
+        entry["updated"] = time.time()
+        self._save()
+
+    def remove(self, key: str):
+        if self.entries.pop(key, None) is not None:
+            self._save()
+
+    def _load(self) -> dict[str, dict]:
+        if not self.journal_path.is_file():
+            return {}
+        try:
+            entries = json.loads(self.journal_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            QgsMessageLog.logMessage(
+                "Unable to read upload journal {}: {}".format(self.journal_path, e),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
+            return {}
+        expiration = time.time() - JOURNAL_EXPIRATION
+        return {key: entry for key, entry in entries.items() if entry["updated"] > expiration}
+
+    def _save(self):
+        try:
+            # written then renamed, a crash while writing must not lose the resume state
+            tmp_path = self.journal_path.with_name(self.journal_path.name + ".tmp")
+            tmp_path.write_text(json.dumps(self.entries), encoding="utf-8")
+            os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            QgsMessageLog.logMessage(
+                "Unable to write upload journal {}: {}".format(self.journal_path, e),
+                MESSAGE_CATEGORY,
+                Qgis.MessageLevel.Warning,
+            )
@@ -9,7 +9,11 @@
 # the Free Software Foundation; either version 3 of the License, or
 # (at your option) any later version.
 # -----------------------------------------------------------
-from .create_jmc_project_task import CreateJMCProjectTask
+from .create_jmc_project_task import (
+    CreateJMCLayersTask,
+    CreateJMCProjectTask,
+    UpdateJMCLayerTreeTask,
+)
 from .custom_qgs_task import CustomQgsTask
 from .export_layer_style_task import ExportLayersStyleTask, ExportLayerStyleTask
 from .load_style_task import LoadVectorStyleTask, LoadVectorTilesStyleTask
@@ -22,7 +26,9 @@ from .write_layer_tasks import (
 )
 
 __all__ = [
+    "CreateJMCLayersTask",
     "CreateJMCProjectTask",
+    "UpdateJMCLayerTreeTask",
     "CustomQgsTask",
     "ExportLayersStyleTask",
     "ExportLayerStyleTask",
@@ -31,35 +31,36 @@ from ..services.request_manager import RequestManager
 from ..tasks.custom_qgs_task import CustomQgsTask
 from ..views import LayerData, ProjectData
 
-TOTAL_STEPS = 3
 MESSAGE_CATEGORY = "CreateJMCProjectTask"
 
 
 class CreateJMCProjectTask(CustomQgsTask):
-    project_creation_finished = pyqtSignal(list)
+    """
+    Create the JMap Cloud project, without its layers.
+    The layers are added by CreateJMCLayersTask as they become ready, then the layer tree is set
+    by UpdateJMCLayerTreeTask once every layer exists.
+    """
+
+    project_creation_finished = pyqtSignal(bool)
 
     def __init__(
         self,
-        request_manager: RequestManager,
         jmap_mcs: JMapMCS,
-        layers_data: list[LayerData],
         project_data: ProjectData,
     ):
         super().__init__("Create JMC Project", CustomQgsTask.CanCancel)
-        self.layers_data = layers_data
         self.project_data = project_data
-        self._request_manager = request_manager
         self._jmap_mcs = jmap_mcs
-        self.no_layers_created = 0
-        self.set_total_steps(TOTAL_STEPS + len(self.layers_data))
 
     def run(self):
         if self.isCanceled():
             return False
 
-        return self.create_jmc_project()
+        created = self.create_jmc_project()
+        self.project_creation_finished.emit(created)
+        return created
 
-    def create_jmc_project(self):
+    def create_jmc_project(self) -> bool:
         initial_extent = self.project_data.initial_extent
         rectangle = (
             {
@@ -85,20 +86,52 @@ class CreateJMCProjectTask(CustomQgsTask):
                 self.tr("Error creating project : {}").format(reply.error_message), MESSAGE_CATEGORY
             )
             return False
-        content = reply.content
-        self.next_steps()
-        self.project_data.project_id = content["id"]
+        self.project_data.project_id = reply.content["id"]
+        return True
+
+
+class CreateJMCLayersTask(CustomQgsTask):
+    """Add layers whose datasources are ready to the created JMap Cloud project"""
+
+    layers_creation_finished = pyqtSignal(list)
+
+    def __init__(
+        self,
+        request_manager: RequestManager,
+        layers_data: list[LayerData],
+        project_data: ProjectData,
+    ):
+        super().__init__("Create JMC Project layers", CustomQgsTask.CanCancel)
+        self.layers_data = layers_data
+        self.project_data = project_data
+        self._request_manager = request_manager
+        self.set_total_steps(len(self.layers_data))
 
+    def run(self):
+        if self.isCanceled():
+            return False
+
+        requests = []
+        layers_data_by_id = {}
         for layer_data in self.layers_data:
             request = self.define_next_post_layer_request(layer_data)
             if request:
-                reply = self._request_manager.custom_request(request)
-                self.is_all_layers_exported(reply, layer_data)
+                requests.append(request)
+                layers_data_by_id[request.id] = layer_data
             else:
-                self.no_layers_created += 1
                 layer_data.status = LayerData.Status.layer_creation_error
+                self.next_steps()
+
+        def next_func(reply: RequestManager.ResponseData):
+            self.read_layer_creation_response(reply, layers_data_by_id[reply.id])
             self.next_steps()
 
+        # layers are independent of each other, post them concurrently
+        self._request_manager.multi_request(requests, next_func)
+        if self.isCanceled():
+            return False
+
+        self.layers_creation_finished.emit(self.layers_data)
         return True
 
     def define_next_post_layer_request(self, layer_data: LayerData):
@@ -210,19 +243,43 @@ class CreateJMCProjectTask(CustomQgsTask):
             return fields_by_layer.get(next(iter(fields_by_layer)), [])
         return []
 
-    def is_all_layers_exported(self, reply: RequestManager.ResponseData, layer_data: LayerData):
+    def read_layer_creation_response(
+        self, reply: RequestManager.ResponseData, layer_data: LayerData
+    ):
         if reply.status != QNetworkReply.NetworkError.NoError:
             layer_data.status = LayerData.Status.layer_creation_error
             self.error_occur(reply.error_message, MESSAGE_CATEGORY)
         else:
             layer_data.jmc_layer_id = reply.content["id"]
-        self.no_layers_created += 1
-        if self.no_layers_created == len(self.layers_data):
-            self._update_layers_order()
-            self.next_steps()
-            self._update_layer_groups(self.project_data.legendRoot)
-            self.next_steps()
-            self.project_creation_finished.emit(self.layers_data)
+
+
+class UpdateJMCLayerTreeTask(CustomQgsTask):
+    """Set the layers order and the layer groups of the project, once its layers are created"""
+
+    layer_tree_update_finished = pyqtSignal()
+
+    def __init__(
+        self,
+        request_manager: RequestManager,
+        layers_data: list[LayerData],
+        project_data: ProjectData,
+    ):
+        super().__init__("Update JMC Project layer tree", CustomQgsTask.CanCancel)
+        self.layers_data = layers_data
+        self.project_data = project_data
+        self._request_manager = request_manager
+        self.set_total_steps(2)
+
+    def run(self):
+        if self.isCanceled():
+            return False
+
+        self._update_layers_order()
+        self.next_steps()
+        self._update_layer_groups(self.project_data.legendRoot)
+        self.next_steps()
+        self.layer_tree_update_finished.emit()
+        return True
 
     def _update_layers_order(self) -> bool:
         layers_list_order = self.project_data.legendRoot.layerOrder()
@@ -243,35 +300,65 @@ class CreateJMCProjectTask(CustomQgsTask):
             return False
         return True
 
-    def _update_layer_groups(self, root: QgsLayerTreeNode, id: str = "root") -> bool:
+    def _update_layer_groups(self, root: QgsLayerTreeNode) -> bool:
+        """
+        Create the layer groups level by level, all the groups of a level at once, then set the
+        children of each group. Children are set deepest level first, so a group is complete
+        before it is moved into its parent, like the previous depth-first walk did.
+        """
         url = "{}/organizations/{}/projects/{}/layers-groups".format(
             API_MCS_URL, self.project_data.organization_id, self.project_data.project_id
         )
-        layer_groups_ids = []
-        root.children()
-        # set lengend order and create layer-groups
-        for child in root.children():
-            if isinstance(child, QgsLayerTreeGroup):
-                body = {"name": {self.project_data.default_language: child.name()}, "visible": True}
+        group_ids: dict[int, str] = {id(root): "root"}
+        # children are read once, so the same node objects are used to key group_ids
+        levels: list[list[tuple[QgsLayerTreeNode, list[QgsLayerTreeNode]]]] = []
+        level = [root]
+        while len(level) > 0:
+            level_children = [(group, group.children()) for group in level]
+            levels.append(level_children)
+            next_level = [
+                child
+                for _, children in level_children
+                for child in children
+                if isinstance(child, QgsLayerTreeGroup)
+            ]
+            groups_by_request_id = {}
+            requests = []
+            for group in next_level:
+                body = {"name": {self.project_data.default_language: group.name()}, "visible": True}
                 request = RequestManager.RequestData(url, body=body, type="POST")
-                response = self._request_manager.custom_request(request)
+                groups_by_request_id[request.id] = group
+                requests.append(request)
+            responses = self._request_manager.multi_request(requests)
+            for request_id, response in responses.items():
                 if response.status != QNetworkReply.NetworkError.NoError:
                     return False
-                new_id = response.content["id"]
-                layer_groups_ids.append(new_id)
-                self._update_layer_groups(child, new_id)
-            elif isinstance(child, QgsLayerTreeLayer):
-                qgis_id = child.layer().id()
-                for layer_data in self.layers_data:
-                    if layer_data.layer_id == qgis_id:
-                        layer_groups_ids.append(layer_data.jmc_layer_id)
-                        break
-            else:
-                raise NotImplementedError
+                group_ids[id(groups_by_request_id[request_id])] = response.content["id"]
+            level = next_level
+
+        jmc_layer_ids = {
+            layer_data.layer_id: layer_data.jmc_layer_id for layer_data in self.layers_data
+        }
         # update layer groups order
-        body = {"id": id, "children": layer_groups_ids, "nodeType": "GROUP"}
-        request = RequestManager.RequestData("{}/{}".format(url, id), body=body, type="PATCH")
-        response = self._request_manager.custom_request(request)
-        if response.status != QNetworkReply.NetworkError.NoError:
-            return False
+        for level in reversed(levels):
+            requests = []
+            for group, children in level:
+                layer_groups_ids = []
+                for child in children:
+                    if isinstance(child, QgsLayerTreeGroup):
+                        layer_groups_ids.append(group_ids[id(child)])
+                    elif isinstance(child, QgsLayerTreeLayer):
+                        qgis_id = child.layer().id()
+                        if qgis_id in jmc_layer_ids:
+                            layer_groups_ids.append(jmc_layer_ids[qgis_id])
+                    else:
+                        raise NotImplementedError
+                group_id = group_ids[id(group)]
+                body = {"id": group_id, "children": layer_groups_ids, "nodeType": "GROUP"}
+                group_url = "{}/{}".format(url, group_id)
+                requests.append(RequestManager.RequestData(group_url, body=body, type="PATCH"))
+            responses = self._request_manager.multi_request(requests)
+            for response in responses.values():
+                if response.status != QNetworkReply.NetworkError.NoError:
+                    return False
         return True
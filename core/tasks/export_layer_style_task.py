@@ -11,9 +11,13 @@
 # -----------------------------------------------------------
 
 import copy
+import hashlib
+import json
 import re
+from typing import Union
 
 from qgis.core import (
+    Qgis,
     QgsApplication,
     QgsCategorizedSymbolRenderer,
     QgsExpression,
@@ -21,6 +25,7 @@ from qgis.core import (
     QgsGraduatedSymbolRenderer,
     QgsLineSymbol,
     QgsMarkerSymbol,
+    QgsMessageLog,
     QgsNullSymbolRenderer,
     QgsRuleBasedRenderer,
     QgsSingleSymbolRenderer,
@@ -40,6 +45,7 @@ from ..DTOS import (
     StyleDTO,
     StyleMapScaleDTO,
     StyleRuleDTO,
+    style_dto_cache,
 )
 from ..plugin_util import (
     convert_jmap_datetime,
@@ -58,6 +64,12 @@ MESSAGE_CATEGORY = "JMCExportLayerStyleTask"
 
 
 class ExportLayersStyleTask(CustomQgsTask):
+    """
+    Export the styles of several layers. Each layer's styles are converted and created by its
+    subtask, then the style rules of all the layers are created together by this task: the
+    n-th rule of every layer is sent in the same batch, so each layer keeps its rules order.
+    """
+
     layer_styles_exportation_finished = pyqtSignal()
 
     def __init__(
@@ -70,60 +82,116 @@ class ExportLayersStyleTask(CustomQgsTask):
 
         self.layers_data = layers_data
         self.project_data = project_data
-        self.no_layer_style_exported = 0
         self._request_manager = request_manager
         self.task_manager = QgsApplication.taskManager()
+        self._subtasks: list[ExportLayerStyleTask] = []
 
         for layer_data in self.layers_data:
-            subtask = ExportLayerStyleTask(self._request_manager, layer_data, self.project_data)
-            subtask.export_layer_style_completed.connect(
-                lambda _style_rule_id=None: self._is_all_layers_style_exported()
+            subtask = ExportLayerStyleTask(
+                self._request_manager, layer_data, self.project_data, submit_style_rules=False
             )
             subtask.error_occurred.connect(self.error_occurred)
+            self._subtasks.append(subtask)
             self.addSubTask(
                 subtask, subTaskDependency=self.SubTaskDependency.ParentDependsOnSubTask
             )
 
     def run(self):
+        """run once every subtask is completed"""
+        if self.isCanceled():
+            return False
+        subtasks = [subtask for subtask in self._subtasks if subtask.has_style_rules()]
+        self._post_style_rules(subtasks)
         if self.isCanceled():
             return False
-        if len(self.layers_data) == 0:
-            self.layer_styles_exportation_finished.emit()
+        self._delete_default_style_rules(subtasks)
+        QgsMessageLog.logMessage(
+            "Style DTO cache: {}".format(style_dto_cache.stats()),
+            MESSAGE_CATEGORY,
+            Qgis.MessageLevel.Info,
+        )
+        self.layer_styles_exportation_finished.emit()
         return True
 
-    def _is_all_layers_style_exported(self):
-        self.no_layer_style_exported += 1
-        if self.no_layer_style_exported == len(self.layers_data):
-            self.layer_styles_exportation_finished.emit()
+    def _post_style_rules(self, subtasks: list["ExportLayerStyleTask"]):
+        style_rules = [subtask.style_rules_to_export() for subtask in subtasks]
+        for index in range(max((len(rules) for rules in style_rules), default=0)):
+            if self.isCanceled():
+                return
+            subtasks_by_request_id = {}
+            requests = []
+            for subtask, rules in zip(subtasks, style_rules):
+                if index < len(rules):
+                    request = subtask.define_style_rule_request(rules[index])
+                    subtasks_by_request_id[request.id] = subtask
+                    requests.append(request)
+            for request_id, response in self._request_manager.multi_request(requests).items():
+                subtasks_by_request_id[request_id].read_style_rule_response(response)
+
+    def _delete_default_style_rules(self, subtasks: list["ExportLayerStyleTask"]):
+        subtasks_by_request_id = {}
+        requests = []
+        for subtask in subtasks:
+            request = RequestManager.RequestData(subtask.style_rules_url(), type="GET")
+            subtasks_by_request_id[request.id] = subtask
+            requests.append(request)
+        delete_requests = []
+        for request_id, response in self._request_manager.multi_request(requests).items():
+            subtask = subtasks_by_request_id[request_id]
+            style_rule_id = subtask.read_default_style_rule_id(response)
+            if style_rule_id is not None:
+                url = "{}/{}".format(subtask.style_rules_url(), style_rule_id)
+                delete_requests.append(RequestManager.RequestData(url, type="DELETE"))
+        self._request_manager.multi_request(delete_requests)
 
 
 class ExportLayerStyleTask(CustomQgsTask):
     export_layer_style_completed = pyqtSignal(object)
 
     def __init__(
-        self, request_manager: RequestManager, layer_data: LayerData, project_data: ProjectData
+        self,
+        request_manager: RequestManager,
+        layer_data: LayerData,
+        project_data: ProjectData,
+        submit_style_rules: bool = True,
     ):
+        """
+        :param submit_style_rules: False when the style rules are created by the parent
+        ExportLayersStyleTask, with the rules of the other layers
+        """
         super().__init__("Exporting layer style", CustomQgsTask.CanCancel)
         self.layer_data = layer_data
         self.project_data = project_data
         self._request_manager = request_manager
+        self._submit_style_rules_enabled = submit_style_rules
         self._new_style_rule_id = None
+        # styles are collected while walking the renderer, then created all at once
+        self._styles: dict[str, StyleDTO] = {}
+        self._compound_styles: dict[str, list[str]] = {}
+        self._style_rules: list[StyleRuleDTO] = []
         self.set_total_steps(1)
 
     def run(self):
         if self.isCanceled():
             return False
-        if self.layer_data.layer_type in [
-            LayerData.LayerType.file_vector,
-            LayerData.LayerType.API_FEATURES,
-        ]:
+        if self.has_style_rules():
             self._handle_renderer(self.layer_data)
-            self._delete_default_style_rules()
+            self._submit_styles()
+            if self._submit_style_rules_enabled:
+                self._submit_style_rules()
+                self._delete_default_style_rules()
         else:
             self._patch_raster_style()
         self.export_layer_style_completed.emit(self._new_style_rule_id)
         return True
 
+    def has_style_rules(self) -> bool:
+        """True for the layers whose style rules are created from their renderer"""
+        return self.layer_data.layer_type in [
+            LayerData.LayerType.file_vector,
+            LayerData.LayerType.API_FEATURES,
+        ]
+
     def _handle_renderer(self, layer: LayerData):
         renderer = layer.layer.renderer()
         default_rule_data = {
@@ -137,13 +205,13 @@ class ExportLayerStyleTask(CustomQgsTask):
         if isinstance(renderer, QgsSingleSymbolRenderer):
             default_rule_data["label"] = DEFAULT_SINGLE_STYLE_RULE_NAME
             symbol = renderer.symbol()
-            style_ids = self._export_symbol_to_style(symbol)
+            style_keys = self._add_symbol_styles(symbol)
             style_rule_dto = StyleRuleDTO(
                 name={self.project_data.default_language: DEFAULT_SINGLE_STYLE_RULE_NAME},
                 active=default_rule_data["active"],
             )
-            self._add_condition_to_style_rule(style_ids, default_rule_data, style_rule_dto)
-            self._export_style_rules(style_rule_dto)
+            self._add_condition_to_style_rule(style_keys, default_rule_data, style_rule_dto)
+            self._add_style_rule(style_rule_dto)
         elif isinstance(renderer, QgsRuleBasedRenderer):
             root_rule = renderer.rootRule()
             total = 0
@@ -169,7 +237,7 @@ class ExportLayerStyleTask(CustomQgsTask):
             self.set_total_steps(len(renderer.ranges()) + 1)
             for range in renderer.ranges():
                 default_rule_data["label"] = range.label()
-                style_ids = self._export_symbol_to_style(range.symbol())
+                style_keys = self._add_symbol_styles(range.symbol())
                 lowerValue = range.lowerValue()
                 if bool(lowerValue):
                     default_rule_data["filterExpression"].append(
@@ -188,10 +256,10 @@ class ExportLayerStyleTask(CustomQgsTask):
                             value=upperValue,
                         )
                     )
-                self._add_condition_to_style_rule(style_ids, default_rule_data, style_rule)
+                self._add_condition_to_style_rule(style_keys, default_rule_data, style_rule)
                 default_rule_data["filterExpression"] = []
                 self.next_steps()
-            self._export_style_rules(style_rule)
+            self._add_style_rule(style_rule)
             self.next_steps()
         elif isinstance(renderer, QgsCategorizedSymbolRenderer):
             fields = self._resolve_layer_fields(layer)
@@ -208,7 +276,7 @@ class ExportLayerStyleTask(CustomQgsTask):
             self.set_total_steps(len(renderer.categories()) + 1)
             for category in renderer.categories():
                 default_rule_data["label"] = category.label()
-                style_ids = self._export_symbol_to_style(category.symbol())
+                style_keys = self._add_symbol_styles(category.symbol())
                 value = category.value()
                 if bool(value):
                     default_rule_data["filterExpression"] = [
@@ -216,16 +284,16 @@ class ExportLayerStyleTask(CustomQgsTask):
                             attributeName=attribute, operator=JMCOperator.EQUALS.name, value=value
                         )
                     ]
-                    self._add_condition_to_style_rule(style_ids, default_rule_data, style_rule)
+                    self._add_condition_to_style_rule(style_keys, default_rule_data, style_rule)
                     default_rule_data["filterExpression"] = []
                 else:
                     self._add_condition_to_style_rule(
-                        style_ids, default_rule_data, other_value_style_rule
+                        style_keys, default_rule_data, other_value_style_rule
                     )
                 self.next_steps()
             if len(other_value_style_rule.conditions) > 0:
-                self._export_style_rules(other_value_style_rule)
-            self._export_style_rules(style_rule)
+                self._add_style_rule(other_value_style_rule)
+            self._add_style_rule(style_rule)
             self.next_steps()
         elif isinstance(renderer, QgsNullSymbolRenderer):
             return True
@@ -300,8 +368,8 @@ class ExportLayerStyleTask(CustomQgsTask):
                 self.add_exception(Exception(message))
                 return False
 
-            style_ids = self._export_symbol_to_style(symbol)
-            self._add_condition_to_style_rule(style_ids, rule_data, style_rule_dto)
+            style_keys = self._add_symbol_styles(symbol)
+            self._add_condition_to_style_rule(style_keys, rule_data, style_rule_dto)
 
         # Create style rule if rule's children have symbols
         children = rule.children()
@@ -315,22 +383,22 @@ class ExportLayerStyleTask(CustomQgsTask):
             self._handle_rule(rule, copy.deepcopy(rule_data), style_rule_dto)
             self.next_steps()
         if style_rule_dto:
-            if not self._export_style_rules(style_rule_dto):
+            if not self._add_style_rule(style_rule_dto):
                 return False
 
         return True
 
     def _add_condition_to_style_rule(
-        self, style_ids: list[str], rule_data: dict, style_rule_dto: StyleRuleDTO
+        self, style_keys: list[str], rule_data: dict, style_rule_dto: StyleRuleDTO
     ):
 
-        for style_id in style_ids:
+        for style_key in style_keys:
             condition_DTO = ConditionDTO(
                 rule_data["filterExpression"],
                 name={self.project_data.default_language: rule_data["label"] or "None"},
             )
             style_map_scale = StyleMapScaleDTO(
-                rule_data["minimumZoom"], rule_data["maximumZoom"], style_id
+                rule_data["minimumZoom"], rule_data["maximumZoom"], style_key
             )
             condition_DTO.styleMapScales.append(style_map_scale)
             style_rule_dto.conditions.append(condition_DTO)
@@ -438,7 +506,11 @@ class ExportLayerStyleTask(CustomQgsTask):
             criterias.append(criteria_dto)
         return criterias
 
-    def _export_symbol_to_style(self, symbol: QgsSymbol) -> list[str]:
+    def _add_symbol_styles(self, symbol: QgsSymbol) -> list[str]:
+        """
+        Convert a symbol to styles to create, and return their style keys.
+        The keys are replaced by the ids of the created styles in _submit_styles.
+        """
         if isinstance(symbol, QgsMarkerSymbol):
             styles = PointStyleDTO.from_symbol(symbol)
             initial_type = "POINT"
@@ -468,11 +540,7 @@ class ExportLayerStyleTask(CustomQgsTask):
                     * self.layer_data.layer.opacity()
                 )
 
-        style_ids = []
-
-        url = "{}/organizations/{}/styles".format(API_MCS_URL, self.project_data.organization_id)
-
-        # create every style (post Style)
+        style_keys = []
         for style in styles:
             if style is None:
                 message = self.tr(
@@ -480,29 +548,68 @@ class ExportLayerStyleTask(CustomQgsTask):
                 ).format(self.layer_data.layer_name)
                 self.error_occur(message, MESSAGE_CATEGORY)
                 continue
-            body = style.to_json()
-            request = RequestManager.RequestData(url, type="POST", body=body)
-            reply = self._request_manager.custom_request(request)
-            if reply.status == QNetworkReply.NetworkError.NoError:
-                style_ids.append(reply.content["id"])
-            else:
-                message = self.tr("Export style error: {}").format(reply.error_message)
-                self.error_occur(message, MESSAGE_CATEGORY)
-        if initial_type != "POLYGON" and len(style_ids) > 1:
-            style_ids.reverse()  # reverse order for compound style
-            compound_style = CompoundStyleDTO.from_style_ids(style_ids)
-            body = compound_style.to_json()
-            request = RequestManager.RequestData(url, type="POST", body=body)
-            reply = self._request_manager.custom_request(request)
+            # identical styles are created only once
+            key = self._style_key(style.to_dict())
+            self._styles[key] = style
+            style_keys.append(key)
+        if initial_type != "POLYGON" and len(style_keys) > 1:
+            style_keys.reverse()  # reverse order for compound style
+            key = self._style_key({"compound": style_keys})
+            self._compound_styles[key] = style_keys
+            style_keys = [key]
+
+        return style_keys
+
+    @staticmethod
+    def _style_key(style: dict) -> str:
+        return hashlib.sha256(json.dumps(style, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _post_styles(self, styles: dict[str, StyleDTO]) -> dict[str, str]:
+        """Create styles in one queued batch, return the ids of the created styles by style key"""
+        url = "{}/organizations/{}/styles".format(API_MCS_URL, self.project_data.organization_id)
+        requests = [
+            RequestManager.RequestData(url, type="POST", body=style.to_json(), id=key)
+            for key, style in styles.items()
+        ]
+        style_ids = {}
+        for key, reply in self._request_manager.multi_request(requests).items():
             if reply.status == QNetworkReply.NetworkError.NoError:
-                style_ids = [reply.content["id"]]
+                style_ids[key] = reply.content["id"]
             else:
                 message = self.tr("Export style error: {}").format(reply.error_message)
                 self.error_occur(message, MESSAGE_CATEGORY)
-
         return style_ids
 
-    def _export_style_rules(self, style_rule_dto: StyleRuleDTO):
+    def _submit_styles(self):
+        """
+        Create the collected styles, then the compound styles made of them, and set the ids of
+        the created styles in the collected style rules.
+        """
+        style_ids = self._post_styles(self._styles)
+
+        compound_styles = {}
+        for key, component_keys in self._compound_styles.items():
+            component_ids = [style_ids[k] for k in component_keys if k in style_ids]
+            if len(component_ids) > 1:
+                compound_styles[key] = CompoundStyleDTO.from_style_ids(component_ids)
+            elif len(component_ids) == 1:
+                style_ids[key] = component_ids[0]
+        style_ids.update(self._post_styles(compound_styles))
+
+        for style_rule_dto in self._style_rules:
+            for condition in style_rule_dto.conditions:
+                condition.styleMapScales = [
+                    style_map_scale
+                    for style_map_scale in condition.styleMapScales
+                    if style_map_scale.styleId in style_ids
+                ]
+                for style_map_scale in condition.styleMapScales:
+                    style_map_scale.styleId = style_ids[style_map_scale.styleId]
+            style_rule_dto.conditions = [
+                condition for condition in style_rule_dto.conditions if condition.styleMapScales
+            ]
+
+    def _add_style_rule(self, style_rule_dto: StyleRuleDTO) -> bool:
         if len(style_rule_dto.conditions) == 0:
             message = self.tr(
                 "Error exporting style rule for layer '{}': ",
@@ -510,17 +617,41 @@ class ExportLayerStyleTask(CustomQgsTask):
             ).format(self.layer_data.layer_name)
             self.error_occur(message, MESSAGE_CATEGORY)
             return False
-        url = "{}/organizations/{}/projects/{}/layers/{}/style-rules".format(
+        self._style_rules.append(style_rule_dto)
+        return True
+
+    def style_rules_to_export(self) -> list[StyleRuleDTO]:
+        """the collected style rules that can be created, in their order"""
+        style_rules = []
+        for style_rule_dto in self._style_rules:
+            if len(style_rule_dto.conditions) == 0:
+                message = self.tr(
+                    "Error exporting style rule for layer '{}': ",
+                    "no condition in style rule to export with",
+                ).format(self.layer_data.layer_name)
+                self.error_occur(message, MESSAGE_CATEGORY)
+                continue
+            style_rules.append(style_rule_dto)
+        return style_rules
+
+    def _submit_style_rules(self):
+        """Create the collected style rules, one at a time to keep their order"""
+        for style_rule_dto in self.style_rules_to_export():
+            self._export_style_rule(style_rule_dto)
+
+    def style_rules_url(self) -> str:
+        return "{}/organizations/{}/projects/{}/layers/{}/style-rules".format(
             API_MCS_URL,
             self.project_data.organization_id,
             self.project_data.project_id,
             self.layer_data.jmc_layer_id,
         )
 
+    def define_style_rule_request(self, style_rule_dto: StyleRuleDTO) -> RequestManager.RequestData:
         body = style_rule_dto.to_json()
-        request = RequestManager.RequestData(url, type="POST", body=body)
-        response = self._request_manager.custom_request(request)
+        return RequestManager.RequestData(self.style_rules_url(), type="POST", body=body)
 
+    def read_style_rule_response(self, response: RequestManager.ResponseData) -> bool:
         if response.status != QNetworkReply.NetworkError.NoError:
             error_message = self.tr("Error exporting style rule for layer '{}': {}").format(
                 self.layer_data.layer_name, response.error_message
@@ -531,31 +662,34 @@ class ExportLayerStyleTask(CustomQgsTask):
         self._new_style_rule_id = response.content["id"]
         return True
 
-    def _delete_default_style_rules(self):
-        url = "{}/organizations/{}/projects/{}/layers/{}/style-rules".format(
-            API_MCS_URL,
-            self.project_data.organization_id,
-            self.project_data.project_id,
-            self.layer_data.jmc_layer_id,
-        )
-
-        request = RequestManager.RequestData(url, type="GET")
+    def _export_style_rule(self, style_rule_dto: StyleRuleDTO) -> bool:
+        request = self.define_style_rule_request(style_rule_dto)
         response = self._request_manager.custom_request(request)
+        return self.read_style_rule_response(response)
+
+    def read_default_style_rule_id(self, response: RequestManager.ResponseData) -> Union[str, None]:
+        """the id of the oldest default style rule, from the style rules of the layer"""
         if response.status != QNetworkReply.NetworkError.NoError:
-            return False
-        content = response.content
+            return None
         default_style_rule = None
-        for style_rule in content:
+        for style_rule in response.content:
             if style_rule["name"][self.project_data.default_language] == "Default rule":
                 if not default_style_rule or convert_jmap_datetime(
                     default_style_rule["creationDate"]
                 ) > convert_jmap_datetime(style_rule["creationDate"]):
                     default_style_rule = style_rule
+        return default_style_rule["id"] if default_style_rule else None
 
-        if not default_style_rule:
+    def _delete_default_style_rules(self):
+        url = self.style_rules_url()
+        request = RequestManager.RequestData(url, type="GET")
+        response = self._request_manager.custom_request(request)
+        if response.status != QNetworkReply.NetworkError.NoError:
+            return False
+        id = self.read_default_style_rule_id(response)
+        if not id:
             return True
 
-        id = default_style_rule["id"]
         request = RequestManager.RequestData("{}/{}".format(url, id), type="DELETE")
         response = self._request_manager.custom_request(request)
         if response.status != QNetworkReply.NetworkError.NoError:
@@ -27,7 +27,8 @@ class LoadVectorStyleTask(CustomQgsTask):
     def run(self):
         if self.isCanceled():
             return False
-        renderer = self.style_manager.get_layer_styles(self.layer_properties["styleRules"])
+        style_rules = self.style_manager.format_layer_style_rules(self.layer_properties)
+        renderer = self.style_manager.get_layer_styles(style_rules)
         labeling = self.style_manager.get_layer_labels(self.layer_properties["label"], self.layer_properties["elementType"])
 
         self.import_style_completed.emit(renderer, labeling)
@@ -48,7 +49,8 @@ class LoadVectorTilesStyleTask(CustomQgsTask):
             return False
         layer_properties = self.layer_properties
         element_type = layer_properties["elementType"]
-        style_groups = self.style_manager.get_mvt_layer_styles(layer_properties["styleRules"], element_type)
+        style_rules = self.style_manager.format_layer_style_rules(layer_properties)
+        style_groups = self.style_manager.get_mvt_layer_styles(style_rules, element_type)
         labeling = self.style_manager.get_mvt_layer_labels(layer_properties["label"], element_type)
         renderers = {}
         for styles in style_groups:
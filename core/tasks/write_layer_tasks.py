@@ -10,6 +10,7 @@
 # (at your option) any later version.
 # -----------------------------------------------------------
 
+import shutil
 import urllib.parse
 import zipfile
 from pathlib import Path
@@ -34,6 +35,8 @@ from ..views import LayerData, LayerFile, SupportedFileType
 from .custom_qgs_task import CustomQgsTask, CustomTaskManager
 
 MESSAGE_CATEGORY = "WriteLayerTask"
+# fixed entry timestamp so the same files always produce the same zip (and content hash)
+ZIP_ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
 
 
 class ConvertLayersToZipTask(CustomTaskManager):
@@ -601,13 +604,14 @@ class compressFilesToZipTask(CustomQgsTask):
                     if self.isCanceled():
                         return False
                     if input_path.is_file():
-                        zip_file.write(input_path, arcname=input_path.name)
+                        self._write_to_zip(zip_file, input_path, input_path.name)
 
                     elif input_path.is_dir():
-                        for file_path in input_path.rglob("*"):  # Replaces os.walk()
+                        # sorted so entries are always written in the same order
+                        for file_path in sorted(input_path.rglob("*")):  # Replaces os.walk()
                             if file_path.is_file():  # Ensure only files are added
                                 arcname = file_path.relative_to(input_path)  # Preserve structure
-                                zip_file.write(file_path, arcname=arcname)
+                                self._write_to_zip(zip_file, file_path, arcname.as_posix())
                     else:
                         message = self.tr("Error: {} is not a valid file or folder.").format(
                             input_path
@@ -621,3 +625,12 @@ class compressFilesToZipTask(CustomQgsTask):
             self.setProgress(100)
             return False
         return True
+
+    @staticmethod
+    def _write_to_zip(zip_file: zipfile.ZipFile, file_path: Path, arcname: str):
+        zip_info = zipfile.ZipInfo(arcname, date_time=ZIP_ENTRY_DATE_TIME)
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        zip_info.external_attr = 0o644 << 16
+        zip_info.file_size = file_path.stat().st_size  # lets zipfile pick zip64 for big files
+        with open(file_path, "rb") as source, zip_file.open(zip_info, "w") as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
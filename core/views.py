@@ -50,6 +50,7 @@ class LayerFile:
         file_path: str = None,
         file_type: SupportedFileType = None,
         fields: dict = None,
+        content_hash: str = None,
     ):
         self.jmc_file_id = jmc_file_id
         self.file_name = file_name
@@ -57,6 +58,7 @@ class LayerFile:
         self.upload_status = self.Status.no_error
         self.file_type = file_type
         self.fields = fields or {}
+        self.content_hash = content_hash
 
 
 class LayerData:
@@ -203,3 +205,45 @@ class ProjectLayersData:
         self.layer_order = layer_order
         self.Labels_config = layers_data
         self.formatted_styles = layers_properties
+
+
+class StyleMapScaleData:
+    """
+    symbol of a style rule condition for a zoom range
+    mapbox_styles are the raw (style id, mapbox style) of its symbol layers,
+    styles their converted properties by style id
+    """
+
+    __slots__ = ("id", "minimum_zoom", "maximum_zoom", "type", "mapbox_styles", "styles")
+
+    def __init__(self, id: str, minimum_zoom: float, maximum_zoom: float, type: str):
+        self.id = id
+        self.minimum_zoom = minimum_zoom
+        self.maximum_zoom = maximum_zoom
+        self.type = type
+        self.mapbox_styles: list[tuple[str, dict]] = []
+        self.styles: dict[str, dict] = None
+
+
+class StyleConditionData:
+    """style rule condition, a filter and its symbols by zoom range"""
+
+    __slots__ = ("id", "name", "style_rule_name", "condition_expressions", "style_map_scales")
+
+    def __init__(self, id: str):
+        self.id = id
+        self.name: str = None
+        self.style_rule_name: str = None
+        self.condition_expressions = None
+        self.style_map_scales: dict[str, StyleMapScaleData] = {}
+
+
+class StyleRuleData:
+    """style rule of a layer, a group of conditions"""
+
+    __slots__ = ("id", "name", "conditions")
+
+    def __init__(self, id: str):
+        self.id = id
+        self.name: str = None
+        self.conditions: dict[str, StyleConditionData] = {}
@@ -36,6 +36,7 @@ from .core.services.export_layer_manager import ExportLayerManager
 from .core.services.export_project_manager import ExportProjectManager
 from .core.services.import_project_manager import ImportProjectManager
 from .core.services.jmap_services_access import JMapDAS, JMapMCS, JMapMIS
+from .core.services.request_future import RequestFuture
 from .core.services.request_manager import RequestManager
 from .core.services.session_manager import SessionManager
 from .core.services.style_manager import StyleManager
@@ -107,6 +108,8 @@ class JMapCloud:
 
         self._layer_tree_context_menu_connected = False
         self._selected_layer_for_export = None
+        # updated with the authentication state, read when the layer context menu is shown
+        self._export_allowed = False
 
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
@@ -178,7 +181,7 @@ class JMapCloud:
         )
         self.trigger_refresh_token_action = self._create_actions(
             text=self.tr("Refresh Token"),
-            callback=self.auth_manager.refresh_auth_settings,
+            callback=self.auth_manager.refresh_auth_settings_async,
             parent=self.iface.mainWindow(),
         )
 
@@ -207,26 +210,25 @@ class JMapCloud:
         )
         self._layer_tree_context_menu_connected = True
 
-    def _is_user_allowed_to_export_layer_JMC(self) -> bool:
+    def _update_export_permission(self, auth_state: AuthState) -> RequestFuture:
         """
         Check if the current user is allowed to export layers to JMap Cloud
         based on the organization permissions and the authentication state.
-        :return: True if the user is allowed, False otherwise.
+        The result is kept for the layer tree context menu.
+        :return: The future of True if the user is allowed, False otherwise.
         """
-        if self.auth_manager.get_auth_state() != AuthState.AUTHENTICATED:
-            return False
+        if auth_state != AuthState.AUTHENTICATED:
+            self._export_allowed = False
+            return RequestFuture.resolved(False)
 
-        member_info = self.auth_manager.get_member_self()
-
-        if member_info is None:
-            return False
-
-        roles = member_info.get("roles", [])
-
-        if not roles or len(roles) == 0:
-            return False
+        def check_roles(member_info: dict) -> bool:
+            roles = member_info.get("roles", []) if member_info is not None else []
+            self._export_allowed = bool(roles) and (
+                OrganisationRole.ADMIN.value in roles or OrganisationRole.EDITOR.value in roles
+            )
+            return self._export_allowed
 
-        return OrganisationRole.ADMIN.value in roles or OrganisationRole.EDITOR.value in roles
+        return self.auth_manager.get_member_self_async().then(check_roles)
 
     def _on_layer_tree_context_menu_about_to_show(self, menu: QMenu):
         """
@@ -258,7 +260,7 @@ class JMapCloud:
                 selected_layer
             ),
             parent=target_menu,
-            enabled_flag=self._is_user_allowed_to_export_layer_JMC(),
+            enabled_flag=self._export_allowed,
         )
 
         export_to_jmap_action.setObjectName("jmapcloud_export_layer_action")
@@ -279,10 +281,14 @@ class JMapCloud:
         self.auth_manager.logged_out_signal.connect(
             lambda: self._set_authorized_action(AuthState.NOT_AUTHENTICATED)
         )
-        auth_state = self.auth_manager.get_auth_state()
-        if auth_state == AuthState.AUTHENTICATED:
-            self.auth_manager.get_refresh_auth_event().start()
-        self._set_authorized_action(auth_state)
+        self._set_authorized_action(AuthState.NOT_AUTHENTICATED)
+
+        def on_auth_state(auth_state: AuthState):
+            if auth_state == AuthState.AUTHENTICATED:
+                self.auth_manager.get_refresh_auth_event().start()
+            self._set_authorized_action(auth_state)
+
+        self.auth_manager.get_auth_state_async().then(on_auth_state)
 
     def unload(self):
         """
@@ -312,17 +318,21 @@ class JMapCloud:
         """
         isAuthenticated = auth_state == AuthState.AUTHENTICATED
         self.load_project_action.setEnabled(isAuthenticated)
-        self.export_project_action.setEnabled(self._is_user_allowed_to_export_layer_JMC())
         self.trigger_refresh_token_action.setEnabled(isAuthenticated)
+        self.export_project_action.setEnabled(False)
+        self._update_export_permission(auth_state).then(self.export_project_action.setEnabled)
 
     def _open_connection_dialog(self):
         """
         Show the connection dialog.
         """
-        auth_state = self.auth_manager.get_auth_state()
-        if auth_state != AuthState.NOT_AUTHENTICATED:
-            self.connection_dialog.list_organizations()
-        self.connection_dialog.show()
+
+        def on_auth_state(auth_state: AuthState):
+            if auth_state != AuthState.NOT_AUTHENTICATED:
+                self.connection_dialog.list_organizations()
+            self.connection_dialog.show()
+
+        self.auth_manager.get_auth_state_async().then(on_auth_state)
 
     def _open_load_project_dialog(self):
         """
@@ -397,29 +407,31 @@ class JMapCloud:
         """
         project_data = self.load_project_dialog.get_selected_project_data()
         if project_data:
-            auth_state = self.auth_manager.get_auth_state()
-            if auth_state == AuthState.AUTHENTICATED:
-                self.load_project_dialog.close()
-                crs = QgsCoordinateReferenceSystem(project_data["crs"])
-                initial_extent = (
-                    QgsReferencedRectangle(
-                        QgsRectangle.fromWkt(project_data["initial_extent"]), crs
-                    )
-                    if project_data["initial_extent"]
-                    else None
-                )
-                vector_layer_type = project_data["layerType"]
-                project_data = ProjectData(
-                    name=project_data["name"],
-                    description=project_data["description"],
-                    default_language=project_data["language"],
-                    project_id=project_data["id"],
-                    organization_id=self.session_manager.get_organization_id(),
-                    crs=crs,
-                    initial_extent=initial_extent,
-                )
+            self.auth_manager.get_auth_state_async().then(
+                lambda auth_state: self._on_load_project_auth_state(auth_state, project_data)
+            )
 
-                self.import_project_manager.init_import(project_data, vector_layer_type)
+    def _on_load_project_auth_state(self, auth_state: AuthState, project_data: dict):
+        if auth_state == AuthState.AUTHENTICATED:
+            self.load_project_dialog.close()
+            crs = QgsCoordinateReferenceSystem(project_data["crs"])
+            initial_extent = (
+                QgsReferencedRectangle(QgsRectangle.fromWkt(project_data["initial_extent"]), crs)
+                if project_data["initial_extent"]
+                else None
+            )
+            vector_layer_type = project_data["layerType"]
+            project_data = ProjectData(
+                name=project_data["name"],
+                description=project_data["description"],
+                default_language=project_data["language"],
+                project_id=project_data["id"],
+                organization_id=self.session_manager.get_organization_id(),
+                crs=crs,
+                initial_extent=initial_extent,
+            )
+
+            self.import_project_manager.init_import(project_data, vector_layer_type)
 
     def _export_project(self):
         """
@@ -430,24 +442,28 @@ class JMapCloud:
         project_data = self.export_project_dialog.get_input_data()
         project_data["description"] = ""
         if project_data:
-            auth_state = self.auth_manager.get_auth_state()
-            if auth_state == AuthState.AUTHENTICATED:
-                self.export_project_dialog.close()
-                project_data = ProjectData(
-                    name=project_data["projectTitle"],
-                    description=project_data["description"],
-                    default_language=self.language,
-                    organization_id=self.session_manager.get_organization_id(),
+            self.auth_manager.get_auth_state_async().then(
+                lambda auth_state: self._on_export_project_auth_state(auth_state, project_data)
+            )
+
+    def _on_export_project_auth_state(self, auth_state: AuthState, project_data: dict):
+        if auth_state == AuthState.AUTHENTICATED:
+            self.export_project_dialog.close()
+            project_data = ProjectData(
+                name=project_data["projectTitle"],
+                description=project_data["description"],
+                default_language=self.language,
+                organization_id=self.session_manager.get_organization_id(),
+            )
+            project_data.setup_with_QGIS_project(QgsProject.instance())
+            if self._selected_layer_for_export:
+                selected_layer = QgsProject.instance().mapLayer(
+                    self._selected_layer_for_export.id()
                 )
-                project_data.setup_with_QGIS_project(QgsProject.instance())
-                if self._selected_layer_for_export:
-                    selected_layer = QgsProject.instance().mapLayer(
-                        self._selected_layer_for_export.id()
-                    )
-                    self._selected_layer_for_export = None
-                    if selected_layer:
-                        project_data.layers = [selected_layer]
-                self.export_project_manager.export_project(project_data)
+                self._selected_layer_for_export = None
+                if selected_layer:
+                    project_data.layers = [selected_layer]
+            self.export_project_manager.export_project(project_data)
 
     def _export_layer(self):
         """
@@ -466,7 +482,16 @@ class JMapCloud:
         if not export_selected_layer_data:
             return
 
-        if self.auth_manager.get_auth_state() != AuthState.AUTHENTICATED:
+        self.auth_manager.get_auth_state_async().then(
+            lambda auth_state: self._on_export_layer_auth_state(
+                auth_state, export_selected_layer_data
+            )
+        )
+
+    def _on_export_layer_auth_state(
+        self, auth_state: AuthState, export_selected_layer_data: ExportSelectedLayerData
+    ):
+        if auth_state != AuthState.AUTHENTICATED:
             self.auth_manager.logout("Error : Authentication failed")
             return
 
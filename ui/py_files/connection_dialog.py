@@ -40,7 +40,17 @@ class ConnectionDialog(QtWidgets.QDialog, Ui_Dialog):
         # #widgets-and-dialogs-with-auto-connect
         self.setupUi(self)
         self.auth_manager = auth_manager
-        auth_state = self.auth_manager.get_auth_state()
+        # the connection button is connected once the authentication state is known
+        self.connection_button.setEnabled(False)
+        self.set_login_input_enable(False)
+        self.set_choose_organization_layout_enable(False)
+        self.auth_manager.get_auth_state_async().then(self._init_auth_state)
+        self.email_input.setText(QgsSettings().value("{}/{}".format(SETTINGS_PREFIX, EMAIL_SUFFIX), ""))
+        self.show_password_checkBox.stateChanged.connect(self.set_echo_mode)
+        self.accept_button.clicked.connect(self.choose_organization)
+
+    def _init_auth_state(self, auth_state: AuthState):
+        self.connection_button.setEnabled(True)
         if auth_state == AuthState.AUTHENTICATED:
             self.connection_button.setText(self.tr("logout"))
             self.connection_button.clicked.connect(self.logout)
@@ -58,18 +68,20 @@ class ConnectionDialog(QtWidgets.QDialog, Ui_Dialog):
             self.message_label.setText("")
             self.set_login_input_enable(True)
             self.set_choose_organization_layout_enable(False)
-        self.email_input.setText(QgsSettings().value("{}/{}".format(SETTINGS_PREFIX, EMAIL_SUFFIX), ""))
-        self.show_password_checkBox.stateChanged.connect(self.set_echo_mode)
-        self.accept_button.clicked.connect(self.choose_organization)
 
     def login(self):
         self.connection_button.setEnabled(False)
-        access_token_config = self.auth_manager.get_access_token(self.email_input.text(), self.password_input.text())
+        email = self.email_input.text()
+        self.auth_manager.get_access_token_async(email, self.password_input.text()).then(
+            lambda access_token_config: self._on_login(access_token_config, email)
+        )
+
+    def _on_login(self, access_token_config: str, email: str):
         if access_token_config != None:
             self.message_label.setText("")
             self.list_organizations()
             self.password_input.clear()
-            QgsSettings().setValue("{}/{}".format(SETTINGS_PREFIX, EMAIL_SUFFIX), self.email_input.text())
+            QgsSettings().setValue("{}/{}".format(SETTINGS_PREFIX, EMAIL_SUFFIX), email)
         else:
             self.message_label.setStyleSheet("color: red;")
             self.message_label.setText("wrong email or password")
@@ -87,7 +99,9 @@ class ConnectionDialog(QtWidgets.QDialog, Ui_Dialog):
         self.set_choose_organization_layout_enable(False)
 
     def list_organizations(self):
-        result = self.auth_manager.get_user_self()
+        self.auth_manager.get_user_self_async().then(self._on_user_self)
+
+    def _on_user_self(self, result: dict):
         if result != None:
             self.message_label.setStyleSheet("font-size: 18px;")
             welcome_message = self.tr("Welcome {}<br />").format(result["name"])
@@ -116,10 +130,18 @@ class ConnectionDialog(QtWidgets.QDialog, Ui_Dialog):
     def choose_organization(self):
         self.accept_button.setEnabled(False)
         organization_data = self.organization_list_comboBox.currentData()
-        auth_state = self.auth_manager.get_auth_state()
-        if auth_state != AuthState.NOT_AUTHENTICATED and self.auth_manager.refresh_auth_settings(
-            org_id=organization_data["id"]
-        ):
+
+        def refresh_auth_settings(auth_state: AuthState):
+            if auth_state == AuthState.NOT_AUTHENTICATED:
+                return None
+            return self.auth_manager.refresh_auth_settings_async(org_id=organization_data["id"])
+
+        self.auth_manager.get_auth_state_async().then(refresh_auth_settings).then(
+            lambda claims: self._on_organization_chosen(claims, organization_data)
+        )
+
+    def _on_organization_chosen(self, claims: dict, organization_data: dict):
+        if claims:
             QgsSettings().setValue("{}/{}".format(SETTINGS_PREFIX, ORG_NAME_SUFFIX), organization_data["name"])
             self.password_input.clear()
             self.set_login_input_enable(False)
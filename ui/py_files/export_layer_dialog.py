@@ -9,6 +9,7 @@ from ...core.constant import ElementTypeWrapper, Permission
 from ...core.plugin_util import get_user_locale
 from ...core.services.auth_manager import JMapAuth
 from ...core.services.jmap_services_access import JMapMCS
+from ...core.services.request_future import RequestFuture
 from ...core.services.request_manager import RequestManager
 from ...core.views import ExportSelectedLayerData, ProjectData
 from .export_layer_dialog_base_ui import Ui_Dialog
@@ -27,6 +28,7 @@ class ExportLayerDialog(QtWidgets.QDialog, Ui_Dialog):
         self.setupUi(self)
         self.jmap_mcs = jmap_mcs
         self.auth_manager = auth_manager
+        self._permissions_future: RequestFuture = None
         self._selected_layer_id = None
         self._selected_layer_name = None
         self._selected_layer_type = None
@@ -299,10 +301,11 @@ class ExportLayerDialog(QtWidgets.QDialog, Ui_Dialog):
         self.JMap_project_combo_box.addItem(self.tr("Loading..."), None)
         self.JMap_project_combo_box.setEnabled(False)
 
-        def _can_user_modify_project(project: dict) -> bool:
-            project_id = project["id"]
-            reply = self.jmap_mcs.get_project_permissions(project_id)
+        if self._permissions_future is not None:
+            self._permissions_future.cancel()
+            self._permissions_future = None
 
+        def _can_user_modify_project(reply: RequestManager.ResponseData) -> bool:
             if reply is None or reply.status != QNetworkReply.NetworkError.NoError:
                 return False
 
@@ -331,11 +334,24 @@ class ExportLayerDialog(QtWidgets.QDialog, Ui_Dialog):
                 return
 
             projects = reply.content or []
+            # the permissions of all the projects are requested concurrently
+            self._permissions_future = RequestFuture.gather(
+                [self.jmap_mcs.get_project_permissions_async(project["id"]) for project in projects]
+            )
+            self._permissions_future.then(
+                lambda replies: show_projects(
+                    [
+                        project
+                        for project, permissions_reply in zip(projects, replies)
+                        if _can_user_modify_project(permissions_reply)
+                    ]
+                )
+            )
 
+        def show_projects(projects: list[dict]):
+            self._permissions_future = None
             self.JMap_project_combo_box.clear()
 
-            projects = list(filter(lambda p: _can_user_modify_project(p), projects))
-
             if not projects:
                 self.JMap_project_combo_box.clear()
                 self.error_label.setText(self.tr("No projects found"))